@@ -0,0 +1,315 @@
+"""
+엔진 성능 벤치마크.
+
+가짜 OHLCV(bench/synthetic.py)로 데이터 로드 / 지표 / 시그널 / 결과 직렬화 / DB 적재 경로의
+소요 시간을 재고, JSON 으로 저장한 뒤 기준값(baseline)과 비교합니다.
+
+    cd apps/engine
+    python -m bench.run --sizes 1k,100k,1M                       # 측정만
+    python -m bench.run --sizes 1k,100k,1M --save-baseline       # bench/baseline.json 갱신
+    python -m bench.run --sizes 1k,100k,1M --check --threshold 0.25   # 기준보다 25% 넘게 느려지면 exit 1
+
+DB 적재(write_bars) 벤치마크는 BENCH_DB_DSN 으로 로컬 Postgres 를 지정했을 때만 실행됩니다.
+(스키마는 migrations/schema.sql 기준, 벤치마크용 종목 행은 끝나면 지웁니다)
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pandas_ta_classic as ta
+
+from bench.synthetic import generate_ohlcv, parse_size
+from src.service.backtest import add_indicators, package_results, run_backtest
+from src.service.bar_store import SymbolBars
+from src.service.serialization import encode_msgpack
+from src.service.signals import compute_positions
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+BENCH_SYMBOL = "__BENCH__"
+
+PARAMS = {"enable_sma": True, "enable_rsi": True, "enable_macd": True, "enable_bb": True}
+
+
+# ==========================================
+# 1. 벤치마크 케이스
+# ==========================================
+# 각 케이스: (이름, 준비 함수(df, ctx) → 측정할 함수, 최대 봉 수(None: 제한 없음), DB 필요 여부)
+# ctx 는 {"timeframe", "db"}. 준비 단계(지표 미리 계산 등)는 측정 시간에 포함되지 않습니다.
+
+def _load(df, ctx):
+    def run():
+        bars = SymbolBars()
+        bars.append(df)
+        bars.frame()
+    return run
+
+
+def _indicator(fn):
+    return lambda df, ctx: (lambda: fn(df["close"]))
+
+
+def _with_indicators(df):
+    return add_indicators(df.copy(deep=False), PARAMS)
+
+
+def _signal(mode):
+    def setup(df, ctx):
+        ready = _with_indicators(df)
+        return lambda: compute_positions(ready, PARAMS, mode=mode)
+    return setup
+
+
+def _backtest(df, ctx):
+    return lambda: run_backtest(df, PARAMS, timeframe=ctx["timeframe"])
+
+
+def _package(layout):
+    def setup(df, ctx):
+        result = run_backtest(df, PARAMS)
+        return lambda: package_results(BENCH_SYMBOL, result.copy(deep=False), layout=layout, timeframe=ctx["timeframe"])
+    return setup
+
+
+def _encode(encoder):
+    def setup(df, ctx):
+        payload = package_results(BENCH_SYMBOL, run_backtest(df, PARAMS), layout="columns", timeframe=ctx["timeframe"])
+        return lambda: encoder(payload)
+    return setup
+
+
+def _write(table, conflict):
+    def setup(df, ctx):
+        from src.service.ingest_common import write_bars
+
+        rows = df.assign(symbol=BENCH_SYMBOL)
+
+        def run():
+            with ctx["db"].connect() as conn:
+                write_bars(conn, table, rows, conflict=conflict)
+                conn.rollback()  # 매 회차 같은 조건(빈 테이블)에서 재도록 되돌림
+        return run
+    return setup
+
+
+CASES = [
+    ("load.bar_store", _load, None, False),
+    ("indicator.sma", _indicator(lambda c: ta.sma(c, length=20)), None, False),
+    ("indicator.rsi", _indicator(lambda c: ta.rsi(c, length=14)), None, False),
+    ("indicator.macd", _indicator(lambda c: ta.macd(c, fast=12, slow=26, signal=9)), None, False),
+    ("indicator.bbands", _indicator(lambda c: ta.bbands(c, length=20, std=2.0)), None, False),
+    ("signal.vectorized", _signal("vectorized"), None, False),
+    ("signal.loop", _signal("loop"), 5_000, False),
+    ("backtest.run_backtest", _backtest, None, False),
+    ("serialize.package_rows", _package("rows"), 1_000_000, False),
+    ("serialize.package_columns", _package("columns"), 2_000_000, False),
+    ("serialize.json", _encode(lambda p: json.dumps(p).encode()), 2_000_000, False),
+    ("serialize.msgpack", _encode(encode_msgpack), 2_000_000, False),
+    ("ingest.write_bars_1d", _write("market_data", "nothing"), 1_000_000, True),
+    ("ingest.write_bars_1m", _write("market_data_1m", "nothing"), 1_000_000, True),
+    ("ingest.write_bars_1m_upsert", _write("market_data_1m", "update"), 1_000_000, True),
+]
+
+
+# ==========================================
+# 2. 측정
+# ==========================================
+
+def measure(fn, min_runs: int, max_runs: int, min_time: float) -> dict:
+    """
+    한 번 예열한 뒤, min_runs 번 이상 누적 min_time 초가 될 때까지(최대 max_runs 번) 실행해 ms 통계를 냅니다.
+    (예열: 첫 호출의 import / 메모리 할당 / 캐시 적재 비용을 측정에서 제외)
+    """
+    fn()
+    times = []
+    started = time.perf_counter()
+    while len(times) < max_runs and (len(times) < min_runs or time.perf_counter() - started < min_time):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+
+    arr = np.asarray(times)
+    return {
+        "median_ms": round(float(np.median(arr)), 3),
+        "min_ms": round(float(arr.min()), 3),
+        "max_ms": round(float(arr.max()), 3),
+        "runs": len(arr),
+    }
+
+
+def _format_size(n: int) -> str:
+    for unit, scale in (("M", 1_000_000), ("k", 1_000)):
+        if n >= scale and n % scale == 0:
+            return f"{n // scale}{unit}"
+    return str(n)
+
+
+def _bench_db(dsn: str):
+    """벤치마크용 DB 엔진을 만들고 벤치마크 종목 행을 준비합니다. (연결 실패 시 None)"""
+    if not dsn:
+        return None
+    from sqlalchemy import create_engine, text
+
+    try:
+        db = create_engine(dsn)
+        with db.connect() as conn:
+            conn.execute(text("INSERT INTO stocks (symbol, name) VALUES (:s, :s) ON CONFLICT (symbol) DO NOTHING"), {"s": BENCH_SYMBOL})
+            conn.commit()
+        return db
+    except Exception as e:
+        print(f"⚠️ Benchmark DB unavailable, skipping ingest cases: {e}")
+        return None
+
+
+def _cleanup_db(db):
+    from sqlalchemy import text
+
+    with db.connect() as conn:
+        for table in ("market_data", "market_data_1m", "stocks"):
+            conn.execute(text(f"DELETE FROM {table} WHERE symbol = :s"), {"s": BENCH_SYMBOL})
+        conn.commit()
+
+
+def run_suite(sizes: list, only: list = None, seed: int = 7, timeframe: str = "1m",
+              min_runs: int = 3, max_runs: int = 20, min_time: float = 1.0, db_dsn: str = None) -> dict:
+    db = _bench_db(db_dsn)
+    results = {}
+
+    try:
+        for n in sizes:
+            df = generate_ohlcv(n, seed=seed, timeframe=timeframe)
+            for name, setup, max_bars, needs_db in CASES:
+                if only and not any(name.startswith(prefix) for prefix in only):
+                    continue
+                if max_bars is not None and n > max_bars:
+                    continue
+                if needs_db and db is None:
+                    continue
+
+                key = f"{name}@{_format_size(n)}"
+                fn = setup(df, {"timeframe": timeframe, "db": db})
+                stats = measure(fn, min_runs, max_runs, min_time)
+                stats["bars"] = n
+                stats["bars_per_sec"] = round(n / (stats["median_ms"] / 1000)) if stats["median_ms"] else None
+                results[key] = stats
+                print(f"⏱️ {key:<40} median {stats['median_ms']:>10.2f} ms  (min {stats['min_ms']:.2f}, runs {stats['runs']})")
+    finally:
+        if db is not None:
+            _cleanup_db(db)
+
+    return results
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        commit = None
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+# ==========================================
+# 3. 기준값 비교
+# ==========================================
+
+def compare(current: dict, baseline: dict, threshold: float, min_delta_ms: float = 0.5) -> list:
+    """
+    두 측정 결과의 공통 케이스를 min_ms 로 비교합니다. (공용 머신의 잡음에 median 보다 덜 흔들림)
+    threshold 비율을 넘고, 차이가 min_delta_ms 이상일 때만 회귀로 봅니다. (1ms 미만 케이스의 잡음 방지)
+    반환값: [{case, baseline_ms, current_ms, ratio, regressed}] (느려진 순)
+    """
+    rows = []
+    for key in sorted(set(current) & set(baseline)):
+        base, cur = baseline[key]["min_ms"], current[key]["min_ms"]
+        ratio = cur / base if base else float("inf")
+        rows.append({
+            "case": key,
+            "baseline_ms": base,
+            "current_ms": cur,
+            "ratio": round(ratio, 3),
+            "regressed": ratio > 1 + threshold and cur - base >= min_delta_ms,
+        })
+    rows.sort(key=lambda r: r["ratio"], reverse=True)
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Quant engine benchmark suite")
+    parser.add_argument("--sizes", default="1k,100k,1M", help="봉 개수 목록 (예: 1k,100k,1M,10M)")
+    parser.add_argument("--only", default=None, help="이 접두사로 시작하는 케이스만 (예: indicator,signal)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--timeframe", default="1m", help="가짜 데이터 봉 간격 (1d 는 약 9만 봉까지만 가능)")
+    parser.add_argument("--min-runs", type=int, default=3)
+    parser.add_argument("--max-runs", type=int, default=20)
+    parser.add_argument("--min-time", type=float, default=1.0, help="케이스당 최소 측정 시간(초)")
+    parser.add_argument("--db-dsn", default=os.getenv("BENCH_DB_DSN"), help="DB 적재 벤치마크용 로컬 Postgres DSN")
+    parser.add_argument("--out", default=None, help="결과 JSON 경로 (기본: bench/results/<시각>.json)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="이번 결과를 기준값으로 저장")
+    parser.add_argument("--check", action="store_true", help="기준값보다 threshold 넘게 느려지면 exit 1")
+    parser.add_argument("--threshold", type=float, default=0.25, help="허용 감속 비율 (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="이보다 작은 차이는 회귀로 보지 않음")
+    args = parser.parse_args(argv)
+
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s]
+    only = args.only.split(",") if args.only else None
+
+    results = run_suite(
+        sizes, only=only, seed=args.seed, timeframe=args.timeframe,
+        min_runs=args.min_runs, max_runs=args.max_runs, min_time=args.min_time, db_dsn=args.db_dsn,
+    )
+    report = {"environment": environment(), "seed": args.seed, "timeframe": args.timeframe, "results": results}
+
+    out = args.out or os.path.join(DEFAULT_RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Results saved to {out}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📌 Baseline updated: {args.baseline}")
+        return 0
+
+    if args.check:
+        if not os.path.exists(args.baseline):
+            print(f"❌ Baseline not found: {args.baseline} (run with --save-baseline first)")
+            return 1
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+        rows = compare(results, baseline["results"], args.threshold, args.min_delta_ms)
+        for row in rows:
+            mark = "❌" if row["regressed"] else "✅"
+            print(f"{mark} {row['case']:<40} {row['baseline_ms']:>10.2f} → {row['current_ms']:>10.2f} ms  (x{row['ratio']:.2f})")
+
+        regressed = [row for row in rows if row["regressed"]]
+        if regressed:
+            print(f"❌ {len(regressed)} case(s) slower than baseline by more than {args.threshold:.0%}")
+            return 1
+        print(f"✅ No regressions over {args.threshold:.0%} ({len(rows)} cases compared)")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+# 타임프레임별 봉 간격과 1년치 봉 개수 (변동성 스케일링용)
+TIMEFRAMES = {
+    "1m": (pd.Timedelta(minutes=1), 252 * 390),
+    "5m": (pd.Timedelta(minutes=5), 252 * 78),
+    "1h": (pd.Timedelta(hours=1), 252 * 7),
+    "1d": (pd.Timedelta(days=1), 252),
+}
+
+
+def parse_size(text: str) -> int:
+    """'1k', '250K', '10M', '5000' 같은 봉 개수 표기를 정수로 바꿉니다."""
+    text = str(text).strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    number = text[:-1] if scale != 1 else text
+    return int(float(number) * scale)
+
+
+def generate_ohlcv(
+    n_bars: int,
+    seed: int = 0,
+    timeframe: str = "1m",
+    start: str = "2000-01-03",
+    start_price: float = 100.0,
+    annual_drift: float = 0.08,
+    annual_vol: float = 0.35,
+    gap_prob: float = 0.002,
+    jump_scale: float = 0.04,
+    symbol: str = None,
+) -> pd.DataFrame:
+    """
+    재현 가능한(seed 고정) 가짜 OHLCV를 만듭니다.
+
+    - 가격: 로그 정규 랜덤 워크 (연 drift / vol 을 봉 단위로 환산)
+    - 갭: gap_prob 확률로 봉이 몇 개 비고(장 휴장/데이터 누락), 그 봉은 시가가 점프해서 시작
+    - 고가/저가: 시가·종가를 감싸는 봉 내부 변동
+    - 거래량: 로그 정규 + 자기상관(AR(1)), 가격이 크게 움직인 봉일수록 증가
+    """
+    if timeframe not in TIMEFRAMES:
+        raise ValueError(f"Unknown timeframe: {timeframe} (expected one of {list(TIMEFRAMES)})")
+    step, bars_per_year = TIMEFRAMES[timeframe]
+    rng = np.random.default_rng(seed)
+    dt = 1.0 / bars_per_year
+
+    # --- 시간축 (갭 구간은 1~10 봉을 건너뜀) ---
+    gaps = rng.random(n_bars) < gap_prob
+    gaps[0] = False
+    steps = np.ones(n_bars, dtype=np.int64)
+    steps[gaps] += rng.integers(1, 10, size=int(gaps.sum()))
+    offsets = np.cumsum(steps) - steps[0]
+
+    start_ts = pd.Timestamp(start, tz="UTC")
+    last = start_ts + step * int(offsets[-1]) if n_bars else start_ts
+    if last.year >= 2262:
+        raise ValueError(f"{n_bars} bars of {timeframe} do not fit in datetime64[ns]; use a smaller timeframe")
+    times = start_ts + pd.to_timedelta(offsets * step.value, unit="ns")
+
+    # --- 가격 ---
+    sigma = annual_vol * np.sqrt(dt)
+    z = rng.standard_normal(n_bars)
+    log_ret = (annual_drift - 0.5 * annual_vol ** 2) * dt + sigma * z
+    jumps = np.where(gaps, rng.normal(0.0, jump_scale, n_bars), 0.0)
+    close = start_price * np.exp(np.cumsum(log_ret + jumps))
+
+    prev_close = np.empty(n_bars)
+    prev_close[0] = start_price
+    prev_close[1:] = close[:-1]
+    # 시가 = 직전 종가 + (갭이면 점프) + 약간의 노이즈, 종가까지의 나머지가 봉 내부 움직임
+    open_ = prev_close * np.exp(jumps + rng.normal(0.0, sigma * 0.1, n_bars))
+
+    wick = np.abs(rng.normal(0.0, sigma * 0.5, (2, n_bars)))
+    high = np.maximum(open_, close) * np.exp(wick[0])
+    low = np.minimum(open_, close) * np.exp(-wick[1])
+
+    # --- 거래량 ---
+    base_volume = 1_000_000 * dt * 252
+    # AR(1) 잡음 (a_t = phi * a_{t-1} + e_t) 을 파이썬 루프 없이 ewm 으로 계산
+    phi = 0.7
+    noise = rng.normal(0.0, 0.3, n_bars)
+    ar = pd.Series(noise).ewm(alpha=1 - phi, adjust=False).mean().to_numpy() / (1 - phi)
+    volume = np.round(base_volume * np.exp(ar) * (1 + 2 * np.abs(z) + 5 * np.abs(jumps) / jump_scale))
+
+    df = pd.DataFrame({
+        "time": times,
+        "open": open_,
+        "high": high,
+        "low": low,
+        "close": close,
+        "volume": volume,
+    })
+    if symbol is not None:
+        df["symbol"] = symbol
+    return df
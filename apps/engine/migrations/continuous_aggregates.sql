@@ -0,0 +1,59 @@
+-- market_data_1m 을 time_bucket 으로 묶은 5분/15분/1시간 OHLCV 연속 집계 (TimescaleDB)
+-- materialized_only = false: 아직 집계되지 않은 최신 구간은 원본 1분봉에서 실시간으로 합쳐서 보여줌
+-- 정책(policy)이 최근 구간만 주기적으로 증분 갱신하므로 요청마다 분봉을 다시 묶을 필요가 없음
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS market_data_5m
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+SELECT time_bucket(INTERVAL '5 minutes', time) AS time,
+       symbol,
+       first(open, time) AS open,
+       max(high) AS high,
+       min(low) AS low,
+       last(close, time) AS close,
+       sum(volume) AS volume
+FROM market_data_1m
+GROUP BY time_bucket(INTERVAL '5 minutes', time), symbol
+WITH NO DATA;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS market_data_15m
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+SELECT time_bucket(INTERVAL '15 minutes', time) AS time,
+       symbol,
+       first(open, time) AS open,
+       max(high) AS high,
+       min(low) AS low,
+       last(close, time) AS close,
+       sum(volume) AS volume
+FROM market_data_1m
+GROUP BY time_bucket(INTERVAL '15 minutes', time), symbol
+WITH NO DATA;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS market_data_1h
+WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+SELECT time_bucket(INTERVAL '1 hour', time) AS time,
+       symbol,
+       first(open, time) AS open,
+       max(high) AS high,
+       min(low) AS low,
+       last(close, time) AS close,
+       sum(volume) AS volume
+FROM market_data_1m
+GROUP BY time_bucket(INTERVAL '1 hour', time), symbol
+WITH NO DATA;
+
+-- 증분 갱신 정책: 1분봉 수집 주기(INGEST_1M_INTERVAL_MIN)에 맞춰 최근 며칠치만 다시 집계
+SELECT add_continuous_aggregate_policy('market_data_5m',
+    start_offset => INTERVAL '8 days', end_offset => INTERVAL '5 minutes',
+    schedule_interval => INTERVAL '5 minutes', if_not_exists => TRUE);
+
+SELECT add_continuous_aggregate_policy('market_data_15m',
+    start_offset => INTERVAL '8 days', end_offset => INTERVAL '15 minutes',
+    schedule_interval => INTERVAL '5 minutes', if_not_exists => TRUE);
+
+SELECT add_continuous_aggregate_policy('market_data_1h',
+    start_offset => INTERVAL '8 days', end_offset => INTERVAL '1 hour',
+    schedule_interval => INTERVAL '15 minutes', if_not_exists => TRUE);
+
+CREATE INDEX IF NOT EXISTS ix_market_data_5m_symbol_time ON market_data_5m (symbol, time DESC);
+CREATE INDEX IF NOT EXISTS ix_market_data_15m_symbol_time ON market_data_15m (symbol, time DESC);
+CREATE INDEX IF NOT EXISTS ix_market_data_1h_symbol_time ON market_data_1h (symbol, time DESC);
@@ -5,6 +5,21 @@ CREATE TABLE IF NOT EXISTS stocks (
     active BOOLEAN DEFAULT TRUE
 );
 
+-- 종목 카탈로그 통계 (수집할 때마다 같은 트랜잭션에서 갱신, NULL 이면 아직 집계 전)
+ALTER TABLE stocks
+    ADD COLUMN IF NOT EXISTS first_time_1d TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS last_time_1d TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS bars_1d BIGINT,
+    ADD COLUMN IF NOT EXISTS ingested_at_1d TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS ingest_status_1d VARCHAR(20),
+    ADD COLUMN IF NOT EXISTS ingest_error_1d TEXT,
+    ADD COLUMN IF NOT EXISTS first_time_1m TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS last_time_1m TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS bars_1m BIGINT,
+    ADD COLUMN IF NOT EXISTS ingested_at_1m TIMESTAMPTZ,
+    ADD COLUMN IF NOT EXISTS ingest_status_1m VARCHAR(20),
+    ADD COLUMN IF NOT EXISTS ingest_error_1m TEXT;
+
 CREATE TABLE IF NOT EXISTS market_data (
     time TIMESTAMPTZ NOT NULL,
     symbol VARCHAR(20) NOT NULL,
@@ -17,4 +32,22 @@ CREATE TABLE IF NOT EXISTS market_data (
     CONSTRAINT fk_stocks FOREIGN KEY (symbol) REFERENCES stocks (symbol)
 );
 
-CREATE INDEX IF NOT EXISTS ix_symbol_time_desc ON market_data (symbol, time DESC);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS ix_symbol_time_desc ON market_data (symbol, time DESC);
+
+CREATE TABLE IF NOT EXISTS market_data_1m (
+    time TIMESTAMPTZ NOT NULL,
+    symbol VARCHAR(20) NOT NULL,
+    open DOUBLE PRECISION,
+    high DOUBLE PRECISION,
+    low DOUBLE PRECISION,
+    close DOUBLE PRECISION,
+    volume DOUBLE PRECISION,
+    PRIMARY KEY (time, symbol)
+);
+
+-- 마지막으로 적용된 스키마 버전 (migrations 파일 해시, 같으면 서버 시작 시 DDL 생략)
+CREATE TABLE IF NOT EXISTS schema_version (
+    id INT PRIMARY KEY,
+    version VARCHAR(64) NOT NULL,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
@@ -0,0 +1,33 @@
+-- 시세 테이블을 TimescaleDB 하이퍼테이블로 관리 (구문 단위로 적용, 모든 구문은 다시 실행해도 안전해야 함)
+-- 청크 크기: 일봉은 종목 수백 개 × 1년이 수십만 행 수준이라 1년, 1분봉은 하루 390봉 × 종목 수라 7일
+-- (이미 하이퍼테이블이면 create_hypertable 은 무시되고, set_chunk_time_interval 은 새로 만들어지는 청크부터 적용)
+
+SELECT create_hypertable('market_data', 'time', chunk_time_interval => INTERVAL '1 year', if_not_exists => TRUE, migrate_data => TRUE);
+SELECT set_chunk_time_interval('market_data', INTERVAL '1 year');
+
+SELECT create_hypertable('market_data_1m', 'time', chunk_time_interval => INTERVAL '7 days', if_not_exists => TRUE, migrate_data => TRUE);
+SELECT set_chunk_time_interval('market_data_1m', INTERVAL '7 days');
+
+-- 네이티브 압축: 종목별로 묶고(segmentby) 시간 역순 정렬 → 종목 하나의 구간 조회는 그 종목 세그먼트만 풀어서 읽음
+-- (압축된 청크가 있으면 설정 변경이 실패하므로 아직 압축이 꺼져 있을 때만 켬)
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM timescaledb_information.hypertables
+                   WHERE hypertable_name = 'market_data' AND compression_enabled) THEN
+        ALTER TABLE market_data SET (timescaledb.compress, timescaledb.compress_segmentby = 'symbol', timescaledb.compress_orderby = 'time DESC');
+    END IF;
+END $$;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM timescaledb_information.hypertables
+                   WHERE hypertable_name = 'market_data_1m' AND compression_enabled) THEN
+        ALTER TABLE market_data_1m SET (timescaledb.compress, timescaledb.compress_segmentby = 'symbol', timescaledb.compress_orderby = 'time DESC');
+    END IF;
+END $$;
+
+-- 압축 정책: 수집이 다시 쓰는 구간(일봉 겹침 며칠, 1분봉은 야후 제공 최대 7일)보다 충분히 지난 청크만 압축
+SELECT add_compression_policy('market_data', compress_after => INTERVAL '1 year', if_not_exists => TRUE);
+SELECT add_compression_policy('market_data_1m', compress_after => INTERVAL '14 days', if_not_exists => TRUE);
+
+-- 보관 기간(retention) 정책은 MARKET_DATA_1M_RETENTION_DAYS 설정값으로 database.py 에서 적용
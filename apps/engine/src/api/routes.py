@@ -1,9 +1,24 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Header, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from src.service.backtest import calculate_strategy
-from src.service.ingest import save_to_db
-from src.service.ingest_1m import save_1m_to_db
-from typing import Dict, Any, Optional
+from itertools import chain
+from src.service.backtest import calculate_strategy, prepare_strategy, stream_results
+from src.service.sweep import run_sweep
+from src.service.portfolio import calculate_portfolio
+from src.service.robustness import calculate_robustness
+from src.service.jobs import job_manager
+from src.service.indicator_cache import indicator_cache
+from src.service.bar_store import bar_store
+from src.service.catalog import symbol_catalog
+from src.service.serialization import MSGPACK_MEDIA_TYPES, NDJSON_MEDIA_TYPE, encode_msgpack, encode_ndjson
+from src.service.scheduler import ingest_scheduler
+from src.core.config import (
+    TARGET_TICKERS, PROFILING_ENABLED, PROFILE_INTERVAL_SEC, CATALOG_PAGE_MAX, CATALOG_REFRESH_INTERVAL_SEC,
+)
+from src.core.metrics import registry, register_gauge, profiled, get_profile
+from src.core.concurrency import run_cpu
+from src.core.health import check_db, is_ready, steps as startup_steps
+from typing import Dict, Any, List, Optional
 
 router = APIRouter()
 
@@ -11,31 +26,296 @@ router = APIRouter()
 class BacktestRequest(BaseModel):
     ticker: str
     # 특정 지표에 종속되지 않도록 딕셔너리 형태로 통합
+    # 매수/매도 조건은 enable_* 플래그 대신 규칙 식으로도 지정 가능
+    # 예) {"buy_rule": "sma_s > sma_l and rsi < 60", "sell_rule": "crosses_below(macd, macd_s)"}
     params: Dict[str, Any] = {
         "short_window": 5,
         "long_window": 20
     }
+    # 응답 레이아웃: "rows"(기본, 봉마다 딕셔너리) 또는 "columns"(필드마다 배열)
+    format: str = "rows"
+    # 봉 단위: "1m", "5m", "15m", "1h" (1분봉 기반), "1d"(기본, 일봉)
+    timeframe: str = "1d"
+    # 데이터 소스: "db" 또는 "parquet" (없으면 DATA_SOURCE 설정값)
+    source: Optional[str] = None
+    # 조회 구간 (ISO 날짜/시각, UTC). 지표 워밍업용 앞쪽 봉은 엔진이 알아서 더 읽음
+    start: Optional[str] = None
+    end: Optional[str] = None
+    # 차트에 내려줄 최대 봉 수 (LTTB 로 줄임, 매수/매도 봉은 항상 포함)
+    max_points: Optional[int] = None
+
+def _backtest(req: BacktestRequest, profile: bool, stream: bool = False):
+    # profile=true 이면 이 요청을 샘플링 프로파일러로 감쌈 (PROFILING_ENABLED 일 때만)
+    # 계산이 도는 CPU 풀 스레드 안에서 감싸야 그 스레드의 스택이 찍힘
+    with profiled(profile and PROFILING_ENABLED, interval=PROFILE_INTERVAL_SEC) as handle:
+        if not stream:
+            result = calculate_strategy(req.ticker, req.params, layout=req.format, timeframe=req.timeframe,
+                                        source=req.source, start=req.start, end=req.end, max_points=req.max_points)
+        else:
+            # 계산까지만 여기서 하고, 포장/직렬화는 응답을 보내면서 배치 단위로
+            df = prepare_strategy(req.ticker, req.params, timeframe=req.timeframe,
+                                  source=req.source, start=req.start, end=req.end)
+            result = None if df is None else stream_results(req.ticker, df, layout=req.format,
+                                                            timeframe=req.timeframe, max_points=req.max_points)
+            if result is not None:
+                # 잘못된 layout / max_points 는 응답을 시작하기 전에 400 으로
+                result = chain([next(result)], result)
+    return result, handle
 
 @router.post("/backtest")
-def run_backtest_api(req: BacktestRequest):
-    print(f"🚀 Running backtest for {req.ticker} with params: {req.params}")
-    
-    result = calculate_strategy(req.ticker, req.params)
-    
+async def run_backtest_api(req: BacktestRequest, response: Response, accept: Optional[str] = Header(None),
+                           profile: bool = False, stream: bool = False):
+    """
+    stream=true (또는 Accept: application/x-ndjson) 이면 NDJSON 으로 흘려보냅니다.
+    meta 한 줄 → 봉 BACKTEST_STREAM_BATCH_BARS 개씩 bars 줄 → 마지막에 summary 한 줄 (final_return 등)
+    """
+    print(f"🚀 Running backtest for {req.ticker} [{req.timeframe}] with params: {req.params}")
+    stream = stream or bool(accept and NDJSON_MEDIA_TYPE in accept)
+
+    try:
+        result, handle = await run_cpu(_backtest, req, profile, stream)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {"X-Profile-Id": handle["id"]} if handle["id"] else {}
+    response.headers.update(headers)
+
+    if stream:
+        if result is None:
+            return {"error": "No data"}
+        return StreamingResponse(encode_ndjson(result), media_type=NDJSON_MEDIA_TYPE, headers=headers)
+
     if result is None:
         return {"error": "Backtest failed or no data available"}
-        
+
+    # Accept: application/msgpack 이면 바이너리로 인코딩 (기본은 JSON)
+    media_type = next((m for m in MSGPACK_MEDIA_TYPES if accept and m in accept), None)
+    if media_type:
+        return Response(content=encode_msgpack(result), media_type=media_type, headers=headers)
+
+    return result
+
+class SweepRequest(BaseModel):
+    ticker: str
+    # 모든 조합에 공통으로 들어갈 기본 파라미터
+    params: Dict[str, Any] = {}
+    # 파라미터 범위: 리스트 또는 {"start", "stop", "step"} (stop 포함)
+    grid: Dict[str, Any]
+    max_workers: Optional[int] = None
+    # 시간 예산(초)을 넘기면 남은 조합은 취소하고 끝난 결과만 반환
+    time_budget_sec: Optional[float] = None
+    sort_by: str = "final_return"
+    top_n: int = 20
+    # True 이면 상위 top_n 조합의 차트용 results 배열도 포함
+    include_results: bool = False
+
+@router.post("/backtest/sweep")
+async def run_sweep_api(req: SweepRequest):
+    print(f"🧪 Running parameter sweep for {req.ticker} over: {list(req.grid)}")
+
+    try:
+        result = await run_cpu(
+            run_sweep,
+            req.ticker,
+            req.params,
+            req.grid,
+            max_workers=req.max_workers,
+            time_budget_sec=req.time_budget_sec,
+            sort_by=req.sort_by,
+            top_n=req.top_n,
+            include_results=req.include_results,
+        )
+    except (ValueError, KeyError) as e:
+        # 잘못된 범위 / 조합 수 초과 / 정렬 기준 오류
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return result
+
+class PortfolioRequest(BaseModel):
+    # 비우면 관심 종목(TARGET_TICKERS) 전체
+    symbols: Optional[List[str]] = None
+    params: Dict[str, Any] = {}
+    # 자금 배분: "equal"(신호 켜진 종목 동일 비중) 또는 "top_n"(모멘텀 상위 N개만)
+    allocation: str = "equal"
+    top_n: int = 5
+    # top_n 순위를 매길 최근 수익률 기간 (봉 수)
+    rank_lookback: int = 20
+    # 몇 봉마다 비중을 다시 맞출지 (1: 매 봉)
+    rebalance_every: int = 1
+    timeframe: str = "1d"
+
+@router.post("/backtest/portfolio")
+async def run_portfolio_api(req: PortfolioRequest):
+    symbols = list(dict.fromkeys(req.symbols or TARGET_TICKERS))
+    print(f"📊 Running portfolio backtest over {len(symbols)} symbols [{req.allocation}, {req.timeframe}]")
+
+    try:
+        return await run_cpu(
+            calculate_portfolio,
+            symbols,
+            req.params,
+            allocation=req.allocation,
+            top_n=req.top_n,
+            rank_lookback=req.rank_lookback,
+            rebalance_every=req.rebalance_every,
+            timeframe=req.timeframe,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+class RobustnessRequest(BaseModel):
+    ticker: str
+    params: Dict[str, Any] = {}
+    # 시뮬레이션 경로 수 (부트스트랩 / 진입 시점 흔들기 각각)
+    paths: int = 1000
+    # 부트스트랩에서 한 번에 이어 붙이는 연속 봉 수
+    block_size: int = 20
+    # 진입/청산 시점을 흔드는 최대 봉 수 (±)
+    max_shift: int = 5
+    # 같은 seed 면 같은 분포 (없으면 매번 다름)
+    seed: Optional[int] = None
+    confidence: float = 0.95
+    timeframe: str = "1d"
+    source: Optional[str] = None
+
+@router.post("/backtest/robustness")
+async def run_robustness_api(req: RobustnessRequest):
+    print(f"🎲 Running robustness analysis for {req.ticker} [{req.timeframe}] with {req.paths} paths")
+
+    try:
+        return await run_cpu(calculate_robustness, **req.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/jobs/backtest", status_code=202)
+def submit_backtest_job(req: BacktestRequest):
+    """백테스트를 작업 큐에 넣고 job_id 를 바로 반환합니다. (같은 요청이 진행 중/캐시돼 있으면 그 작업을 반환)"""
+    payload = {
+        "ticker": req.ticker,
+        "params": req.params,
+        "layout": req.format,
+        "timeframe": req.timeframe,
+        "source": req.source,
+        "start": req.start,
+        "end": req.end,
+        "max_points": req.max_points,
+    }
+    try:
+        return job_manager.submit("backtest", payload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@router.post("/jobs/portfolio", status_code=202)
+def submit_portfolio_job(req: PortfolioRequest):
+    payload = {
+        "symbols": list(dict.fromkeys(req.symbols or TARGET_TICKERS)),
+        "params": req.params,
+        "allocation": req.allocation,
+        "top_n": req.top_n,
+        "rank_lookback": req.rank_lookback,
+        "rebalance_every": req.rebalance_every,
+        "timeframe": req.timeframe,
+    }
+    try:
+        return job_manager.submit("portfolio", payload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@router.post("/jobs/robustness", status_code=202)
+def submit_robustness_job(req: RobustnessRequest):
+    try:
+        return job_manager.submit("robustness", req.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@router.get("/jobs/metrics")
+def get_job_metrics():
+    """큐 길이, 실행 중인 작업 수, 작업별 대기/실행 시간(ms) 통계를 반환합니다."""
+    return job_manager.metrics()
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str, include_result: bool = True):
+    """작업 상태를 조회합니다. 끝난 작업은 result 도 함께 반환합니다."""
+    job = job_manager.get(job_id, include_result=include_result)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired job: {job_id}")
+    return job
+
+@router.get("/healthz")
+async def healthz():
+    """liveness: 프로세스가 요청을 받을 수 있으면 200 (DB 등 외부 의존성은 보지 않음)"""
+    return {"status": "ok"}
+
+@router.get("/readyz")
+async def readyz(response: Response):
+    """readiness: 시작 준비(스키마 확인)가 끝났고 DB 에 연결되면 200, 아니면 503"""
+    db_ok, db_error = await check_db()
+    ready = is_ready() and db_ok
+    if not ready:
+        response.status_code = 503
+    return {
+        "status": "ready" if ready else "not_ready",
+        "startup": startup_steps(),
+        "db": {"ok": db_ok, "error": db_error},
+    }
+
+@router.get("/metrics")
+def get_metrics():
+    """단계별 지연 시간 히스토그램 / 처리 행·바이트 / 캐시·큐 상태를 Prometheus 텍스트 포맷으로 반환합니다."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/debug/profiles/{profile_id}")
+def get_profile_api(profile_id: str):
+    """?profile=true 로 실행한 요청의 샘플링 결과 (flamegraph.pl / speedscope 용 folded 스택)"""
+    folded = get_profile(profile_id)
+    if folded is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired profile: {profile_id}")
+    return PlainTextResponse(folded)
+
+# 캐시 / 저장소 / 작업 큐 상태 게이지 (/metrics 조회 시점에 읽음)
+register_gauge("engine_indicator_cache_bytes", "Bytes held by the indicator cache", lambda: indicator_cache.stats()["bytes"])
+register_gauge("engine_indicator_cache_hit_rate", "Indicator cache hit rate", lambda: indicator_cache.stats()["hit_rate"])
+register_gauge("engine_bar_store_bytes", "Bytes held by the in-memory OHLCV store", lambda: bar_store.stats()["bytes"])
+register_gauge("engine_job_queue_depth", "Backtest jobs waiting in the queue", lambda: job_manager.metrics()["queue_depth"])
+register_gauge("engine_jobs_running", "Backtest jobs currently running", lambda: job_manager.metrics()["running"])
+
+@router.get("/cache/indicators")
+def get_indicator_cache_stats():
+    """지표 캐시 상태(항목 수, 사용 바이트, 히트/미스 카운터)를 반환합니다."""
+    return indicator_cache.stats()
+
+@router.get("/cache/bars")
+def get_bar_store_stats():
+    """인메모리 OHLCV 저장소에 올라와 있는 종목별 봉 개수와 메모리 사용량을 반환합니다."""
+    return bar_store.stats()
+
+def _ingest_result(result: dict) -> dict:
+    """수집 결과를 그대로 돌려주되, 수집 함수가 실패를 반환했으면 HTTP 오류로 바꿉니다. (야후 조회 실패는 502)"""
+    if result and result.get("status") == "error":
+        status_code = 502 if result.get("stage") == "fetch" else 500
+        raise HTTPException(status_code=status_code, detail=result.get("message"))
     return result
 
 @router.post("/ingest/{ticker}")
-def ingest_data_api(ticker: str):
+def ingest_data_api(ticker: str, full: bool = False, wait: bool = True):
+    """기본은 증분 수집, full=true 이면 전체 기간 백필 (스케줄러를 거쳐 속도 제한/재시도 적용)"""
     print(f"📥 Starting ingestion for: {ticker}")
     
     try:
-        # Service Layer 호출
-        result = save_to_db(ticker)
-        return result
-        
+        # 스케줄러 큐에 넣기 (같은 종목이 이미 수집 중이면 그 작업을 기다림)
+        future = ingest_scheduler.submit("1d", ticker, full=full)
+        if not wait:
+            return {"status": "queued", "ticker": ticker}
+        return _ingest_result(future.result())
+
+    except HTTPException:
+        raise
     except ValueError as e:
         # Yahoo Finance에 없는 종목 등
         raise HTTPException(status_code=404, detail=str(e))
@@ -46,31 +326,48 @@ def ingest_data_api(ticker: str):
 
 
 @router.post("/ingest_1m/{ticker}")
-def ingest_1m_data(ticker: str):
+def ingest_1m_data(ticker: str, full: bool = False, wait: bool = True):
     try:
-        save_1m_to_db(ticker)
-        return {"status": "success", "message": f"1m data for {ticker} saved"}
+        future = ingest_scheduler.submit("1m", ticker, full=full)
+        if not wait:
+            return {"status": "queued", "ticker": ticker}
+        return _ingest_result(future.result())
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        return {"status": "error", "message": str(e)}
+        print(f"❌ 1m ingestion failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/ingest/status")
+def get_ingest_status():
+    """종목별 수집 진행 상태, 마지막 성공 시각, 소요 시간(ms)을 반환합니다."""
+    return ingest_scheduler.snapshot()
 
 @router.get("/stocks/list")
-def get_stock_list():
-    """
-    DB에 저장된 모든 종목의 티커와 이름을 가져옵니다.
-    중복을 제거하고(DISTINCT), 티커 순으로 정렬합니다.
+async def get_stock_list(response: Response, q: Optional[str] = None, limit: Optional[int] = None, offset: int = 0,
+                   active_only: bool = False):
     """
-    # market_data 테이블에서 symbol만 가져오거나, 
-    # 별도의 company_info 테이블이 있다면 거기서 가져오는 것이 더 효율적입니다.
-    # 여기서는 market_data에서 유니크한 값을 뽑는 예시입니다.
-    query = """
-        SELECT DISTINCT symbol 
-        FROM market_data 
-        ORDER BY symbol ASC
+    종목 카탈로그(stocks 테이블)를 티커 순으로 반환합니다.
+    시세 테이블을 훑지 않고 메모리에 올려둔 카탈로그에서 바로 자르므로 목록/검색/페이지 모두 즉시 응답합니다.
+    - q: 티커 접두사 또는 회사명 검색
+    - limit/offset: 페이지 (전체 개수는 X-Total-Count 헤더)
+    항목마다 일봉/1분봉의 첫·마지막 봉 시각, 봉 개수, 마지막 수집 상태가 들어 있습니다.
     """
-    try:
-        df = pd.read_sql(query, engine)
-        # 프론트엔드에서 쓰기 편하게 리스트 형태로 변환
-        # 예: [{'symbol': 'AAPL'}, {'symbol': 'NVDA'}, ...]
-        return df.to_dict(orient="records")
-    except Exception as e:
-        return {"error": str(e)}
\ No newline at end of file
+    if offset < 0 or (limit is not None and limit < 1):
+        raise HTTPException(status_code=400, detail="limit must be >= 1 and offset must be >= 0")
+    limit = min(limit, CATALOG_PAGE_MAX) if limit is not None else None
+
+    total, items = await symbol_catalog.alist(q=q, limit=limit, offset=offset, active_only=active_only)
+    response.headers["X-Total-Count"] = str(total)
+    response.headers["Cache-Control"] = f"max-age={int(CATALOG_REFRESH_INTERVAL_SEC)}"
+    return items
+
+@router.get("/stocks/{symbol}/catalog")
+async def get_stock_catalog(symbol: str):
+    """종목 하나의 카탈로그 항목"""
+    entry = await symbol_catalog.aget(symbol)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Unknown symbol: {symbol}")
+    return entry
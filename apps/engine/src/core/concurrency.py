@@ -0,0 +1,20 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from src.core.config import CPU_WORKERS
+
+# 백테스트 / 스윕 / 포트폴리오 / 강건성 분석처럼 오래 도는 CPU 작업 전용 스레드 풀
+# (FastAPI 기본 스레드 풀과 분리해서, 무거운 요청이 몰려도 수집/목록 요청은 바로 처리됨)
+cpu_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="cpu")
+
+
+async def run_cpu(fn, *args, **kwargs):
+    """
+    fn(*args, **kwargs) 를 CPU 풀에서 실행하고 결과를 기다립니다. (이벤트 루프는 막지 않음)
+    현재 요청의 contextvars 를 그대로 넘기므로 stage() 측정값이 Server-Timing 에 들어갑니다.
+    """
+    ctx = contextvars.copy_context()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(cpu_executor, functools.partial(ctx.run, fn, *args, **kwargs))
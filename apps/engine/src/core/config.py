@@ -44,4 +44,89 @@ TARGET_TICKERS = [
     "MSFT",  # 마이크로소프트 (윈도우, 클라우드 Azure 및 오픈AI 투자 주체)
     "GOOGL", # 알파벳 (구글 검색 엔진, 유튜브 및 제미나이 AI 모델 개발)
     "META"   # 메타 (페이스북, 인스타그램 및 메타버스 플랫폼)
-]
\ No newline at end of file
+]
+
+# 파라미터 스윕(그리드 서치) 설정
+SWEEP_MAX_WORKERS = int(os.getenv("SWEEP_MAX_WORKERS", min(4, os.cpu_count() or 1)))  # 프로세스 풀 최대 워커 수
+SWEEP_MAX_COMBINATIONS = int(os.getenv("SWEEP_MAX_COMBINATIONS", 2000))  # 한 번에 돌릴 수 있는 최대 조합 수
+
+# 지표 캐시 메모리 예산 (바이트)
+INDICATOR_CACHE_MAX_BYTES = int(os.getenv("INDICATOR_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# 인메모리 OHLCV 저장소 설정
+BAR_STORE_MAX_BYTES = int(os.getenv("BAR_STORE_MAX_BYTES", 512 * 1024 * 1024))  # 전체 메모리 상한 (바이트)
+BAR_STORE_REFRESH_INTERVAL_SEC = float(os.getenv("BAR_STORE_REFRESH_INTERVAL_SEC", 0))  # 이 시간 안의 재조회는 DB 확인 생략
+
+# 증분 수집 설정
+INGEST_DAILY_OVERLAP_DAYS = int(os.getenv("INGEST_DAILY_OVERLAP_DAYS", 5))  # 일봉: 마지막 봉과 겹쳐서 다시 받을 일수 (정정분 반영)
+INGEST_1M_OVERLAP_MINUTES = int(os.getenv("INGEST_1M_OVERLAP_MINUTES", 30))  # 1분봉: 겹쳐서 다시 받을 분
+INGEST_1M_FRESH_MINUTES = int(os.getenv("INGEST_1M_FRESH_MINUTES", 2))  # 1분봉: 마지막 봉이 이 시간보다 최근이면 건너뜀
+INGEST_1M_MAX_LOOKBACK_DAYS = 7  # 야후 1분봉은 최근 7일까지만 조회 가능
+
+# 대량 적재(COPY) 설정
+BULK_LOAD_CHUNK_ROWS = int(os.getenv("BULK_LOAD_CHUNK_ROWS", 50000))  # COPY 한 번에 보낼 최대 행 수 (메모리 상한)
+BULK_LOAD_COPY_MIN_ROWS = int(os.getenv("BULK_LOAD_COPY_MIN_ROWS", 1000))  # 이보다 적으면 일반 INSERT 한 번으로 처리
+
+# 수집 스케줄러 설정
+INGEST_MAX_WORKERS = int(os.getenv("INGEST_MAX_WORKERS", 4))  # 동시에 수집할 최대 종목 수
+INGEST_RATE_PER_SEC = float(os.getenv("INGEST_RATE_PER_SEC", 1.0))  # 야후 요청 토큰 충전 속도 (초당)
+INGEST_RATE_BURST = int(os.getenv("INGEST_RATE_BURST", 4))  # 토큰 버킷 최대 크기 (순간 허용량)
+INGEST_MAX_RETRIES = int(os.getenv("INGEST_MAX_RETRIES", 3))  # 일시 장애 시 재시도 횟수
+INGEST_BACKOFF_SEC = float(os.getenv("INGEST_BACKOFF_SEC", 2.0))  # 재시도 대기 시간 (시도마다 2배씩 증가)
+INGEST_1M_INTERVAL_MIN = int(os.getenv("INGEST_1M_INTERVAL_MIN", 5))  # 1분봉 주기 수집 간격 (분)
+INGEST_DAILY_AT_UTC = os.getenv("INGEST_DAILY_AT_UTC", "21:30")  # 일봉 수집 시각 (UTC, 미국장 마감 후)
+
+# 스트리밍 시그널 워커 설정 (Redis Pub/Sub)
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+STREAM_IN_CHANNEL = os.getenv("STREAM_IN_CHANNEL", "market_data")  # 실시간 봉을 받는 채널
+STREAM_OUT_CHANNEL = os.getenv("STREAM_OUT_CHANNEL", "trade_signal")  # 매수/매도 명령을 내보내는 채널
+STREAM_WORKER_ENABLED = os.getenv("STREAM_WORKER_ENABLED", "false").lower() == "true"  # 서버 시작 시 워커 실행 여부
+STREAM_WARMUP_BARS = int(os.getenv("STREAM_WARMUP_BARS", 500))  # 워커 시작 시 지표 상태를 채울 과거 1분봉 수
+
+# 비동기 백테스트 작업 큐 설정
+JOB_BACKEND = os.getenv("JOB_BACKEND", "local")  # "local"(프로세스 내부) 또는 "redis"
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))  # 큐를 비우는 워커 스레드 수
+JOB_WORKERS_ENABLED = os.getenv("JOB_WORKERS_ENABLED", "true").lower() == "true"  # 이 인스턴스에서 큐 워커를 돌릴지 (local 백엔드면 반드시 true)
+JOB_RESULT_TTL_SEC = float(os.getenv("JOB_RESULT_TTL_SEC", 600))  # 끝난 결과를 캐시해 두는 시간 (초)
+JOB_CLAIM_TTL_SEC = float(os.getenv("JOB_CLAIM_TTL_SEC", 3600))  # 대기/실행 중인 요청 키를 잡아두는 최대 시간 (초, 끝나면 결과 TTL 로 바뀜)
+JOB_MAX_QUEUE = int(os.getenv("JOB_MAX_QUEUE", 1000))  # 대기 작업이 이보다 많으면 제출 거절
+
+# 계측(instrumentation) 설정
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"  # 모든 응답에 Server-Timing 헤더 (false 여도 요청 헤더 X-Server-Timing: 1 이면 추가)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"  # 요청별 샘플링 프로파일러 허용 여부 (?profile=true)
+PROFILE_INTERVAL_SEC = float(os.getenv("PROFILE_INTERVAL_SEC", 0.005))  # 스택 샘플링 간격 (초)
+
+# 백테스트 데이터 소스 설정
+DATA_SOURCE = os.getenv("DATA_SOURCE", "db")  # "db"(기본, Postgres) 또는 "parquet"(로컬 Parquet 저장소)
+PARQUET_STORE_DIR = os.getenv("PARQUET_STORE_DIR", "data/parquet")  # Parquet 저장소 루트 (종목/기간 파티션)
+BACKTEST_WARMUP_BARS = int(os.getenv("BACKTEST_WARMUP_BARS", 250))  # 구간(start) 백테스트에서 지표 워밍업용으로 더 읽는 최소 봉 수
+
+# 몬테카를로 / 부트스트랩 견고성 분석 설정
+ROBUSTNESS_MAX_PATHS = int(os.getenv("ROBUSTNESS_MAX_PATHS", 100000))  # 한 요청에서 만들 수 있는 최대 경로 수
+ROBUSTNESS_CHUNK_BYTES = int(os.getenv("ROBUSTNESS_CHUNK_BYTES", 64 * 1024 * 1024))  # 경로 묶음 하나가 쓰는 임시 메모리 상한 (바이트)
+
+# 종목 카탈로그 설정
+CATALOG_REFRESH_INTERVAL_SEC = float(os.getenv("CATALOG_REFRESH_INTERVAL_SEC", 30))  # 다른 프로세스의 수집을 반영하려고 stocks 를 다시 읽는 주기 (초)
+CATALOG_PAGE_MAX = int(os.getenv("CATALOG_PAGE_MAX", 500))  # /stocks/list 한 페이지 최대 항목 수
+
+# DB 커넥션 풀 / 데이터 접근 설정 (동기 engine, 비동기 engine 이 각각 이 크기의 풀을 가짐)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))  # 항상 유지하는 연결 수
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))  # 몰릴 때 잠깐 더 여는 연결 수
+DB_POOL_TIMEOUT_SEC = float(os.getenv("DB_POOL_TIMEOUT_SEC", 30))  # 풀이 가득 찼을 때 연결을 기다리는 시간 (초)
+DB_POOL_RECYCLE_SEC = int(os.getenv("DB_POOL_RECYCLE_SEC", 1800))  # 오래된 연결을 새로 여는 주기 (초)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 256))  # 비동기(asyncpg) 연결별 prepared statement 캐시 크기
+DB_STREAM_BATCH_ROWS = int(os.getenv("DB_STREAM_BATCH_ROWS", 50000))  # 서버 측 커서로 큰 조회를 나눠 받을 때 한 번에 받는 행 수
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", min(4, os.cpu_count() or 1)))  # 백테스트 같은 CPU 작업을 이벤트 루프 밖에서 돌리는 스레드 수
+
+# 백테스트 스트리밍 응답 설정
+BACKTEST_STREAM_BATCH_BARS = int(os.getenv("BACKTEST_STREAM_BATCH_BARS", 5000))  # NDJSON 응답에서 한 줄(배치)에 담는 봉 수
+
+# 서버 시작 설정 (새 인스턴스가 바로 요청을 받도록 무거운 작업은 기본적으로 끔)
+SCHEMA_SYNC_ON_STARTUP = os.getenv("SCHEMA_SYNC_ON_STARTUP", "true").lower() == "true"  # 시작 시 스키마 버전 확인 후 바뀌었을 때만 적용
+BOOT_INGEST_ENABLED = os.getenv("BOOT_INGEST_ENABLED", "false").lower() == "true"  # 시작 시 관심 종목 전체 수집 여부
+INGEST_PERIODIC_ENABLED = os.getenv("INGEST_PERIODIC_ENABLED", "false").lower() == "true"  # 주기 수집 실행 여부 (수집 전담 인스턴스에서만 켬)
+READYZ_DB_TIMEOUT_SEC = float(os.getenv("READYZ_DB_TIMEOUT_SEC", 2))  # /readyz 의 DB 확인 제한 시간 (초)
+
+# TimescaleDB 저장 정책 (청크 크기 / 압축은 migrations/timescale.sql)
+MARKET_DATA_1M_RETENTION_DAYS = int(os.getenv("MARKET_DATA_1M_RETENTION_DAYS", 365))  # 1분봉 보관 기간 (일, 0 이면 무기한), 지난 청크는 통째로 삭제
@@ -1,39 +1,200 @@
+import hashlib
 import os
-from sqlalchemy import create_engine, text
+import sys
+from sqlalchemy import create_engine, make_url, text
 
-# 1. DB 주소 설정 (환경변수에서 읽어오거나 기본값 사용)
-DB_URL = os.getenv("DB_DSN", "postgresql://user:password@db:5432/quant")
+from src.core.config import (
+    DB_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT_SEC, DB_POOL_RECYCLE_SEC, DB_STATEMENT_CACHE_SIZE,
+    MARKET_DATA_1M_RETENTION_DAYS,
+)
 
-# 2. 전역 engine 객체 생성
-engine = create_engine(DB_URL, pool_pre_ping=True)
+# 1. 커넥션 풀 설정 (동기 / 비동기 engine 공통)
+POOL_OPTIONS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT_SEC,
+    "pool_recycle": DB_POOL_RECYCLE_SEC,
+    "pool_pre_ping": True,
+}
 
-def init_db():
-    """파일에서 SQL을 읽어와 스키마를 동기화합니다."""
-    print("🛠️ Synchronizing database schema from migrations/schema.sql...")
-    
-    # 3. 경로 설정
-    project_root = os.getenv("PYTHONPATH", "/app")
-    sql_path = os.path.join(project_root, 'migrations', 'schema.sql')  
-    
+# 2. 전역 engine 객체 생성 (수집 / 작업 큐 워커 스레드 등 동기 코드용)
+engine = create_engine(DB_URL, **POOL_OPTIONS)
+
+# 3. 비동기 engine (API 이벤트 루프에서 직접 쓰는 조회용, 처음 쓸 때 생성)
+_async_engine = None
+
+
+def get_async_engine():
+    """
+    asyncpg 드라이버를 쓰는 비동기 engine 을 반환합니다.
+    asyncpg 는 같은 SQL 을 연결별로 prepare 해 두고 재사용하므로 (statement 캐시) 반복 조회의 파싱/계획 비용이 빠집니다.
+    """
+    global _async_engine
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        url = make_url(DB_URL).set(drivername="postgresql+asyncpg")
+        url = url.update_query_dict({"prepared_statement_cache_size": str(DB_STATEMENT_CACHE_SIZE)})
+        _async_engine = create_async_engine(url, **POOL_OPTIONS)
+    return _async_engine
+
+
+async def dispose_engines():
+    """서버 종료 시 두 풀의 연결을 모두 닫습니다."""
+    global _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+    engine.dispose()
+
+# 4. 스키마 버전 (migrations 파일 내용의 해시). 바뀌었을 때만 DDL 을 다시 적용
+SCHEMA_FILES = ("schema.sql", "timescale.sql", "continuous_aggregates.sql")
+# 여러 인스턴스가 동시에 떠도 DDL 은 한 곳에서만 돌도록 잡는 advisory lock 키
+SCHEMA_LOCK_KEY = 72210001
+
+
+def _project_root() -> str:
+    return os.getenv("PYTHONPATH", "/app")
+
+
+def schema_version(project_root: str = None) -> str:
+    # 저장 정책 설정값도 포함 (바꾸면 다음 시작 때 다시 적용됨)
+    digest = hashlib.sha256(f"retention_1m={MARKET_DATA_1M_RETENTION_DAYS}".encode())
+    for name in SCHEMA_FILES:
+        with open(os.path.join(project_root or _project_root(), 'migrations', name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def applied_schema_version(conn):
+    """DB에 마지막으로 적용된 스키마 버전 (아직 없으면 None)"""
+    if conn.execute(text("SELECT to_regclass('schema_version')")).scalar() is None:
+        return None
+    return conn.execute(text("SELECT version FROM schema_version WHERE id = 1")).scalar()
+
+
+def init_db(force: bool = False) -> bool:
+    """
+    파일에서 SQL을 읽어와 스키마를 동기화합니다.
+    DB에 기록된 스키마 버전이 migrations 파일과 같으면 아무것도 하지 않습니다. (force=True 면 다시 적용)
+    반환값: 실제로 적용했으면 True (실패하면 예외)
+    TimescaleDB 구문까지 모두 적용됐을 때만 버전을 기록하므로, 일부만 적용됐으면 다음 시작 때 다시 적용합니다.
+    """
+    project_root = _project_root()
     try:
-        with open(sql_path, 'r') as f:
-            schema_sql = f.read()
+        version = schema_version(project_root)
+    except FileNotFoundError as e:
+        print(f"❌ Error: migration file not found: {e.filename}")
+        raise
 
-        # 4. engine을 사용하여 SQL 실행
+    try:
         with engine.connect() as conn:
-            # text(schema_sql)은 전체를 하나의 구문으로 인식하므로 주의가 필요할 수 있습니다.
-            conn.execute(text(schema_sql))
-            
-            # TimescaleDB 하이퍼테이블 설정 (이미 존재하면 무시)
+            if not force and applied_schema_version(conn) == version:
+                print(f"✅ Database schema is up to date (version {version})")
+                return False
+
+            # 다른 인스턴스가 적용 중이면 끝날 때까지 기다렸다가 버전을 다시 확인
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
             try:
-                conn.execute(text("SELECT create_hypertable('market_data', 'time', if_not_exists => TRUE);"))
-            except Exception:
-                pass
-            
-            conn.commit()
-        print("✅ Database schema initialized successfully.")
-        
-    except FileNotFoundError:
-        print(f"❌ Error: schema.sql not found at {sql_path}")
+                if not force and applied_schema_version(conn) == version:
+                    print(f"✅ Database schema was applied by another instance (version {version})")
+                    return False
+                conn.commit()
+                if not _apply_schema(project_root):
+                    print(f"⚠️ Database schema applied partially: version {version} not recorded (retried on next start)")
+                    return True
+                conn.execute(text("""
+                    INSERT INTO schema_version (id, version, applied_at) VALUES (1, :version, now())
+                    ON CONFLICT (id) DO UPDATE SET version = EXCLUDED.version, applied_at = EXCLUDED.applied_at
+                """), {"version": version})
+                conn.commit()
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SCHEMA_LOCK_KEY})
+                conn.commit()
+        print(f"✅ Database schema initialized successfully (version {version}).")
+        return True
+
     except Exception as e:
-        print(f"❌ Error during init_db: {e}")
\ No newline at end of file
+        print(f"❌ Error during init_db: {e}")
+        raise
+
+def _apply_schema(project_root: str) -> bool:
+    """schema.sql → TimescaleDB 순으로 적용. 반환값: 모든 구문이 적용됐으면 True"""
+    print("🛠️ Synchronizing database schema from migrations/schema.sql...")
+    sql_path = os.path.join(project_root, 'migrations', 'schema.sql')
+    with open(sql_path, 'r') as f:
+        schema_sql = f.read()
+
+    # engine을 사용하여 SQL 실행
+    with engine.connect() as conn:
+        # text(schema_sql)은 전체를 하나의 구문으로 인식하므로 주의가 필요할 수 있습니다.
+        conn.execute(text(schema_sql))
+        conn.commit()
+
+    # 하이퍼테이블 / 압축 / 보관 정책 + 5m/15m/1h 연속 집계
+    return init_timescale(project_root)
+
+def _read_statements(project_root: str, name: str) -> list:
+    """migrations 파일을 구문(;) 단위로 나눕니다. ($$ 로 감싼 DO 블록 안의 ; 는 나누지 않음, 주석만 있는 조각은 제외)"""
+    with open(os.path.join(project_root, 'migrations', name), 'r') as f:
+        parts = f.read().split('$$')
+    chunks, current = [], ""
+    for i, part in enumerate(parts):
+        if i % 2:
+            current += f"$${part}$$"
+            continue
+        pieces = part.split(';')
+        current += pieces[0]
+        for piece in pieces[1:]:
+            chunks.append(current)
+            current = piece
+    chunks.append(current)
+    return [c.strip() for c in chunks
+            if any(line.strip() and not line.strip().startswith('--') for line in c.splitlines())]
+
+def _apply_statements(conn, project_root: str, name: str) -> bool:
+    """
+    구문을 하나씩 실행합니다. 다시 실행해도 되는지는 각 구문의 if_not_exists / IF NOT EXISTS 가드가 책임지고,
+    실패하면 거기서 멈추고 False 를 돌려줍니다. (AUTOCOMMIT 이라 앞서 성공한 구문은 그대로 남음)
+    """
+    for statement in _read_statements(project_root, name):
+        try:
+            conn.execute(text(statement))
+        except Exception as e:
+            print(f"❌ {name} statement failed: {e}")
+            return False
+    return True
+
+def init_timescale(project_root: str) -> bool:
+    """
+    migrations/timescale.sql 로 market_data / market_data_1m 을 하이퍼테이블(청크 크기, 압축 정책)로 만들고,
+    1분봉 보관 기간 정책(MARKET_DATA_1M_RETENTION_DAYS)과 continuous_aggregates.sql 의
+    연속 집계(5m/15m/1h) 및 갱신 정책을 구문 단위로 적용합니다.
+    반환값: 전부 적용됐으면 True, TimescaleDB 가 없거나 실패한 구문이 있으면 False
+    """
+    # 하이퍼테이블 / 연속 집계 DDL은 트랜잭션 밖에서 실행해야 하는 경우가 있어 AUTOCOMMIT 으로 하나씩 실행
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'timescaledb'")).scalar() is None:
+            print("⚠️ TimescaleDB extension not found: hypertables, policies and continuous aggregates skipped")
+            return False
+
+        if not _apply_statements(conn, project_root, 'timescale.sql'):
+            return False
+
+        # 보관 기간은 설정값이 바뀔 수 있으므로 지우고 다시 등록 (0 이면 무기한 보관)
+        try:
+            conn.execute(text("SELECT remove_retention_policy('market_data_1m', if_exists => TRUE)"))
+            if MARKET_DATA_1M_RETENTION_DAYS > 0:
+                conn.execute(text(
+                    "SELECT add_retention_policy('market_data_1m', drop_after => make_interval(days => :days))"
+                ), {"days": MARKET_DATA_1M_RETENTION_DAYS})
+        except Exception as e:
+            print(f"❌ market_data_1m retention policy failed: {e}")
+            return False
+
+        return _apply_statements(conn, project_root, 'continuous_aggregates.sql')
+
+
+if __name__ == "__main__":
+    # 배포 시 한 번만 스키마 적용: python -m src.core.database [--force]
+    init_db(force="--force" in sys.argv)
@@ -0,0 +1,47 @@
+import asyncio
+import threading
+import time
+
+from sqlalchemy import text
+
+from src.core.config import READYZ_DB_TIMEOUT_SEC
+from src.core.database import get_async_engine
+
+# 시작 단계 진행 상태 (스키마 확인 등이 끝나면 ready)
+_started_at = time.monotonic()
+_ready = threading.Event()
+_steps = {}
+_lock = threading.Lock()
+
+
+def record_step(name: str, status: str, detail: str = None):
+    """시작 단계 하나의 결과를 남깁니다. (status: "ok" | "skipped" | "error")"""
+    with _lock:
+        _steps[name] = {"status": status, "detail": detail, "at_sec": round(time.monotonic() - _started_at, 3)}
+
+
+def mark_ready():
+    _ready.set()
+    print(f"✅ [Startup] Ready to serve ({time.monotonic() - _started_at:.2f}s after start)")
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+def steps() -> dict:
+    with _lock:
+        return {name: dict(step) for name, step in _steps.items()}
+
+
+async def check_db(timeout: float = READYZ_DB_TIMEOUT_SEC):
+    """DB 에 SELECT 1 을 보내 봅니다. 반환값: (성공 여부, 오류 메시지)"""
+    async def ping():
+        async with get_async_engine().connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    try:
+        await asyncio.wait_for(ping(), timeout)
+        return True, None
+    except Exception as e:
+        return False, str(e) or type(e).__name__
@@ -0,0 +1,267 @@
+import contextvars
+import sys
+import threading
+import time
+import uuid
+from collections import Counter as _Tally, OrderedDict
+from contextlib import contextmanager
+
+# 지연 시간 히스토그램 버킷 (초)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+# ==========================================
+# 1. Prometheus 지표 (외부 라이브러리 없이 텍스트 포맷만 구현)
+# ==========================================
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{k}="{str(v)}"' for k, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name, self.help, self.labels = name, help_text, labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(labels.get(k, "") for k in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name, self.help, self.labels = name, help_text, labels
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series = {}  # labels -> [버킷별 개수, 합계, 개수]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(k, "") for k in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    le = f'le="{_format_value(bound)}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class Gauge:
+    """조회 시점에 fn() 을 불러 값을 읽는 게이지. fn 은 {라벨 값 튜플: 값} 또는 숫자 하나를 반환합니다."""
+
+    def __init__(self, name: str, help_text: str, fn, labels: tuple = ()):
+        self.name, self.help, self.labels, self.fn = name, help_text, labels, fn
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        try:
+            values = self.fn()
+        except Exception:
+            return lines
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in sorted(values.items()):
+            if value is not None:
+                lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.register(Histogram(
+    "engine_stage_duration_seconds", "Duration of each pipeline stage", ("pipeline", "stage")))
+STAGE_ROWS = registry.register(Counter(
+    "engine_stage_rows_total", "Rows processed by each pipeline stage", ("pipeline", "stage")))
+STAGE_BYTES = registry.register(Counter(
+    "engine_stage_bytes_total", "Bytes processed by each pipeline stage", ("pipeline", "stage")))
+HTTP_SECONDS = registry.register(Histogram(
+    "engine_http_request_duration_seconds", "HTTP request latency", ("method", "route", "status")))
+
+
+def register_gauge(name: str, help_text: str, fn, labels: tuple = ()):
+    return registry.register(Gauge(name, help_text, fn, labels))
+
+
+# ==========================================
+# 2. 단계별 타이머 (+ 요청 단위 Server-Timing 수집)
+# ==========================================
+
+# 현재 요청에서 측정된 단계 목록 (Server-Timing 헤더용). 요청 밖에서는 None
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def begin_request_timings() -> list:
+    timings = []
+    _request_timings.set(timings)
+    return timings
+
+
+@contextmanager
+def stage(pipeline: str, name: str):
+    """
+    with stage("backtest", "indicators"): ...
+    소요 시간을 히스토그램에 기록하고, 요청 안이면 Server-Timing 목록에도 추가합니다.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, pipeline=pipeline, stage=name)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((f"{pipeline}.{name}", elapsed))
+
+
+def record_rows(pipeline: str, name: str, rows: int, nbytes: int = None):
+    """단계에서 처리한 행 수 / 바이트 수를 누적합니다."""
+    STAGE_ROWS.inc(rows, pipeline=pipeline, stage=name)
+    if nbytes is not None:
+        STAGE_BYTES.inc(nbytes, pipeline=pipeline, stage=name)
+
+
+def frame_bytes(df) -> int:
+    """DataFrame 이 차지하는 메모리 (문자열 컬럼 내용은 제외한 얕은 값)"""
+    return int(df.memory_usage(index=False, deep=False).sum())
+
+
+def server_timing_header(timings: list) -> str:
+    """[(이름, 초)] → 'backtest.load;dur=1.2, backtest.indicators;dur=5.3' (ms)"""
+    totals = OrderedDict()
+    for name, seconds in timings:
+        totals[name] = totals.get(name, 0.0) + seconds
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in totals.items())
+
+
+# ==========================================
+# 3. 샘플링 프로파일러 (요청 단위로 켜는 훅)
+# ==========================================
+
+class SamplingProfiler:
+    """
+    대상 스레드의 호출 스택을 interval 초마다 찍어서 모읍니다. (sys._current_frames 사용)
+    결과는 flamegraph.pl / speedscope 가 읽는 'folded' 형식 (a;b;c 개수) 입니다.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005, max_depth: int = 64):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = _Tally()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+            frame = frame.f_back
+        if stack:
+            self.samples[";".join(reversed(stack))] += 1
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def folded(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common()) + "\n"
+
+
+# 최근 프로파일 결과 (id → folded 텍스트)
+_profiles = OrderedDict()
+_profiles_lock = threading.Lock()
+MAX_PROFILES = 20
+
+
+@contextmanager
+def profiled(enabled: bool, interval: float = 0.005):
+    """
+    enabled 이면 현재 스레드를 샘플링하고, 끝나면 결과를 보관한 뒤 id 를 넘겨줍니다.
+    with profiled(True) as handle: ...   →  handle["id"] 로 /debug/profiles/{id} 조회
+    """
+    handle = {"id": None}
+    if not enabled:
+        yield handle
+        return
+
+    profiler = SamplingProfiler(threading.get_ident(), interval=interval)
+    profiler.start()
+    try:
+        yield handle
+    finally:
+        profiler.stop()
+        profile_id = uuid.uuid4().hex[:12]
+        with _profiles_lock:
+            _profiles[profile_id] = profiler.folded()
+            while len(_profiles) > MAX_PROFILES:
+                _profiles.popitem(last=False)
+        handle["id"] = profile_id
+
+
+def get_profile(profile_id: str):
+    with _profiles_lock:
+        return _profiles.get(profile_id)
@@ -0,0 +1,114 @@
+from functools import lru_cache
+
+import pandas as pd
+from sqlalchemy import text
+
+from src.core.config import DB_STREAM_BATCH_ROWS
+from src.core.database import engine, get_async_engine
+
+# 조회를 허용하는 시세 테이블 (테이블 이름만은 바인딩할 수 없으므로 이 목록으로 제한)
+BAR_TABLE_NAMES = frozenset({"market_data", "market_data_1m", "market_data_5m", "market_data_15m", "market_data_1h"})
+BAR_SELECT = "time, open, high, low, close, volume"
+
+
+def _table(table: str) -> str:
+    if table not in BAR_TABLE_NAMES:
+        raise ValueError(f"Unknown bar table: {table}")
+    return table
+
+
+# ==========================================
+# 1. 자주 쓰는 조회문 (값은 모두 바인딩 파라미터, 문장 객체는 한 번만 만들어 재사용)
+# ==========================================
+# 같은 TextClause 객체를 재사용하므로 SQLAlchemy 컴파일 캐시에 바로 걸리고,
+# 비동기(asyncpg) 연결에서는 서버 측 prepared statement 로 캐시됩니다.
+
+@lru_cache(maxsize=None)
+def latest_time_query(table: str):
+    return text(f"SELECT max(time) FROM {_table(table)} WHERE symbol = :symbol")
+
+
+@lru_cache(maxsize=None)
+def bars_query(table: str, since: str = None):
+    """
+    종목 전체 봉 (since=None), 또는 :since 이후 봉 (since=">" 또는 ">=")
+    """
+    if since is None:
+        return text(f"SELECT {BAR_SELECT} FROM {_table(table)} WHERE symbol = :symbol ORDER BY time ASC")
+    if since not in (">", ">="):
+        raise ValueError(f"Unknown comparison: {since}")
+    return text(f"SELECT {BAR_SELECT} FROM {_table(table)} WHERE symbol = :symbol AND time {since} :since ORDER BY time ASC")
+
+
+@lru_cache(maxsize=None)
+def bars_range_query(table: str, with_start: bool, with_end: bool):
+    """
+    [:start, :end] 구간 봉. with_start 이면 구간 앞쪽 :warmup 봉도 함께 받습니다.
+    (time < start 를 역순으로 LIMIT → (symbol, time) 인덱스 한 번 탐색)
+    """
+    table = _table(table)
+    upper = " AND time <= :end" if with_end else ""
+    if not with_start:
+        return text(f"SELECT {BAR_SELECT} FROM {table} WHERE symbol = :symbol{upper} ORDER BY time ASC")
+    return text(
+        f"SELECT {BAR_SELECT} FROM ("
+        f"(SELECT {BAR_SELECT} FROM {table} WHERE symbol = :symbol AND time < :start ORDER BY time DESC LIMIT :warmup)"
+        f" UNION ALL "
+        f"(SELECT {BAR_SELECT} FROM {table} WHERE symbol = :symbol AND time >= :start{upper})"
+        f") bars ORDER BY time ASC"
+    )
+
+
+@lru_cache(maxsize=None)
+def bars_many_query(table: str, with_since: bool):
+    """여러 종목 봉 (symbol = ANY(:symbols)), with_since 이면 :since 이후만"""
+    since = " AND time > :since" if with_since else ""
+    return text(
+        f"SELECT time, symbol, open, high, low, close, volume FROM {_table(table)} "
+        f"WHERE symbol = ANY(:symbols){since} ORDER BY symbol, time ASC"
+    )
+
+
+# ==========================================
+# 2. 실행 (동기)
+# ==========================================
+
+def read_frame(query, params: dict = None) -> pd.DataFrame:
+    """한 번에 받아도 되는 크기의 조회 결과를 DataFrame 으로 (컬럼명은 소문자)"""
+    df = pd.read_sql(query, engine, params=params)
+    df.columns = [c.lower() for c in df.columns]
+    return df
+
+
+def stream_frames(query, params: dict = None, batch_rows: int = DB_STREAM_BATCH_ROWS):
+    """
+    서버 측 커서(named cursor)로 batch_rows 행씩 받아 DataFrame 조각을 차례로 내보냅니다.
+    1분봉 전체 이력처럼 큰 조회도 드라이버/파이썬 쪽에 전체 결과를 한꺼번에 올리지 않습니다.
+    """
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, max_row_buffer=batch_rows).execute(query, params or {})
+        columns = [c.lower() for c in result.keys()]
+        for rows in result.partitions(batch_rows):
+            yield pd.DataFrame.from_records(rows, columns=columns)
+
+
+def latest_bar_time(table: str, symbol: str):
+    """테이블에 저장된 종목의 마지막 봉 시각 (UTC Timestamp, 없으면 None)"""
+    with engine.connect() as conn:
+        latest = conn.execute(latest_time_query(table), {"symbol": symbol}).scalar()
+    if latest is None:
+        return None
+    latest = pd.Timestamp(latest)
+    return latest.tz_convert("UTC") if latest.tzinfo else latest.tz_localize("UTC")
+
+
+# ==========================================
+# 3. 실행 (비동기, API 이벤트 루프에서 스레드 없이 대기)
+# ==========================================
+
+async def aread_frame(query, params: dict = None) -> pd.DataFrame:
+    async with get_async_engine().connect() as conn:
+        result = await conn.execute(query, params or {})
+        columns = [c.lower() for c in result.keys()]
+        return pd.DataFrame.from_records(result.fetchall(), columns=columns)
+
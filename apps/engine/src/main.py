@@ -1,37 +1,91 @@
+import time
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from contextlib import asynccontextmanager
 import threading
-import time
+from concurrent.futures import wait
 
 # 모듈 가져오기
-from src.core.config import TARGET_TICKERS
-from src.service.ingest import save_to_db
-from src.service.ingest_1m import save_1m_to_db
+from src.core.config import (
+    TARGET_TICKERS, STREAM_WORKER_ENABLED, SERVER_TIMING_ENABLED,
+    SCHEMA_SYNC_ON_STARTUP, BOOT_INGEST_ENABLED, INGEST_PERIODIC_ENABLED, JOB_WORKERS_ENABLED,
+)
+from src.core.metrics import HTTP_SECONDS, begin_request_timings, server_timing_header
+from src.service.scheduler import ingest_scheduler
+from src.service.streaming import start_signal_worker
+from src.service.jobs import job_manager
 from src.api.routes import router
-from src.core.database import init_db
+from src.core.database import init_db, dispose_engines
+from src.core.concurrency import cpu_executor
+from src.core.health import record_step, mark_ready
+from src.service.catalog import backfill_stats
+
+def run_startup():
+    """
+    서버 시작 후 백그라운드에서 도는 준비 작업.
+    스키마는 버전이 바뀌었을 때만 적용하고, 관심 종목 전체 수집은 BOOT_INGEST_ENABLED 일 때만 합니다.
+    (요청은 이 작업과 상관없이 바로 받음, /readyz 는 스키마 확인이 끝난 뒤부터 200)
+    """
+    print("🚀 [Startup] Preparing engine...")
+    if SCHEMA_SYNC_ON_STARTUP:
+        # DB 가 아직 안 떴을 수 있으므로 될 때까지 재시도 (그동안 /readyz 는 503)
+        delay = 1.0
+        while True:
+            try:
+                applied = init_db()
+                record_step("schema", "ok", "applied" if applied else "up to date")
+                break
+            except Exception as e:
+                record_step("schema", "error", str(e))
+                time.sleep(delay)
+                delay = min(delay * 2, 30.0)
+    else:
+        record_step("schema", "skipped")
+
+    # 종목 카탈로그 통계가 비어 있는 종목만 한 번 집계 (이후로는 수집할 때마다 갱신)
+    try:
+        backfill_stats(TARGET_TICKERS)
+        record_step("catalog", "ok")
+    except Exception as e:
+        print(f"⚠️ [Startup] Catalog backfill failed: {e}")
+        record_step("catalog", "error", str(e))
+
+    mark_ready()
 
-def run_initial_ingestion():
-    """서버 시작 시 데이터 수집을 수행하는 함수"""
-    print("🚀 [Startup] Initial Data Ingestion Started...")
-    init_db() # 테이블 생성
-    
-    for ticker in TARGET_TICKERS:
-        save_to_db(ticker)    # 일봉 데이터 수집
-        save_1m_to_db(ticker) # 1분봉 데이터 수집
-        
-        time.sleep(1.5)
+    # 주기 수집 (1분봉: N분마다, 일봉: 장 마감 후 하루 한 번). 수집 전담 인스턴스에서만 INGEST_PERIODIC_ENABLED=true
+    if INGEST_PERIODIC_ENABLED:
+        ingest_scheduler.start_periodic(TARGET_TICKERS)
 
-    print("✅ [Startup] Ingestion Completed. Ready to serve!")
+    # 실시간 시그널 워커 (market_data 구독 → trade_signal 발행)
+    if STREAM_WORKER_ENABLED:
+        start_signal_worker(TARGET_TICKERS)
+
+    if BOOT_INGEST_ENABLED:
+        # 종목별 수집을 스케줄러 워커 풀에 동시에 넣음 (속도 제한/재시도는 스케줄러가 담당)
+        print("📥 [Startup] Boot ingestion started...")
+        futures = ingest_scheduler.submit_all("1d", TARGET_TICKERS)    # 일봉 데이터 수집
+        futures += ingest_scheduler.submit_all("1m", TARGET_TICKERS)   # 1분봉 데이터 수집
+        wait(futures)
+        record_step("boot_ingest", "ok")
+        print("✅ [Startup] Boot ingestion completed.")
+    else:
+        record_step("boot_ingest", "skipped")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 1. 서버 시작 전 실행할 로직
-    # 데이터 수집이 오래 걸리므로 별도 스레드에서 실행 (서버 블로킹 방지)
-    threading.Thread(target=run_initial_ingestion).start()
+    # 스키마 확인 / 수집이 오래 걸릴 수 있으므로 별도 스레드에서 실행 (서버 블로킹 방지)
+    threading.Thread(target=run_startup, name="startup", daemon=True).start()
+    # 백테스트 작업 큐 워커 (Redis 백엔드면 다른 인스턴스가 넣은 작업, 재시작 전에 남은 작업도 꺼내 실행)
+    if JOB_WORKERS_ENABLED:
+        job_manager.start_workers()
     yield
 
     # 2. 서버 종료 시 실행할 로직 (필요하면 추가)
+    ingest_scheduler.shutdown()
+    job_manager.shutdown()
+    cpu_executor.shutdown(wait=False, cancel_futures=True)
+    await dispose_engines()
     print("👋 Quant Engine Shutting Down...")
 
 # FastAPI 앱 생성
@@ -40,6 +94,22 @@ app = FastAPI(lifespan=lifespan)
 # API 라우터 등록
 app.include_router(router)
 
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    """요청 지연 시간을 히스토그램에 기록하고, 요청 중 측정된 단계들을 Server-Timing 헤더로 내보냅니다."""
+    timings = begin_request_timings()
+    started = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+
+    route = request.scope.get("route")
+    HTTP_SECONDS.observe(elapsed, method=request.method, route=getattr(route, "path", "unmatched"), status=response.status_code)
+
+    if SERVER_TIMING_ENABLED or request.headers.get("x-server-timing") == "1":
+        timings.append(("total", elapsed))
+        response.headers["Server-Timing"] = server_timing_header(timings)
+    return response
+
 if __name__ == "__main__":
     print("🔥 Starting Quant Engine API Server...")
     # Docker에서 접속 가능하게 0.0.0.0 설정
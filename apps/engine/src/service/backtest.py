@@ -1,187 +1,307 @@
 import pandas as pd
 import numpy as np
-import pandas_ta_classic as ta
-from src.core.database import engine
+from src.core.config import BACKTEST_WARMUP_BARS, BACKTEST_STREAM_BATCH_BARS
+from src.core.metrics import stage, record_rows, frame_bytes
+from src.service.bar_store import to_utc
+from src.service.catalog import symbol_catalog
+from src.service.data_source import BACKTEST_COLUMNS, get_data_source
+from src.service.signals import compute_positions
+from src.service.indicator_cache import indicator_cache, series_to_arrays
+from src.service.serialization import LAYOUTS, build_columns, columns_to_rows, downsample_indices, display_keys, format_times
 
-def calculate_strategy(ticker: str, params: dict):
-    # ==========================================
-    # 1. 데이터 로드 (Data Loading)
-    # ==========================================
-    query = f"SELECT time, open, high, low, close, volume FROM market_data WHERE symbol = '{ticker}' ORDER BY time ASC"
-    df = pd.read_sql(query, engine)
-    
-    if df.empty:
-        return {"error": "No data"}
+def load_market_data(ticker: str, timeframe: str = "1d", source: str = None,
+                     start=None, end=None, warmup: int = 0) -> pd.DataFrame:
+    """
+    종목의 OHLCV를 시간순으로 반환합니다. (timeframe: 1m / 5m / 15m / 1h / 1d)
+    source="db"(기본)는 인메모리 저장소(bar_store)에서 읽으므로 DB에는 마지막 봉 이후의 새 행만 조회합니다.
+    5m/15m/1h 는 DB의 연속 집계에서 읽으므로 엔진에서 분봉을 다시 묶지 않습니다.
+    source="parquet" 는 로컬 Parquet 저장소에서 백테스트에 필요한 컬럼(time, close)만 읽습니다.
+    start/end 를 주면 그 구간과 앞쪽 warmup 봉만 조회합니다.
+    DB 소스는 종목 카탈로그로 모르는 종목 / 봉이 없는 종목을 먼저 거절합니다. (ValueError)
+    """
+    data_source = get_data_source(source)
+    if data_source.name == "db":
+        symbol_catalog.require(ticker, timeframe)
+    return data_source.load(ticker, timeframe, start=start, end=end, columns=BACKTEST_COLUMNS, warmup=warmup)
 
-    df.columns = [c.lower() for c in df.columns]
-    df['time'] = pd.to_datetime(df['time'])
+def warmup_bars(params: dict) -> int:
+    """
+    구간 백테스트에서 start 앞쪽으로 더 읽을 봉 수.
+    가장 긴 지표 기간의 5배 (RSI/MACD 의 지수 평활 초기값 영향이 사라지도록), 최소 BACKTEST_WARMUP_BARS.
+    """
+    longest = max(
+        int(params.get('sma_short', 5)),
+        int(params.get('sma_long', 20)),
+        14,  # RSI
+        int(params.get('macd_slow', 26)) + int(params.get('macd_sig', 9)),
+        int(params.get('bb_window', 20)),
+    )
+    return max(BACKTEST_WARMUP_BARS, longest * 5)
+
+def _indicator(df: pd.DataFrame, symbol: str, timeframe: str, name: str, key_params: tuple, compute):
+    """
+    지표 하나를 계산해 {컬럼명: 배열} 로 돌려줍니다.
+    symbol이 주어지면 (종목, 타임프레임, 지표, 파라미터, 마지막 봉 시각/개수) 키로 캐시를 거칩니다.
+    """
+    if symbol is None:
+        return compute()
+
+    version = (df['time'].iloc[-1], len(df))
+    key = (symbol, timeframe, name, key_params, version)
+    return indicator_cache.get_or_compute(key, compute)
+
+def add_indicators(df: pd.DataFrame, params: dict, symbol: str = None, timeframe: str = "1d") -> pd.DataFrame:
+    """
+    SMA / RSI / MACD / Bollinger Bands 지표 컬럼을 df에 추가합니다.
+    (enable_* 플래그나 rsi_buy_k만 바뀐 요청은 캐시 히트로 지표 계산을 건너뜀)
+    """
+    import pandas_ta_classic as ta  # 첫 백테스트 때 가져옴 (서버 시작 시간 단축)
+
+    close = df['close']
 
-    # ==========================================
-    # 2. 지표 계산 (Indicators Calculation)
-    # ==========================================
-    
     # (1) SMA (이동평균선)
-    # pandas_ta는 결과가 Series로 나오므로 바로 할당
-    df['sma_s'] = ta.sma(df['close'], length=int(params.get('sma_short', 5)))
-    df['sma_l'] = ta.sma(df['close'], length=int(params.get('sma_long', 20)))
-    
+    sma_short = int(params.get('sma_short', 5))
+    sma_long = int(params.get('sma_long', 20))
+    sma_s = _indicator(df, symbol, timeframe, 'sma', (sma_short,),
+                       lambda: series_to_arrays(sma=ta.sma(close, length=sma_short)))
+    sma_l = _indicator(df, symbol, timeframe, 'sma', (sma_long,),
+                       lambda: series_to_arrays(sma=ta.sma(close, length=sma_long)))
+    df['sma_s'] = sma_s['sma']
+    df['sma_l'] = sma_l['sma']
+
     # (2) RSI (상대강도지수)
-    df['rsi'] = ta.rsi(df['close'], length=14)
-    
+    rsi = _indicator(df, symbol, timeframe, 'rsi', (14,),
+                     lambda: series_to_arrays(rsi=ta.rsi(close, length=14)))
+    df['rsi'] = rsi['rsi']
+
     # (3) MACD (이동평균 수렴확산)
-    # macd()는 DataFrame을 반환: [MACD_fast_slow_signal, MACDh_..., MACDs_...]
-    macd_df = ta.macd(
-        df['close'], 
-        fast=int(params.get('macd_fast', 12)), 
-        slow=int(params.get('macd_slow', 26)), 
-        signal=int(params.get('macd_sig', 9))
-    )
-    # pandas_ta 반환 컬럼명은 동적이므로 iloc로 안전하게 가져옴
-    if macd_df is not None:
-        df['macd'] = macd_df.iloc[:, 0]    # MACD Line
-        df['macd_h'] = macd_df.iloc[:, 1]  # Histogram
-        df['macd_s'] = macd_df.iloc[:, 2]  # Signal Line
+    macd_key = (int(params.get('macd_fast', 12)), int(params.get('macd_slow', 26)), int(params.get('macd_sig', 9)))
+
+    def compute_macd():
+        # macd()는 DataFrame을 반환: [MACD_fast_slow_signal, MACDh_..., MACDs_...]
+        macd_df = ta.macd(close, fast=macd_key[0], slow=macd_key[1], signal=macd_key[2])
+        if macd_df is None:
+            return None
+        # pandas_ta 반환 컬럼명은 동적이므로 iloc로 안전하게 가져옴
+        return series_to_arrays(
+            macd=macd_df.iloc[:, 0],    # MACD Line
+            macd_h=macd_df.iloc[:, 1],  # Histogram
+            macd_s=macd_df.iloc[:, 2],  # Signal Line
+        )
+
+    macd = _indicator(df, symbol, timeframe, 'macd', macd_key, compute_macd)
+    if macd is not None:
+        df['macd'] = macd['macd']
+        df['macd_h'] = macd['macd_h']
+        df['macd_s'] = macd['macd_s']
     else:
         df['macd'] = df['macd_h'] = df['macd_s'] = None
 
     # (4) Bollinger Bands (볼린저 밴드)
-    bb_df = ta.bbands(
-        df['close'], 
-        length=int(params.get('bb_window', 20)), 
-        std=float(params.get('bb_std', 2.0))
-    )
-    if bb_df is not None:
-        df['bb_l'] = bb_df.iloc[:, 0]  # Lower
-        df['bb_m'] = bb_df.iloc[:, 1]  # Middle
-        df['bb_u'] = bb_df.iloc[:, 2]  # Upper
+    bb_key = (int(params.get('bb_window', 20)), float(params.get('bb_std', 2.0)))
+
+    def compute_bb():
+        bb_df = ta.bbands(close, length=bb_key[0], std=bb_key[1])
+        if bb_df is None:
+            return None
+        return series_to_arrays(
+            bb_l=bb_df.iloc[:, 0],  # Lower
+            bb_m=bb_df.iloc[:, 1],  # Middle
+            bb_u=bb_df.iloc[:, 2],  # Upper
+        )
+
+    bb = _indicator(df, symbol, timeframe, 'bbands', bb_key, compute_bb)
+    if bb is not None:
+        df['bb_l'] = bb['bb_l']
+        df['bb_m'] = bb['bb_m']
+        df['bb_u'] = bb['bb_u']
     else:
         df['bb_l'] = df['bb_m'] = df['bb_u'] = None
 
-    # ==========================================
-    # 3. 핵심 로직: 동적 전략 적용 (Dynamic Strategy)
-    # ==========================================
-    
-    # 사용자가 켠 전략 플래그 가져오기 (기본값 True/False 설정 주의)
-    use_sma = params.get('enable_sma', True)
-    use_rsi = params.get('enable_rsi', True)
-    use_macd = params.get('enable_macd', False)
-    use_bb = params.get('enable_bb', False)
-
-    position = 0  # 0: 현금, 1: 보유
-    signals = []
-
-    for i in range(len(df)):
-        # 데이터가 충분치 않은 초반 구간(NaN)은 패스
-        if pd.isna(df['sma_l'].iloc[i]) or pd.isna(df['macd_s'].iloc[i]) or pd.isna(df['bb_u'].iloc[i]):
-            signals.append(0)
-            continue
-
-        row = df.iloc[i]
-        
-        # 🟢 매수 검증 (Buy Validation)
-        # 기본적으로 '매수 가능' 상태로 시작하고, 켜져 있는 지표들이 '반대'하면 매수 취소
-        buy_vote = True  
-        
-        # 🔴 매도 검증 (Sell Trigger)
-        # 켜져 있는 지표 중 하나라도 '팔아라' 하면 매도
-        sell_vote = False 
-
-        # --- [1] SMA 로직 ---
-        if use_sma:
-            # 단기가 장기보다 아래면 매수 금지 (역배열)
-            if row['sma_s'] <= row['sma_l']: 
-                buy_vote = False
-            # 단기가 장기 아래로 뚫으면 매도 (데드크로스)
-            if row['sma_s'] < row['sma_l']: 
-                sell_vote = True
-
-        # --- [2] RSI 로직 ---
-        if use_rsi:
-            # 과열 구간(예: 60이상)이면 매수 금지 (너무 비쌀 때 안 삼)
-            if row['rsi'] >= params.get('rsi_buy_k', 60):
-                buy_vote = False
-            # (옵션) RSI가 너무 높으면(예: 80) 이익 실현 매도 로직 추가 가능
-
-        # --- [3] MACD 로직 ---
-        if use_macd:
-            # MACD가 시그널 선 아래면 매수 금지 (하락 모멘텀)
-            if row['macd'] <= row['macd_s']:
-                buy_vote = False
-            # 데드크로스(하향 돌파) 시 매도
-            if row['macd'] < row['macd_s']:
-                sell_vote = True
-
-        # --- [4] Bollinger Bands 로직 ---
-        if use_bb:
-            # 가격이 밴드 상단을 뚫으면 '과매수'로 보고 매도 (이익 실현)
-            if row['close'] > row['bb_u']:
-                sell_vote = True
-            # (옵션) 밴드 중심선보다 아래일 때만 저점 매수 하겠다... 등의 로직 가능
-            # 여기서는 밴드 상단 돌파 시 매도 로직만 적용
-        
-        # 🛡️ 안전장치: 아무 전략도 안 켰으면 매매 안 함
-        if not (use_sma or use_rsi or use_macd or use_bb):
-            buy_vote = False
-            sell_vote = False
-
-        # --- 포지션 결정 ---
-        if position == 0:
-            if buy_vote:
-                position = 1
-        elif position == 1:
-            if sell_vote:
-                position = 0
-        
-        signals.append(position)
-
-    # 길이 맞추기 (앞부분 NaN으로 스킵된 구간 0 채움)
-    signals = [0] * (len(df) - len(signals)) + signals
-    df['position'] = signals
-
-    # 포지션 변화 감지 (1.0: 매수, -1.0: 매도)
-    df['trade_signal'] = df['position'].diff()
+    return df
 
-    # ==========================================
-    # 4. 수익률 계산 및 결과 포장
-    # ==========================================
-    df['pct_change'] = df['close'].pct_change().shift(-1)
-    df['strategy_return'] = df['pct_change'] * df['position']
-    df['cum_ret'] = (1 + df['strategy_return'].fillna(0)).cumprod()
-
-    # UI 표시용 데이터 정제
-    df['time_str'] = df['time'].dt.strftime('%Y-%m-%d')
-    # 중복 제거 (하루에 데이터가 여러 개일 경우 마지막 값 사용)
-    df_clean = df.drop_duplicates(subset=['time_str'], keep='last').copy()
-
-    results = []
-    for _, row in df_clean.iterrows():
-        action = None
-        if row['trade_signal'] == 1.0: action = 'buy'
-        elif row['trade_signal'] == -1.0: action = 'sell'
-
-        results.append({
-            "time": row['time_str'],
-            "value": round(float(row['cum_ret']), 4) if not pd.isna(row['cum_ret']) else 1.0,
-            
-            # 차트에 그릴 지표 데이터들 (NaN이면 None으로)
-            "sma_s": round(float(row['sma_s']), 2) if not pd.isna(row['sma_s']) else None,
-            "sma_l": round(float(row['sma_l']), 2) if not pd.isna(row['sma_l']) else None,
-            "rsi": round(float(row['rsi']), 2) if not pd.isna(row['rsi']) else None,
-            "macd": round(float(row['macd']), 2) if not pd.isna(row['macd']) else None,
-            "macd_h": round(float(row['macd_h']), 2) if not pd.isna(row['macd_h']) else None,
-            "bb_u": round(float(row['bb_u']), 2) if not pd.isna(row['bb_u']) else None,
-            "bb_m": round(float(row['bb_m']), 2) if not pd.isna(row['bb_m']) else None,
-            "bb_l": round(float(row['bb_l']), 2) if not pd.isna(row['bb_l']) else None,
-
-            "action": action
-        })
+def run_backtest(df: pd.DataFrame, params: dict, signal_mode: str = "vectorized",
+                 symbol: str = None, timeframe: str = "1d") -> pd.DataFrame:
+    """
+    지표 계산 → 포지션 결정 → 수익률 계산까지 수행한 df를 반환합니다.
+    (입력 df는 건드리지 않으므로 같은 원본으로 여러 파라미터를 돌릴 수 있음)
+    symbol을 넘기면 지표 캐시를 사용합니다.
+    """
+    # 얕은 복사: 원본(저장소 뷰)은 그대로 두고 지표 컬럼만 새로 붙임
+    with stage("backtest", "indicators"):
+        df = add_indicators(df.copy(deep=False), params, symbol=symbol, timeframe=timeframe)
+
+    # 켜진 지표들의 매수 반대(veto) / 매도 트리거를 마스크로 만들고
+    # 진입/청산 상태 머신을 배열 연산으로 한 번에 풉니다. (signal_mode="loop" 이면 기존 루프)
+    with stage("backtest", "signals"):
+        df['position'] = compute_positions(df, params, mode=signal_mode)
+
+        # 포지션 변화 감지 (1.0: 매수, -1.0: 매도)
+        df['trade_signal'] = df['position'].diff()
+
+    # 수익률 계산
+    with stage("backtest", "returns"):
+        df['pct_change'] = df['close'].pct_change().shift(-1)
+        df['strategy_return'] = df['pct_change'] * df['position']
+        df['cum_ret'] = (1 + df['strategy_return'].fillna(0)).cumprod()
+    return df
+
+def _clean_results(df: pd.DataFrame, timeframe: str, max_points: int = None) -> tuple:
+    """
+    표시 시각 중복 제거 + (max_points 가 있으면) 다운샘플링.
+    반환값: (내려줄 df, 원래 봉 수, 최종 수익률)
+    """
+    # 중복 제거 (같은 표시 시각에 데이터가 여러 개일 경우 마지막 값 사용)
+    # 표시 문자열(time_str)은 내려줄 봉에만 나중에 만듦
+    duplicated = pd.Series(display_keys(df['time'], timeframe)).duplicated(keep='last').to_numpy()
+    df_clean = df[~duplicated] if duplicated.any() else df
+    total_points = len(df_clean)
 
     final_return = 0.0
     if not df_clean.empty:
         final_return = round((df_clean['cum_ret'].iloc[-1] - 1) * 100, 2)
 
-    return {
+    if max_points is not None:
+        if max_points < 3:
+            raise ValueError("max_points must be >= 3")
+        if total_points > max_points:
+            value = df_clean['cum_ret'].fillna(1.0).to_numpy(dtype=float)
+            actions = df_clean['trade_signal'].isin((1.0, -1.0)).to_numpy()
+            df_clean = df_clean.iloc[downsample_indices(value, actions, max_points)]
+
+    return df_clean, total_points, final_return
+
+def package_results(ticker: str, df: pd.DataFrame, layout: str = "rows", timeframe: str = "1d",
+                    max_points: int = None) -> dict:
+    """
+    백테스트 결과 df를 UI(차트)용 응답 형태로 포장합니다.
+    layout="rows" 는 봉마다 딕셔너리(기존 형식), "columns" 는 필드마다 배열 하나.
+    일봉은 날짜, 분/시간봉은 시각까지 time 으로 내려줍니다.
+    max_points 가 있으면 누적 수익률 곡선 기준 LTTB 로 봉을 줄여서 내려줍니다. (매수/매도 봉은 항상 포함)
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout: {layout} (expected one of {LAYOUTS})")
+
+    df_clean, total_points, final_return = _clean_results(df, timeframe, max_points)
+
+    # UI 표시용 시각 + 반올림 / NaN→None / 매매 액션 매핑을 컬럼 단위로 처리
+    columns = build_columns(df_clean.assign(time_str=format_times(df_clean['time'], timeframe)))
+
+    if layout == "columns":
+        result = {
+            "ticker": ticker,
+            "timeframe": timeframe,
+            "format": "columns",
+            "columns": columns,
+            "final_return": final_return
+        }
+    else:
+        result = {
+            "ticker": ticker,
+            "timeframe": timeframe,
+            "results": columns_to_rows(columns),
+            "final_return": final_return
+        }
+
+    # 줄였으면 원래 봉 수도 알려줌
+    if len(df_clean) < total_points:
+        result["total_points"] = total_points
+    return result
+
+def stream_results(ticker: str, df: pd.DataFrame, layout: str = "rows", timeframe: str = "1d",
+                   max_points: int = None, batch_bars: int = BACKTEST_STREAM_BATCH_BARS):
+    """
+    package_results 의 스트리밍 버전. 메시지(dict)를 차례로 내보내는 제너레이터입니다.
+    - {"type": "meta", ticker, timeframe, format, points, total_points}
+    - {"type": "bars", "results": [...]} 또는 {"type": "bars", "columns": {...}}  (batch_bars 봉씩)
+    - {"type": "summary", final_return, max_drawdown, trade_count}
+    봉은 batch_bars 개씩만 파이썬 객체로 바꾸므로 응답 크기와 상관없이 메모리가 일정합니다.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout: {layout} (expected one of {LAYOUTS})")
+    if batch_bars < 1:
+        raise ValueError("batch_bars must be >= 1")
+
+    df_clean, total_points, final_return = _clean_results(df, timeframe, max_points)
+    yield {
+        "type": "meta",
         "ticker": ticker,
-        "results": results,
-        "final_return": final_return
-    }
\ No newline at end of file
+        "timeframe": timeframe,
+        "format": layout,
+        "points": len(df_clean),
+        "total_points": total_points,
+    }
+
+    for start in range(0, len(df_clean), batch_bars):
+        with stage("backtest", "package"):
+            part = df_clean.iloc[start:start + batch_bars]
+            columns = build_columns(part.assign(time_str=format_times(part['time'], timeframe)))
+            batch = {"type": "bars", "columns": columns} if layout == "columns" else {"type": "bars", "results": columns_to_rows(columns)}
+        record_rows("backtest", "package", len(columns["time"]))
+        yield batch
+
+    # 요약 지표는 줄이기 전 전체 봉 기준
+    summary = summarize_backtest(df)
+    summary["final_return"] = final_return
+    yield {"type": "summary", **summary}
+
+def summarize_backtest(df: pd.DataFrame) -> dict:
+    """결과 배열 없이 요약 지표(최종 수익률, 최대 낙폭, 매매 횟수)만 계산합니다."""
+    if df.empty:
+        return {"final_return": 0.0, "max_drawdown": 0.0, "trade_count": 0}
+
+    cum_ret = df['cum_ret'].to_numpy(dtype=float)
+    drawdown = cum_ret / np.maximum.accumulate(cum_ret) - 1
+
+    return {
+        # package_results와 같은 값 (마지막 봉의 누적 수익률)
+        "final_return": float(round((cum_ret[-1] - 1) * 100, 2)),
+        "max_drawdown": round(float(drawdown.min()) * 100, 2),
+        # 진입(매수) 횟수
+        "trade_count": int((df['trade_signal'] == 1.0).sum()),
+    }
+
+def prepare_strategy(ticker: str, params: dict, signal_mode: str = "vectorized", timeframe: str = "1d",
+                     source: str = None, start=None, end=None):
+    """데이터 로드 → 지표 → 포지션 → 수익률까지 계산한 df 를 반환합니다. (데이터가 없으면 None)"""
+    # ==========================================
+    # 1. 데이터 로드 (Data Loading)
+    # ==========================================
+    # start/end 는 SQL 조건으로 내려가고, 지표가 start 시점에 이미 안정돼 있도록 앞쪽 봉을 더 읽음
+    warmup = warmup_bars(params) if start is not None else 0
+    with stage("backtest", "load"):
+        df = load_market_data(ticker, timeframe, source, start=start, end=end, warmup=warmup)
+    record_rows("backtest", "load", len(df), frame_bytes(df))
+
+    if df.empty:
+        return None
+
+    # ==========================================
+    # 2. 지표 계산 + 3. 동적 전략 적용 (Indicators & Strategy)
+    # ==========================================
+    df = run_backtest(df, params, signal_mode=signal_mode, symbol=ticker, timeframe=timeframe)
+
+    if start is not None:
+        # 워밍업 구간은 잘라내고 누적 수익률은 start 부터 다시 계산
+        df = df[(df['time'] >= to_utc(start)).to_numpy()].reset_index(drop=True)
+        if df.empty:
+            return None
+        # 워밍업 중에 진입해 start 에 이미 보유 중이면 첫 봉을 매수로 표시 (차트 / 매매 횟수 / 다운샘플링이 진입을 놓치지 않도록)
+        if df['position'].iloc[0] == 1:
+            df.loc[0, 'trade_signal'] = 1.0
+        df['cum_ret'] = (1 + df['strategy_return'].fillna(0)).cumprod()
+    return df
+
+def calculate_strategy(ticker: str, params: dict, signal_mode: str = "vectorized", layout: str = "rows",
+                       timeframe: str = "1d", source: str = None, start=None, end=None, max_points: int = None):
+    df = prepare_strategy(ticker, params, signal_mode, timeframe, source, start, end)
+    if df is None:
+        return {"error": "No data"}
+
+    # ==========================================
+    # 4. 결과 포장
+    # ==========================================
+    with stage("backtest", "package"):
+        result = package_results(ticker, df, layout=layout, timeframe=timeframe, max_points=max_points)
+    record_rows("backtest", "package", len(result["columns"]["time"] if layout == "columns" else result["results"]))
+    return result
@@ -0,0 +1,364 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from src.core.config import BAR_STORE_MAX_BYTES, BAR_STORE_REFRESH_INTERVAL_SEC
+from src.core.queries import bars_query, bars_range_query, bars_many_query, read_frame, stream_frames
+from src.core.metrics import stage, record_rows, frame_bytes
+
+# 타임프레임별 원본 테이블
+# 5m/15m/1h 는 market_data_1m 을 time_bucket 으로 묶은 TimescaleDB 연속 집계(continuous aggregate)
+BAR_TABLES = {
+    "1m": "market_data_1m",
+    "5m": "market_data_5m",
+    "15m": "market_data_15m",
+    "1h": "market_data_1h",
+    "1d": "market_data",
+}
+
+# 연속 집계 타임프레임별 버킷 크기 (마지막 버킷은 아직 채워지는 중일 수 있음)
+ROLLUP_BUCKETS = {
+    "5m": pd.Timedelta(minutes=5),
+    "15m": pd.Timedelta(minutes=15),
+    "1h": pd.Timedelta(hours=1),
+}
+
+PRICE_COLUMNS = ("open", "high", "low", "close", "volume")
+
+
+def to_utc(ts):
+    """문자열 / datetime / Timestamp → tz-aware UTC Timestamp (None 은 그대로)"""
+    if ts is None:
+        return None
+    ts = pd.Timestamp(ts)
+    return ts.tz_convert("UTC") if ts.tzinfo else ts.tz_localize("UTC")
+
+
+def slice_range(df: pd.DataFrame, start=None, end=None, warmup: int = 0) -> pd.DataFrame:
+    """
+    시간순 df에서 [start, end] 구간과 그 앞의 warmup 봉만 남깁니다.
+    (time 이 정렬돼 있으므로 이진 탐색)
+    """
+    if start is None and end is None:
+        return df
+    times = df["time"]
+    lo = int(times.searchsorted(to_utc(start), side="left")) if start is not None else 0
+    hi = int(times.searchsorted(to_utc(end), side="right")) if end is not None else len(df)
+    return df.iloc[max(0, lo - warmup):hi]
+
+
+class SymbolBars:
+    """
+    한 종목(+타임프레임)의 OHLCV를 연속된 NumPy 배열로 보관합니다.
+
+    - time: UTC 기준 datetime64[ns], 나머지는 float64
+    - 배열은 여유 용량(capacity)을 두고 뒤에 이어 붙이므로 증분 추가가 O(추가 행 수) 입니다.
+    - 이미 내보낸 뷰([:size])는 이후 추가/재할당의 영향을 받지 않습니다.
+    """
+
+    def __init__(self):
+        self.size = 0
+        self.time = np.empty(0, dtype="datetime64[ns]")
+        self.columns = {name: np.empty(0, dtype=float) for name in PRICE_COLUMNS}
+        self.last_refresh = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        return self.time.nbytes + sum(arr.nbytes for arr in self.columns.values())
+
+    @property
+    def last_time(self):
+        return self.time[self.size - 1] if self.size else None
+
+    @property
+    def first_time(self):
+        return self.time[0] if self.size else None
+
+    def _reserve(self, needed: int):
+        if needed <= len(self.time):
+            return
+        capacity = max(needed, len(self.time) * 2, 1024)
+
+        new_time = np.empty(capacity, dtype="datetime64[ns]")
+        new_time[:self.size] = self.time[:self.size]
+        self.time = new_time
+
+        for name, arr in self.columns.items():
+            new_arr = np.empty(capacity, dtype=float)
+            new_arr[:self.size] = arr[:self.size]
+            self.columns[name] = new_arr
+
+    def append(self, rows: pd.DataFrame):
+        """시간순으로 정렬된 새 봉들을 뒤에 붙입니다."""
+        n = len(rows)
+        if n == 0:
+            return
+        self._reserve(self.size + n)
+
+        times = pd.to_datetime(rows["time"], utc=True).dt.tz_convert(None)
+        self.time[self.size:self.size + n] = times.to_numpy(dtype="datetime64[ns]")
+        for name in PRICE_COLUMNS:
+            self.columns[name][self.size:self.size + n] = pd.to_numeric(rows[name], errors="coerce").to_numpy(dtype=float)
+        self.size += n
+
+    def truncate_from(self, since):
+        """
+        since 시각 이후의 봉을 잘라냅니다. (정정된 봉을 다시 받기 위함)
+        이미 내보낸 뷰가 덮어써지지 않도록 남길 구간을 새 버퍼로 복사합니다.
+        """
+        cut = np.datetime64(pd.Timestamp(since).to_datetime64(), "ns")
+        self.size = int(np.searchsorted(self.time[:self.size], cut, side="left"))
+        self.time = self.time[:self.size].copy()
+        self.columns = {name: arr[:self.size].copy() for name, arr in self.columns.items()}
+
+    def frame(self) -> pd.DataFrame:
+        """현재 보관 중인 봉들을 DataFrame으로 돌려줍니다. (가격 컬럼은 복사 없는 읽기 전용 뷰)"""
+        n = self.size
+        data = {"time": pd.Series(self.time[:n]).dt.tz_localize("UTC")}
+        for name in PRICE_COLUMNS:
+            view = self.columns[name][:n]
+            view.flags.writeable = False
+            data[name] = view
+        return pd.DataFrame(data, copy=False)
+
+
+class BarStore:
+    """
+    종목별 OHLCV를 엔진 프로세스 메모리에 캐싱하는 컬럼형 저장소.
+
+    - 조회할 때마다 마지막으로 받아온 시각 이후의 봉만 DB에서 가져옵니다. (증분 갱신)
+    - 수집(ingest) 후 on_write()가 불리면 바로 갱신합니다.
+    - 전체 바이트가 max_bytes를 넘으면 가장 오래 안 쓴 종목부터 통째로 내보냅니다.
+    - 봉이 없는 종목은 항목을 남기지 않습니다.
+    """
+
+    def __init__(self, max_bytes: int, refresh_interval_sec: float = 0.0):
+        self.max_bytes = max_bytes
+        self.refresh_interval_sec = refresh_interval_sec
+        self._symbols = OrderedDict()  # (symbol, timeframe) -> SymbolBars
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _entry(self, symbol: str, timeframe: str) -> SymbolBars:
+        key = (symbol, timeframe)
+        with self._lock:
+            bars = self._symbols.get(key)
+            if bars is None:
+                bars = self._symbols[key] = SymbolBars()
+            self._symbols.move_to_end(key)
+            return bars
+
+    def _discard_empty(self, timeframe: str, entries: dict):
+        """
+        조회해 봤지만 봉이 하나도 없는 종목의 빈 항목을 지웁니다.
+        (모르는 종목 조회가 쌓여 _symbols 가 끝없이 커지는 것 방지)
+        """
+        with self._lock:
+            for symbol, bars in entries.items():
+                key = (symbol, timeframe)
+                if bars.size == 0 and self._symbols.get(key) is bars:
+                    del self._symbols[key]
+
+    def _fetch_since(self, symbol: str, timeframe: str, since, inclusive: bool = False) -> pd.DataFrame:
+        query = bars_query(BAR_TABLES[timeframe], ">=" if inclusive else ">")
+        params = {"symbol": symbol, "since": pd.Timestamp(since).tz_localize("UTC").to_pydatetime()}
+
+        with stage("bar_store", "db_fetch"):
+            df = read_frame(query, params)
+        record_rows("bar_store", "db_fetch", len(df), frame_bytes(df))
+        return df
+
+    def _load_all(self, symbol: str, timeframe: str, bars: SymbolBars):
+        """
+        처음 올리는 종목은 서버 측 커서로 나눠 받아 배열에 바로 이어 붙입니다.
+        (1분봉 전체 이력도 결과 DataFrame 하나로 한꺼번에 만들지 않음)
+        """
+        with stage("bar_store", "db_fetch"):
+            for batch in stream_frames(bars_query(BAR_TABLES[timeframe]), {"symbol": symbol}):
+                bars.append(batch)
+                record_rows("bar_store", "db_fetch", len(batch), frame_bytes(batch))
+
+    def _refresh(self, symbol: str, timeframe: str, bars: SymbolBars):
+        since = bars.last_time
+        if since is None:
+            self._load_all(symbol, timeframe, bars)
+        elif timeframe in ROLLUP_BUCKETS:
+            # 집계 봉의 마지막 버킷은 새 1분봉이 들어오면 값이 바뀌므로 잘라내고 다시 받음
+            bars.truncate_from(since)
+            bars.append(self._fetch_since(symbol, timeframe, since, inclusive=True))
+        else:
+            bars.append(self._fetch_since(symbol, timeframe, since))
+        bars.last_refresh = time.monotonic()
+
+    def _evict(self):
+        with self._lock:
+            total = sum(bars.nbytes for bars in self._symbols.values())
+            # 방금 쓴 종목(맨 뒤) 하나는 남겨둠
+            while total > self.max_bytes and len(self._symbols) > 1:
+                _, bars = self._symbols.popitem(last=False)
+                total -= bars.nbytes
+                self.evictions += 1
+
+    def get_frame(self, symbol: str, timeframe: str = "1d") -> pd.DataFrame:
+        """종목의 전체 OHLCV를 반환합니다. (필요하면 새로 들어온 봉만 DB에서 받아 붙임)"""
+        if timeframe not in BAR_TABLES:
+            raise ValueError(f"Unknown timeframe: {timeframe} (expected one of {list(BAR_TABLES)})")
+
+        bars = self._entry(symbol, timeframe)
+        try:
+            with bars.lock:
+                stale = time.monotonic() - bars.last_refresh >= self.refresh_interval_sec
+                if bars.size == 0 or stale:
+                    self._refresh(symbol, timeframe, bars)
+                frame = bars.frame()
+        finally:
+            self._discard_empty(timeframe, {symbol: bars})
+
+        self._evict()
+        return frame
+
+    def _fetch_range(self, symbol: str, timeframe: str, start, end, warmup: int) -> pd.DataFrame:
+        query = bars_range_query(BAR_TABLES[timeframe], start is not None, end is not None)
+        params = {"symbol": symbol}
+        if start is not None:
+            params.update(start=to_utc(start).to_pydatetime(), warmup=int(warmup))
+        if end is not None:
+            params["end"] = to_utc(end).to_pydatetime()
+
+        with stage("bar_store", "db_fetch_range"):
+            df = read_frame(query, params)
+        df["time"] = pd.to_datetime(df["time"], utc=True)
+        for name in PRICE_COLUMNS:
+            df[name] = pd.to_numeric(df[name], errors="coerce").astype(float)
+        record_rows("bar_store", "db_fetch_range", len(df), frame_bytes(df))
+        return df
+
+    def get_range(self, symbol: str, timeframe: str = "1d", start=None, end=None, warmup: int = 0) -> pd.DataFrame:
+        """
+        [start, end] 구간 (+ 앞쪽 warmup 봉) 의 OHLCV를 반환합니다.
+        전체 이력이 이미 메모리에 있으면 거기서 잘라내고, 아니면 구간 조건을 SQL 에 넣어 필요한 봉만 조회합니다.
+        (구간 조회 결과는 전체 이력 캐시에 넣지 않음)
+        """
+        if timeframe not in BAR_TABLES:
+            raise ValueError(f"Unknown timeframe: {timeframe} (expected one of {list(BAR_TABLES)})")
+        if start is None and end is None:
+            return self.get_frame(symbol, timeframe)
+
+        with self._lock:
+            bars = self._symbols.get((symbol, timeframe))
+        if bars is not None and bars.size:
+            return slice_range(self.get_frame(symbol, timeframe), start, end, warmup)
+        return self._fetch_range(symbol, timeframe, start, end, warmup)
+
+    def _fetch_many(self, symbols: list, timeframe: str, since) -> pd.DataFrame:
+        query = bars_many_query(BAR_TABLES[timeframe], since is not None)
+        params = {"symbols": list(symbols)}
+        if since is not None:
+            params["since"] = pd.Timestamp(since).tz_localize("UTC").to_pydatetime()
+
+        with stage("bar_store", "db_fetch"):
+            df = read_frame(query, params)
+        record_rows("bar_store", "db_fetch", len(df), frame_bytes(df))
+        return df
+
+    def get_frames(self, symbols: list, timeframe: str = "1d") -> dict:
+        """
+        여러 종목의 OHLCV를 {종목: DataFrame} 으로 반환합니다.
+        종목마다 따로 조회하지 않고, 처음 올리는 종목들 / 갱신할 종목들을 각각 쿼리 한 번으로 받습니다.
+        (집계 타임프레임은 마지막 버킷 재조회가 필요하므로 종목별 get_frame 으로 처리)
+        """
+        if timeframe not in BAR_TABLES:
+            raise ValueError(f"Unknown timeframe: {timeframe} (expected one of {list(BAR_TABLES)})")
+        if timeframe in ROLLUP_BUCKETS:
+            return {symbol: self.get_frame(symbol, timeframe) for symbol in symbols}
+
+        entries = {symbol: self._entry(symbol, timeframe) for symbol in symbols}
+        now = time.monotonic()
+        cold = [s for s, bars in entries.items() if bars.size == 0]
+        stale = [s for s, bars in entries.items() if bars.size and now - bars.last_refresh >= self.refresh_interval_sec]
+
+        batches = []
+        if cold:
+            batches.append((cold, None))
+        if stale:
+            batches.append((stale, min(entries[s].last_time for s in stale)))
+
+        try:
+            for group, since in batches:
+                rows = self._fetch_many(group, timeframe, since)
+                parts = dict(tuple(rows.groupby("symbol", sort=False))) if not rows.empty else {}
+                for symbol in group:
+                    bars = entries[symbol]
+                    part = parts.get(symbol, rows.iloc[:0])
+                    with bars.lock:
+                        # 다른 요청이 그 사이 먼저 붙였을 수 있으므로 이 종목의 마지막 봉 이후만 추가
+                        if bars.last_time is not None and not part.empty:
+                            times = pd.to_datetime(part["time"], utc=True).dt.tz_convert(None)
+                            part = part[(times > pd.Timestamp(bars.last_time)).to_numpy()]
+                        bars.append(part)
+                        bars.last_refresh = now
+        finally:
+            self._discard_empty(timeframe, entries)
+
+        frames = {}
+        for symbol, bars in entries.items():
+            with bars.lock:
+                frames[symbol] = bars.frame()
+
+        self._evict()
+        return frames
+
+    def on_write(self, symbol: str, timeframe: str, min_time=None):
+        """
+        수집 직후 호출되는 훅.
+        이미 캐싱된 종목만 증분 갱신합니다.
+        - 캐시 범위 안쪽부터 다시 쓰였다면(겹침 구간 정정) 그 시점 이후만 잘라내고 다시 받음
+        - 캐시보다 과거 봉이 새로 들어왔다면(백필) 통째로 버림
+        """
+        key = (symbol, timeframe)
+        with self._lock:
+            bars = self._symbols.get(key)
+        if bars is None:
+            return
+
+        written_from = None
+        if min_time is not None and bars.size:
+            written_from = pd.Timestamp(min_time)
+            written_from = written_from.tz_convert(None) if written_from.tzinfo else written_from
+            if timeframe in ROLLUP_BUCKETS:
+                # 새 1분봉이 속한 버킷의 시작 시각부터 다시 받음
+                written_from = written_from.floor(ROLLUP_BUCKETS[timeframe])
+            if written_from < pd.Timestamp(bars.first_time):
+                self.drop(symbol, timeframe)
+                return
+
+        with bars.lock:
+            if written_from is not None:
+                bars.truncate_from(written_from)
+            self._refresh(symbol, timeframe, bars)
+        self._evict()
+
+    def drop(self, symbol: str, timeframe: str = None):
+        with self._lock:
+            for key in [k for k in self._symbols if k[0] == symbol and (timeframe is None or k[1] == timeframe)]:
+                del self._symbols[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "symbols": [
+                    {"symbol": s, "timeframe": tf, "bars": bars.size, "bytes": bars.nbytes}
+                    for (s, tf), bars in self._symbols.items()
+                ],
+                "bytes": sum(bars.nbytes for bars in self._symbols.values()),
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+            }
+
+
+# 프로세스 전역 저장소 인스턴스
+bar_store = BarStore(BAR_STORE_MAX_BYTES, BAR_STORE_REFRESH_INTERVAL_SEC)
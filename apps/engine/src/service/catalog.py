@@ -0,0 +1,291 @@
+import bisect
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import text
+
+from src.core.config import CATALOG_REFRESH_INTERVAL_SEC, MARKET_DATA_1M_RETENTION_DAYS, TARGET_TICKERS
+from src.core.database import engine
+from src.core.metrics import stage
+from src.core.queries import read_frame, aread_frame
+
+# 타임프레임 → stocks 의 통계 컬럼 접미사 (5m/15m/1h 는 1분봉 연속 집계이므로 1분봉 통계를 따름)
+STATS_SUFFIX = {"1d": "1d", "1m": "1m", "5m": "1m", "15m": "1m", "1h": "1m"}
+# 통계 테이블
+STATS_TABLES = {"1d": "market_data", "1m": "market_data_1m"}
+STATS_FIELDS = ("first_time", "last_time", "bars", "ingested_at", "ingest_status", "ingest_error")
+
+CATALOG_COLUMNS = ("symbol", "name", "exchange", "active") + tuple(
+    f"{field}_{suffix}" for suffix in STATS_TABLES for field in STATS_FIELDS
+)
+
+
+# ==========================================
+# 1. 수집 시 통계 갱신 (쓰기 트랜잭션 안에서 호출)
+# ==========================================
+
+def record_write(conn, symbol: str, timeframe: str, times: pd.Series, inserted: int):
+    """
+    봉을 적재한 같은 트랜잭션에서 stocks 의 첫/마지막 봉 시각, 봉 개수, 마지막 수집 상태를 갱신합니다.
+    (없는 종목이면 행을 새로 만듦 - 1분봉만 수집된 종목도 카탈로그에 올라감)
+    """
+    s = STATS_SUFFIX[timeframe]
+    times = pd.to_datetime(times, utc=True)
+    stmt = text(f"""
+        INSERT INTO stocks (symbol, name, first_time_{s}, last_time_{s}, bars_{s}, ingested_at_{s}, ingest_status_{s}, ingest_error_{s})
+        VALUES (:symbol, :symbol, :first, :last, :inserted, now(), 'success', NULL)
+        ON CONFLICT (symbol) DO UPDATE SET
+            first_time_{s} = LEAST(stocks.first_time_{s}, EXCLUDED.first_time_{s}),
+            last_time_{s} = GREATEST(stocks.last_time_{s}, EXCLUDED.last_time_{s}),
+            bars_{s} = COALESCE(stocks.bars_{s}, 0) + EXCLUDED.bars_{s},
+            ingested_at_{s} = EXCLUDED.ingested_at_{s},
+            ingest_status_{s} = EXCLUDED.ingest_status_{s},
+            ingest_error_{s} = NULL
+    """)
+    conn.execute(stmt, {
+        "symbol": symbol,
+        "first": times.min().to_pydatetime(),
+        "last": times.max().to_pydatetime(),
+        "inserted": int(inserted),
+    })
+
+
+def record_status(symbol: str, timeframe: str, status: str, error: str = None):
+    """적재 없이 끝난 수집(빈 응답 / 실패)의 상태만 남깁니다. (카탈로그에 없는 종목은 만들지 않음)"""
+    s = STATS_SUFFIX[timeframe]
+    stmt = text(f"""
+        UPDATE stocks SET ingested_at_{s} = now(), ingest_status_{s} = :status, ingest_error_{s} = :error
+        WHERE symbol = :symbol
+    """)
+    try:
+        with engine.begin() as conn:
+            conn.execute(stmt, {"symbol": symbol, "status": status, "error": error})
+    except Exception as e:
+        print(f"⚠️ [Catalog] Failed to record {timeframe} ingest status for {symbol}: {e}")
+        return
+    symbol_catalog.invalidate()
+
+
+def backfill_stats(symbols: list = None):
+    """
+    통계가 비어 있는(NULL) 종목만 시세 테이블에서 한 번 집계해 채웁니다. (서버 시작 시 호출)
+    관심 종목(TARGET_TICKERS) 중 stocks 에 없는 종목도 시세가 있으면 추가합니다.
+    """
+    with engine.connect() as conn:
+        pending = conn.execute(text(
+            "SELECT symbol FROM stocks WHERE bars_1d IS NULL OR bars_1m IS NULL"
+        )).scalars().all()
+        known = set(conn.execute(text("SELECT symbol FROM stocks")).scalars().all())
+
+    candidates = list(dict.fromkeys([*pending, *(s for s in (symbols or TARGET_TICKERS) if s not in known)]))
+    if not candidates:
+        return 0
+
+    print(f"📇 [Catalog] Backfilling stats for {len(candidates)} symbols...")
+    for symbol in candidates:
+        with engine.begin() as conn:
+            values = {"symbol": symbol}
+            for suffix, table in STATS_TABLES.items():
+                first, last, bars = conn.execute(text(
+                    f"SELECT min(time), max(time), count(*) FROM {table} WHERE symbol = :symbol"
+                ), {"symbol": symbol}).one()
+                values.update({f"first_{suffix}": first, f"last_{suffix}": last, f"bars_{suffix}": bars})
+
+            if symbol not in known and not (values["bars_1d"] or values["bars_1m"]):
+                continue
+            conn.execute(text("""
+                INSERT INTO stocks (symbol, name, first_time_1d, last_time_1d, bars_1d, first_time_1m, last_time_1m, bars_1m)
+                VALUES (:symbol, :symbol, :first_1d, :last_1d, :bars_1d, :first_1m, :last_1m, :bars_1m)
+                ON CONFLICT (symbol) DO UPDATE SET
+                    first_time_1d = EXCLUDED.first_time_1d, last_time_1d = EXCLUDED.last_time_1d, bars_1d = EXCLUDED.bars_1d,
+                    first_time_1m = EXCLUDED.first_time_1m, last_time_1m = EXCLUDED.last_time_1m, bars_1m = EXCLUDED.bars_1m
+            """), values)
+
+    symbol_catalog.invalidate()
+    return len(candidates)
+
+
+def reconcile_1m_stats(retention_days: int = MARKET_DATA_1M_RETENTION_DAYS) -> int:
+    """
+    보관 기간 정책이 지난 1분봉 청크를 지우면 record_write 가 늘려온 first_time_1m / bars_1m 이 실제보다 커지므로,
+    첫 봉이 보관 기간보다 오래된 종목만 market_data_1m 에서 다시 집계합니다. (하루 한 번 주기 수집에서 호출)
+    반환값: 갱신한 종목 수 (retention_days 가 0 이면 아무것도 하지 않음)
+    """
+    if retention_days <= 0:
+        return 0
+
+    with engine.begin() as conn:
+        updated = conn.execute(text("""
+            UPDATE stocks SET first_time_1m = agg.first_time, last_time_1m = agg.last_time, bars_1m = agg.bars
+            FROM (
+                SELECT s.symbol, min(m.time) AS first_time, max(m.time) AS last_time, count(m.time) AS bars
+                FROM stocks s LEFT JOIN market_data_1m m ON m.symbol = s.symbol
+                WHERE s.first_time_1m < now() - make_interval(days => :days)
+                GROUP BY s.symbol
+            ) AS agg
+            WHERE stocks.symbol = agg.symbol
+        """), {"days": retention_days}).rowcount
+
+    if updated:
+        print(f"📇 [Catalog] Reconciled 1m stats for {updated} symbols after retention")
+        symbol_catalog.invalidate()
+    return updated
+
+
+# ==========================================
+# 2. 인메모리 카탈로그 (목록 / 검색 / 페이지 / 존재 확인)
+# ==========================================
+
+CATALOG_QUERY = text(f"SELECT {', '.join(CATALOG_COLUMNS)} FROM stocks ORDER BY symbol ASC")
+
+
+def _build_entries(df: pd.DataFrame) -> dict:
+    entries = {}
+    for row in df.to_dict(orient="records"):
+        entry = {}
+        for key, value in row.items():
+            if value is None or (not isinstance(value, str) and pd.isna(value)):
+                value = None
+            elif isinstance(value, (pd.Timestamp, datetime)):
+                value = pd.Timestamp(value).isoformat()
+            elif key.startswith("bars_"):
+                value = int(value)
+            entry[key] = value
+        entries[entry["symbol"]] = entry
+    return entries
+
+
+def _select(entries: dict, symbols: list, q: str, limit: int, offset: int, active_only: bool) -> tuple:
+    if q:
+        needle = q.strip().upper()
+        # 티커 접두사는 정렬된 목록에서 이진 탐색, 회사명은 부분 문자열
+        lo = bisect.bisect_left(symbols, needle)
+        hi = bisect.bisect_right(symbols, needle + "\uffff")
+        by_symbol = symbols[lo:hi]
+        prefixed = set(by_symbol)
+        by_name = [s for s in symbols if s not in prefixed and needle in (entries[s]["name"] or "").upper()]
+        symbols = by_symbol + by_name
+    if active_only:
+        symbols = [s for s in symbols if entries[s]["active"] is not False]
+
+    end = offset + limit if limit is not None else None
+    return len(symbols), [entries[s] for s in symbols[offset:end]]
+
+
+class SymbolCatalog:
+    """
+    stocks 테이블 전체를 메모리에 올려두고 조회합니다. (종목 수는 수백~수천 개 수준)
+
+    - 수집이 끝나면 invalidate() 로 다음 조회 때 다시 읽고,
+      다른 프로세스가 수집한 경우를 위해 refresh_interval_sec 마다 다시 읽습니다.
+    - 목록/페이지는 정렬된 리스트 슬라이스, 존재 확인은 딕셔너리 조회
+    """
+
+    def __init__(self, refresh_interval_sec: float):
+        self.refresh_interval_sec = refresh_interval_sec
+        self._entries = None  # symbol -> dict
+        self._symbols = []    # 정렬된 티커 목록
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with stage("catalog", "load"):
+            df = read_frame(CATALOG_QUERY)
+        return _build_entries(df)
+
+    def _store(self, entries: dict) -> tuple:
+        with self._lock:
+            self._entries = entries
+            self._symbols = sorted(entries)
+            self._loaded_at = time.monotonic()
+            return self._entries, self._symbols
+
+    def _cached(self):
+        stale = time.monotonic() - self._loaded_at >= self.refresh_interval_sec
+        if self._entries is None or stale:
+            return None
+        return self._entries, self._symbols
+
+    def _snapshot(self) -> tuple:
+        """캐시가 비었거나 오래됐으면 다시 읽습니다. (asnapshot 과 같이 DB 를 기다리는 동안 락은 잡지 않음)"""
+        with self._lock:
+            cached = self._cached()
+        if cached is not None:
+            return cached
+        return self._store(self._load())
+
+    async def asnapshot(self) -> tuple:
+        """
+        이벤트 루프용: 다시 읽어야 하면 비동기 연결로 읽습니다.
+        (DB 를 기다리는 동안 스레드 락은 잡지 않음 - 동시에 읽으면 나중 결과가 남을 뿐)
+        """
+        with self._lock:
+            cached = self._cached()
+        if cached is not None:
+            return cached
+        with stage("catalog", "load"):
+            df = await aread_frame(CATALOG_QUERY)
+        return self._store(_build_entries(df))
+
+    def entries(self) -> dict:
+        return self._snapshot()[0]
+
+    def invalidate(self):
+        with self._lock:
+            self._entries = None
+
+    def get(self, symbol: str):
+        return self.entries().get(symbol)
+
+    async def aget(self, symbol: str):
+        return (await self.asnapshot())[0].get(symbol)
+
+    def list(self, q: str = None, limit: int = None, offset: int = 0, active_only: bool = False) -> tuple:
+        """
+        (전체 개수, 페이지 항목) 을 반환합니다.
+        q 는 티커 접두사 또는 회사명 부분 문자열 (대소문자 무시)
+        """
+        return _select(*self._snapshot(), q, limit, offset, active_only)
+
+    async def alist(self, q: str = None, limit: int = None, offset: int = 0, active_only: bool = False) -> tuple:
+        return _select(*(await self.asnapshot()), q, limit, offset, active_only)
+
+    def require(self, symbol: str, timeframe: str = "1d") -> dict:
+        """
+        백테스트 전에 종목을 확인합니다. 모르는 종목이거나 해당 타임프레임 봉이 없으면 ValueError.
+        (시세 테이블을 조회하기 전에 걸러냄)
+        """
+        if timeframe not in STATS_SUFFIX:
+            raise ValueError(f"Unknown timeframe: {timeframe} (expected one of {list(STATS_SUFFIX)})")
+        entry = self.get(symbol)
+        if entry is None:
+            raise ValueError(f"Unknown symbol: {symbol}")
+        if not entry[f"bars_{STATS_SUFFIX[timeframe]}"]:
+            raise ValueError(f"No {timeframe} data for symbol: {symbol}")
+        return entry
+
+    def versions(self, symbols: list, timeframe: str = "1d") -> list:
+        """종목별 [종목, 봉 개수, 마지막 봉 시각]. 새 봉이 적재되면 바뀌므로 결과 캐시 키로 씁니다."""
+        if timeframe not in STATS_SUFFIX:
+            raise ValueError(f"Unknown timeframe: {timeframe} (expected one of {list(STATS_SUFFIX)})")
+        entries = self.entries()
+        suffix = STATS_SUFFIX[timeframe]
+        out = []
+        for symbol in sorted(symbols):
+            entry = entries.get(symbol) or {}
+            out.append([symbol, entry.get(f"bars_{suffix}"), entry.get(f"last_time_{suffix}")])
+        return out
+
+    def known(self, symbols: list, timeframe: str = "1d") -> tuple:
+        """(봉이 있는 종목, 나머지) 로 나눕니다."""
+        entries = self.entries()
+        column = f"bars_{STATS_SUFFIX[timeframe]}"
+        present = [s for s in symbols if s in entries and entries[s][column]]
+        found = set(present)
+        return present, [s for s in symbols if s not in found]
+
+
+# 프로세스 전역 카탈로그
+symbol_catalog = SymbolCatalog(CATALOG_REFRESH_INTERVAL_SEC)
@@ -0,0 +1,240 @@
+import os
+import re
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src.core.config import DATA_SOURCE, PARQUET_STORE_DIR
+from src.core.queries import bars_query, stream_frames
+from src.core.metrics import stage, record_rows, frame_bytes
+from src.service.bar_store import BAR_TABLES, PRICE_COLUMNS, bar_store, slice_range, to_utc
+
+# 야후 티커 형식 (예: AAPL, BRK-B, ^GSPC, EURUSD=X, 005930.KS). 경로 구분자가 들어간 값은 받지 않음
+SYMBOL_PATTERN = re.compile(r"[A-Za-z0-9.^=\-]{1,32}")
+
+# 백테스트에 필요한 최소 컬럼 (지표/수익률은 종가만, 결과 포장은 시각만 사용)
+BACKTEST_COLUMNS = ("time", "close")
+
+
+# ==========================================
+# 1. DB 백엔드 (기본값: 인메모리 bar_store 를 거쳐 Postgres 에서 읽음)
+# ==========================================
+
+class DbSource:
+    name = "db"
+
+    def load(self, symbol: str, timeframe: str = "1d", start=None, end=None, columns=None, warmup: int = 0) -> pd.DataFrame:
+        df = bar_store.get_range(symbol, timeframe, start, end, warmup)
+        return df[list(columns)] if columns else df
+
+
+# ==========================================
+# 2. Parquet 백엔드 (종목 / 기간 파티션, DB 없이 오프라인 백테스트)
+# ==========================================
+
+class ParquetSource:
+    """
+    market_data / market_data_1m (및 집계 봉)을 종목·기간별로 나눠 저장한 Parquet 저장소.
+
+        {root}/{table}/symbol={SYMBOL}/year={YYYY}/data.parquet        (일봉)
+        {root}/{table}/symbol={SYMBOL}/month={YYYY-MM}/data.parquet    (분/시간봉)
+
+    - 읽기: 필요한 컬럼만, 시간 범위 필터는 파티션 이름과 row group 통계로 밀어넣어(pushdown) 필요한 파일/블록만 읽음
+    - 파일은 메모리 맵으로 열기 때문에 반복 실행은 OS 페이지 캐시에서 거의 즉시 읽힘
+    - 갱신: 저장소의 마지막 봉 이후만 DB에서 받아 마지막 파티션을 다시 쓰고 새 파티션을 추가 (증분)
+    """
+
+    name = "parquet"
+
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+
+    # ------------------------------------------
+    # 경로 / 파티션
+    # ------------------------------------------
+    @staticmethod
+    def _partition_key(timeframe: str) -> str:
+        return "year" if timeframe == "1d" else "month"
+
+    def _symbol_dir(self, symbol: str, timeframe: str) -> str:
+        # 요청으로 들어온 종목 이름이 그대로 경로가 되므로 저장소 밖으로 나가지 못하게 형식부터 확인
+        if not SYMBOL_PATTERN.fullmatch(symbol):
+            raise ValueError(f"Invalid symbol: {symbol!r}")
+        return os.path.join(self.root, BAR_TABLES[timeframe], f"symbol={symbol}")
+
+    def _partition_values(self, times: pd.Series, timeframe: str) -> np.ndarray:
+        if self._partition_key(timeframe) == "year":
+            return times.dt.year.astype(str).to_numpy()
+        return times.dt.strftime("%Y-%m").to_numpy()
+
+    def partitions(self, symbol: str, timeframe: str) -> list:
+        """저장된 파티션 디렉터리 이름을 시간순으로 반환합니다."""
+        path = self._symbol_dir(symbol, timeframe)
+        if not os.path.isdir(path):
+            return []
+        key = self._partition_key(timeframe)
+        return sorted(d for d in os.listdir(path) if d.startswith(f"{key}="))
+
+    # ------------------------------------------
+    # 읽기
+    # ------------------------------------------
+    def load(self, symbol: str, timeframe: str = "1d", start=None, end=None, columns=None, warmup: int = 0) -> pd.DataFrame:
+        """
+        [start, end] 구간의 봉을 읽습니다. warmup 이 있으면 start 앞쪽 봉도 그만큼 더 붙입니다. (지표 워밍업용)
+        """
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+        from pyarrow.fs import LocalFileSystem
+
+        if timeframe not in BAR_TABLES:
+            raise ValueError(f"Unknown timeframe: {timeframe} (expected one of {list(BAR_TABLES)})")
+
+        columns = list(columns) if columns else ["time", *PRICE_COLUMNS]
+        key = self._partition_key(timeframe)
+        start, end = to_utc(start), to_utc(end)
+
+        # 1) 파티션 가지치기: 범위 밖 연/월 디렉터리는 열지도 않음
+        parts = self.partitions(symbol, timeframe)
+        bounds = [None if t is None else str(t.year) if key == "year" else t.strftime("%Y-%m") for t in (start, end)]
+        values = [part.split("=", 1)[1] for part in parts]
+        first = next((i for i, v in enumerate(values) if bounds[0] is None or v >= bounds[0]), len(parts))
+        last = max((i for i, v in enumerate(values) if bounds[1] is None or v <= bounds[1]), default=-1)
+
+        paths = [os.path.join(self._symbol_dir(symbol, timeframe), part, "data.parquet") for part in parts]
+        # 워밍업 봉이 모자라면 앞쪽 파티션을 하나씩 더 엶 (행 수는 파일 메타데이터에서 읽음)
+        lookback = 0
+        while warmup and start is not None and first > 0 and lookback < warmup:
+            first -= 1
+            lookback += pq.ParquetFile(paths[first]).metadata.num_rows
+        files = paths[first:last + 1]
+
+        if not files:
+            return pd.DataFrame({c: pd.Series(dtype="datetime64[ns, UTC]" if c == "time" else float) for c in columns})
+
+        # 2) 파일 안에서는 row group 통계로 시간 범위 밖 블록을 건너뜀 (워밍업이 있으면 start 는 읽은 뒤 자름)
+        condition = None
+        if start is not None and not warmup:
+            condition = ds.field("time") >= start.to_pydatetime()
+        if end is not None:
+            upper = ds.field("time") <= end.to_pydatetime()
+            condition = upper if condition is None else condition & upper
+
+        with stage("parquet", "read"):
+            dataset = ds.dataset(files, format="parquet", filesystem=LocalFileSystem(use_mmap=True))
+            table = dataset.to_table(columns=columns, filter=condition)
+            df = table.to_pandas(self_destruct=True).sort_values("time", kind="stable").reset_index(drop=True)
+            if warmup:
+                df = slice_range(df, start, end, warmup).reset_index(drop=True)
+        record_rows("parquet", "read", len(df), frame_bytes(df))
+        return df
+
+    # ------------------------------------------
+    # 쓰기 (DB → Parquet)
+    # ------------------------------------------
+    def last_time(self, symbol: str, timeframe: str):
+        """저장소에 있는 마지막 봉 시각 (없으면 None)"""
+        import pyarrow.parquet as pq
+
+        parts = self.partitions(symbol, timeframe)
+        if not parts:
+            return None
+        path = os.path.join(self._symbol_dir(symbol, timeframe), parts[-1], "data.parquet")
+        times = pq.read_table(path, columns=["time"], memory_map=True).column("time")
+        return to_utc(times.to_pandas().max()) if len(times) else None
+
+    def _write_partition(self, path: str, rows: pd.DataFrame, merge: bool = True):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if merge and os.path.exists(path):
+            existing = pq.read_table(path).to_pandas()
+            rows = pd.concat([existing, rows], ignore_index=True)
+        rows = rows.drop_duplicates(subset=["time"], keep="last").sort_values("time").reset_index(drop=True)
+
+        table = pa.Table.from_pandas(rows[["time", *PRICE_COLUMNS]], preserve_index=False)
+        # 임시 파일에 쓴 뒤 교체 (읽는 중인 백테스트가 깨진 파일을 보지 않도록)
+        tmp = path + ".tmp"
+        pq.write_table(table, tmp, row_group_size=65536, compression="zstd")
+        os.replace(tmp, path)
+
+    def write(self, symbol: str, timeframe: str, df: pd.DataFrame, rewritten: set = None) -> int:
+        """
+        봉들을 파티션별로 나눠 저장합니다. (같은 시각의 기존 봉은 새 값으로 덮어씀)
+        rewritten 을 넘기면 거기 없는 파티션은 기존 파일과 합치지 않고 새로 쓰고, 쓴 파티션 이름을 추가합니다. (전체 재생성용)
+        """
+        if df.empty:
+            return 0
+        df = df.copy()
+        df["time"] = pd.to_datetime(df["time"], utc=True)
+        for name in PRICE_COLUMNS:
+            df[name] = pd.to_numeric(df[name], errors="coerce").astype(float)
+
+        key = self._partition_key(timeframe)
+        with self._lock:
+            for value, rows in df.groupby(self._partition_values(df["time"], timeframe), sort=True):
+                part = f"{key}={value}"
+                path = os.path.join(self._symbol_dir(symbol, timeframe), part, "data.parquet")
+                if rewritten is None:
+                    self._write_partition(path, rows)
+                else:
+                    self._write_partition(path, rows, merge=part in rewritten)
+                    rewritten.add(part)
+        return len(df)
+
+    def _remove_partitions(self, symbol: str, timeframe: str, keep: set) -> int:
+        """keep 에 없는 파티션 디렉터리를 지웁니다. (전체 재생성 뒤 DB 에 더 이상 없는 구간 정리)"""
+        removed = 0
+        with self._lock:
+            for part in self.partitions(symbol, timeframe):
+                if part not in keep:
+                    shutil.rmtree(os.path.join(self._symbol_dir(symbol, timeframe), part), ignore_errors=True)
+                    removed += 1
+        return removed
+
+    def refresh(self, symbol: str, timeframe: str = "1d", full: bool = False) -> dict:
+        """
+        DB에서 저장소로 내보냅니다.
+        기본은 증분: 저장소의 마지막 봉 시각 이후(그 봉 포함, 정정 반영)만 조회해서 덧붙입니다.
+        full=True 면 파티션마다 기존 파일과 합치지 않고 새로 쓰고, DB 에 없는 구간의 파티션은 지웁니다.
+        (파티션 파일은 하나씩 원자적으로 교체되므로 읽는 쪽은 깨진 파일을 보지 않음)
+        """
+        since = None if full else self.last_time(symbol, timeframe)
+        table = BAR_TABLES[timeframe]
+
+        if since is None:
+            query, params = bars_query(table), {"symbol": symbol}
+        else:
+            query, params = bars_query(table, ">="), {"symbol": symbol, "since": since.to_pydatetime()}
+
+        # 서버 측 커서로 나눠 받아 조각마다 파티션에 기록 (1분봉 전체 이력도 메모리에 한꺼번에 올리지 않음)
+        written = 0
+        rewritten = set() if since is None else None
+        with stage("parquet", "export"):
+            for batch in stream_frames(query, params):
+                written += self.write(symbol, timeframe, batch, rewritten=rewritten)
+                record_rows("parquet", "export_write", len(batch), frame_bytes(batch))
+            if rewritten is not None:
+                self._remove_partitions(symbol, timeframe, keep=rewritten)
+        return {"symbol": symbol, "timeframe": timeframe, "mode": "full" if since is None else "incremental", "rows": written}
+
+
+# ==========================================
+# 3. 백엔드 선택
+# ==========================================
+
+DATA_SOURCES = {
+    "db": DbSource(),
+    "parquet": ParquetSource(PARQUET_STORE_DIR),
+}
+
+
+def get_data_source(name: str = None):
+    name = name or DATA_SOURCE
+    source = DATA_SOURCES.get(name)
+    if source is None:
+        raise ValueError(f"Unknown data source: {name} (expected one of {list(DATA_SOURCES)})")
+    return source
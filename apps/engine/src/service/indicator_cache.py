@@ -0,0 +1,101 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from src.core.config import INDICATOR_CACHE_MAX_BYTES
+
+
+class IndicatorCache:
+    """
+    계산된 지표 배열을 메모리에 보관하는 LRU 캐시.
+
+    키: (symbol, timeframe, 지표 이름, 파라미터, 데이터 버전)
+    - 데이터 버전은 (마지막 봉 시각, 봉 개수) 이므로 새 봉이 들어오면 자연스럽게 미스가 나고,
+      수집(ingest) 쪽에서 invalidate()를 불러 낡은 항목도 즉시 비웁니다.
+    - 값은 {컬럼명: 읽기 전용 ndarray} 딕셔너리 (지표 계산 실패 시 None)
+    - 전체 바이트 수가 max_bytes를 넘으면 가장 오래 안 쓴 항목부터 제거합니다.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _sizeof(value) -> int:
+        if value is None:
+            return 0
+        return sum(arr.nbytes for arr in value.values())
+
+    def get_or_compute(self, key, compute):
+        """캐시에 있으면 바로 반환하고, 없으면 compute()로 계산해 저장한 뒤 반환합니다."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+
+        value = compute()
+        if value is not None:
+            for arr in value.values():
+                # 여러 요청이 같은 배열을 공유하므로 실수로 덮어쓰지 못하게 잠금
+                arr.flags.writeable = False
+        self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        nbytes = self._sizeof(value)
+        if nbytes > self.max_bytes:
+            return  # 예산보다 큰 항목은 캐시하지 않음
+
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, nbytes)
+            self._bytes += nbytes
+
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self._bytes -= evicted_bytes
+                self.evictions += 1
+
+    def invalidate(self, symbol: str, timeframe: str = None) -> int:
+        """종목(과 타임프레임)의 캐시 항목을 모두 지우고, 지운 개수를 반환합니다."""
+        with self._lock:
+            stale = [k for k in self._entries if k[0] == symbol and (timeframe is None or k[1] == timeframe)]
+            for key in stale:
+                self._bytes -= self._entries.pop(key)[1]
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+def series_to_arrays(**columns) -> dict:
+    """지표 결과(Series)를 캐시에 넣을 float ndarray 딕셔너리로 변환합니다."""
+    return {name: np.asarray(series, dtype=float) for name, series in columns.items()}
+
+
+# 프로세스 전역 캐시 인스턴스
+indicator_cache = IndicatorCache(INDICATOR_CACHE_MAX_BYTES)
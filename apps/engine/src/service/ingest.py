@@ -1,60 +1,93 @@
-import yfinance as yf
 import pandas as pd
-from sqlalchemy import text, Table, MetaData
-from sqlalchemy.dialects.postgresql import insert
+from datetime import timedelta
+from sqlalchemy import text
+from src.core.config import INGEST_DAILY_OVERLAP_DAYS, INGEST_DAILY_AT_UTC
 from src.core.database import engine
+from src.core.metrics import stage, record_rows, frame_bytes
+from src.service.indicator_cache import indicator_cache
+from src.service.catalog import record_write, record_status, symbol_catalog
+from src.service.bar_store import bar_store
+from src.service.ingest_common import get_latest_bar_time, plan_fetch_window, write_bars
 
-metadata = MetaData()
+def _get_stock_name(ticker: str):
+    """stocks 테이블에 저장된 회사명을 반환합니다. (없거나 티커로 대신 저장된 경우 None)"""
+    with engine.connect() as conn:
+        name = conn.execute(text("SELECT name FROM stocks WHERE symbol = :tick"), {"tick": ticker}).scalar()
+    return name if name and name != ticker else None
 
-def save_to_db(ticker: str):
+def save_to_db(ticker: str, full: bool = False):
     """
-    yfinance를 통해 데이터를 수집하고, 
+    yfinance를 통해 데이터를 수집하고,
     stocks 테이블(회사명)과 market_data 테이블(시세)을 업데이트합니다.
+
+    기본은 증분 수집: DB의 마지막 봉 이후(겹침 구간 포함)만 요청하고, 이미 최신이면 건너뜁니다.
+    full=True 이면 전체 기간을 다시 받아 백필합니다.
     """
+    import yfinance as yf  # 무거운 라이브러리라 실제로 수집할 때 가져옴 (서버 시작 시간 단축)
     print(f"📥 Processing data for {ticker}...")
-    
+
+    latest = get_latest_bar_time('market_data', ticker)
+    mode, start = plan_fetch_window(
+        latest,
+        overlap=timedelta(days=INGEST_DAILY_OVERLAP_DAYS),
+        session_close_utc=INGEST_DAILY_AT_UTC,
+        full=full,
+    )
+
+    if mode == "skip":
+        print(f"⏭️ {ticker} is already up to date (last bar: {latest})")
+        return {"status": "skipped", "ticker": ticker, "mode": mode, "rows": 0}
+
     try:
-        t = yf.Ticker(ticker)
-        
-        # 1. 회사명 추출 (야후 API 억까 방어 로직)
-        company_name = None
-        try:
-            info = t.info
-            # 정상적으로 가져왔을 때만 저장
-            if info: 
-                company_name = info.get('longName') or info.get('shortName')
-        except Exception as e:
-            print(f"⚠️ Info fetch failed (야후 차단): {e}")
-            
-        # 콘솔 출력용 (구했으면 이름, 못 구했으면 티커)
-        display_name = company_name or ticker
-        print(f"🏢 Company: {display_name}")
-
-        # 2. 시세 데이터 다운로드 (최대 기간)
-        df = t.history(period="max")
-        
+        with stage("ingest_1d", "fetch"):
+            t = yf.Ticker(ticker)
+
+            # 1. 회사명 추출 (야후 API 억까 방어 로직)
+            # 증분 수집이고 이미 이름이 저장돼 있으면 느린 info 호출은 생략
+            company_name = _get_stock_name(ticker) if mode == "incremental" else None
+            if company_name is None:
+                try:
+                    info = t.info
+                    # 정상적으로 가져왔을 때만 저장
+                    if info:
+                        company_name = info.get('longName') or info.get('shortName')
+                except Exception as e:
+                    print(f"⚠️ Info fetch failed (야후 차단): {e}")
+
+            # 콘솔 출력용 (구했으면 이름, 못 구했으면 티커)
+            display_name = company_name or ticker
+            print(f"🏢 Company: {display_name}")
+
+            # 2. 시세 데이터 다운로드 (전체 또는 마지막 봉 이후)
+            if mode == "full":
+                df = t.history(period="max")
+            else:
+                df = t.history(start=start)
+
     except Exception as e:
         print(f"❌ API Fetch failed for {ticker}: {e}")
-        return
+        record_status(ticker, "1d", "error", str(e))
+        return {"status": "error", "ticker": ticker, "stage": "fetch", "message": str(e)}
 
     if df.empty:
         print(f"⚠️ No data found for {ticker}")
-        return
+        record_status(ticker, "1d", "empty")
+        return {"status": "empty", "ticker": ticker, "mode": mode, "rows": 0}
 
     # --- 데이터 전처리 (기본 포맷팅) ---
-    df = df.reset_index()
-    if isinstance(df.columns, pd.MultiIndex):
-        df.columns = [c[0] for c in df.columns]
+    with stage("ingest_1d", "transform"):
+        df = df.reset_index()
+        if isinstance(df.columns, pd.MultiIndex):
+            df.columns = [c[0] for c in df.columns]
 
-    rename_map = {
-        'Date': 'time', 'Open': 'open', 'High': 'high', 
-        'Low': 'low', 'Close': 'close', 'Volume': 'volume'
-    }
+        rename_map = {
+            'Date': 'time', 'Open': 'open', 'High': 'high',
+            'Low': 'low', 'Close': 'close', 'Volume': 'volume'
+        }
 
-    df = df.rename(columns=rename_map)
-    df['symbol'] = ticker
-    
-    data_to_insert = df[['time', 'symbol', 'open', 'high', 'low', 'close', 'volume']].to_dict(orient='records')
+        df = df.rename(columns=rename_map)
+        df['symbol'] = ticker
+    record_rows("ingest_1d", "transform", len(df), frame_bytes(df))
 
     try:
         with engine.connect() as conn:
@@ -62,32 +95,42 @@ def save_to_db(ticker: str):
             if company_name:
                 # 진짜 이름을 구해왔을 때만 업데이트
                 stock_stmt = text("""
-                    INSERT INTO stocks (symbol, name) 
-                    VALUES (:tick, :name) 
-                    ON CONFLICT (symbol) 
+                    INSERT INTO stocks (symbol, name)
+                    VALUES (:tick, :name)
+                    ON CONFLICT (symbol)
                     DO UPDATE SET name = EXCLUDED.name
                 """)
                 conn.execute(stock_stmt, {"tick": ticker, "name": company_name})
             else:
                 # 이름을 못 구했으면 새로 넣기만 하고, 기존 데이터는 절대 안 건드림
                 stock_stmt = text("""
-                    INSERT INTO stocks (symbol, name) 
-                    VALUES (:tick, :tick) 
-                    ON CONFLICT (symbol) 
+                    INSERT INTO stocks (symbol, name)
+                    VALUES (:tick, :tick)
+                    ON CONFLICT (symbol)
                     DO NOTHING
                 """)
                 conn.execute(stock_stmt, {"tick": ticker})
-            
-            # 4. market_data 테이블 저장 (중복 데이터 무시)
-            if data_to_insert:
-                market_data_table = Table('market_data', metadata, autoload_with=engine)
-                stmt = insert(market_data_table).values(data_to_insert)
-                stmt = stmt.on_conflict_do_nothing(index_elements=['time', 'symbol'])
-                
-                conn.execute(stmt)
-                conn.commit()
-                print(f"✅ Saved {len(df)} rows for {ticker} ({display_name})")
-            
+
+            # 4. market_data 테이블 저장 (대량이면 COPY → 스테이징 → 병합)
+            # 전체 수집은 중복 데이터 무시, 증분 수집은 겹침 구간의 정정된 값으로 갱신
+            with stage("ingest_1d", "write"):
+                stats = write_bars(conn, 'market_data', df, conflict="update" if mode == "incremental" else "nothing")
+            record_rows("ingest_1d", "write", stats['written'])
+            # 같은 트랜잭션에서 카탈로그 통계(첫/마지막 봉, 봉 개수, 수집 상태) 갱신
+            record_write(conn, ticker, "1d", df['time'], stats['inserted'])
+            conn.commit()
+            symbol_catalog.invalidate()
+            print(f"✅ Saved {stats['written']}/{stats['sent']} rows for {ticker} ({display_name}) [{mode}]")
+
+            # 새 봉이 들어왔으므로 이 종목의 지표 캐시는 무효화
+            indicator_cache.invalidate(ticker, "1d")
+            # 인메모리 저장소도 새로 들어온 봉만 받아서 갱신
+            bar_store.on_write(ticker, "1d", min_time=df['time'].min())
+
+        return {"status": "success", "ticker": ticker, "mode": mode, "rows": stats['sent'], "written": stats['written']}
+
     except Exception as e:
         print(f"❌ DB Write Error for {ticker}: {e}")
-        conn.rollback() # 트랜잭션 꼬임 방지
\ No newline at end of file
+        conn.rollback() # 트랜잭션 꼬임 방지
+        record_status(ticker, "1d", "error", str(e))
+        return {"status": "error", "ticker": ticker, "stage": "write", "message": str(e)}
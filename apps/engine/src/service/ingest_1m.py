@@ -1,81 +1,98 @@
-import yfinance as yf
 import pandas as pd
-from sqlalchemy import text, Table, MetaData
-from sqlalchemy.dialects.postgresql import insert
+from datetime import timedelta
+from src.core.config import INGEST_1M_OVERLAP_MINUTES, INGEST_1M_FRESH_MINUTES, INGEST_1M_MAX_LOOKBACK_DAYS
 from src.core.database import engine
+from src.core.metrics import stage, record_rows, frame_bytes
+from src.service.indicator_cache import indicator_cache
+from src.service.catalog import record_write, record_status, symbol_catalog
+from src.service.bar_store import bar_store, ROLLUP_BUCKETS
+from src.service.ingest_common import get_latest_bar_time, plan_fetch_window, write_bars
 
-metadata = MetaData()
-
-def save_1m_to_db(ticker: str):
+def save_1m_to_db(ticker: str, full: bool = False):
     """
-    yfinance를 통해 1분봉 데이터를 수집하고, 
+    yfinance를 통해 1분봉 데이터를 수집하고,
     market_data_1m 테이블에 저장합니다.
+
+    기본은 증분 수집: 마지막 1분봉 이후(겹침 구간 포함)만 요청하고, 이미 최신이면 건너뜁니다.
+    full=True 이면 야후가 주는 최대 구간(최근 5일)을 다시 받습니다.
     """
+    import yfinance as yf  # 무거운 라이브러리라 실제로 수집할 때 가져옴 (서버 시작 시간 단축)
     print(f"⏱️ Fetching 1-minute data for {ticker}...")
-    
+
+    latest = get_latest_bar_time('market_data_1m', ticker)
+    mode, start = plan_fetch_window(
+        latest,
+        overlap=timedelta(minutes=INGEST_1M_OVERLAP_MINUTES),
+        fresh_for=timedelta(minutes=INGEST_1M_FRESH_MINUTES),
+        full=full,
+        max_lookback=timedelta(days=INGEST_1M_MAX_LOOKBACK_DAYS),
+    )
+
+    if mode == "skip":
+        print(f"⏭️ {ticker} 1m data is already up to date (last bar: {latest})")
+        return {"status": "skipped", "ticker": ticker, "mode": mode, "rows": 0}
+
     try:
-        t = yf.Ticker(ticker)
-        # 💡 핵심: 1분봉, 최근 5일치 (야후 무료 API 최대 제공량)
-        df = t.history(interval="1m", period="5d")
-        
+        with stage("ingest_1m", "fetch"):
+            t = yf.Ticker(ticker)
+            if mode == "full":
+                # 💡 핵심: 1분봉, 최근 5일치 (야후 무료 API 최대 제공량)
+                df = t.history(interval="1m", period="5d")
+            else:
+                df = t.history(interval="1m", start=start)
+
     except Exception as e:
         print(f"❌ API Fetch failed for {ticker}: {e}")
-        return
+        record_status(ticker, "1m", "error", str(e))
+        return {"status": "error", "ticker": ticker, "stage": "fetch", "message": str(e)}
 
     if df.empty:
         print(f"⚠️ No 1m data found for {ticker}")
-        return
+        record_status(ticker, "1m", "empty")
+        return {"status": "empty", "ticker": ticker, "mode": mode, "rows": 0}
 
     # --- 데이터 전처리 ---
-    df = df.reset_index()
-    
-    # yfinance 최신 버전 MultiIndex 평탄화 방어
-    if isinstance(df.columns, pd.MultiIndex):
-        df.columns = [c[0] for c in df.columns]
+    with stage("ingest_1m", "transform"):
+        df = df.reset_index()
 
-    # 분봉 데이터는 인덱스 이름이 'Datetime'으로 들어옴
-    rename_map = {
-        'Date': 'time', 'Datetime': 'time', 
-        'Open': 'open', 'High': 'high', 
-        'Low': 'low', 'Close': 'close', 'Volume': 'volume'
-    }
+        # yfinance 최신 버전 MultiIndex 평탄화 방어
+        if isinstance(df.columns, pd.MultiIndex):
+            df.columns = [c[0] for c in df.columns]
 
-    df = df.rename(columns=rename_map)
-    df['symbol'] = ticker
+        # 분봉 데이터는 인덱스 이름이 'Datetime'으로 들어옴
+        rename_map = {
+            'Date': 'time', 'Datetime': 'time',
+            'Open': 'open', 'High': 'high',
+            'Low': 'low', 'Close': 'close', 'Volume': 'volume'
+        }
 
-    # 필요한 컬럼만 추출해서 딕셔너리 리스트로 변환
-    data_to_insert = df[['time', 'symbol', 'open', 'high', 'low', 'close', 'volume']].to_dict(orient='records')
+        df = df.rename(columns=rename_map)
+        df['symbol'] = ticker
+    record_rows("ingest_1m", "transform", len(df), frame_bytes(df))
 
     try:
         with engine.connect() as conn:
-            # 1. 1분봉 전용 테이블 생성 (없을 경우에만 만들어짐)
-            # 타임존 포함된 시간(TIMESTAMPTZ)을 사용해 글로벌 주식장 시간 꼬임 방지
-            create_table_sql = text("""
-                CREATE TABLE IF NOT EXISTS market_data_1m (
-                    time TIMESTAMPTZ NOT NULL,
-                    symbol VARCHAR(20) NOT NULL,
-                    open DOUBLE PRECISION,
-                    high DOUBLE PRECISION,
-                    low DOUBLE PRECISION,
-                    close DOUBLE PRECISION,
-                    volume DOUBLE PRECISION,
-                    PRIMARY KEY (time, symbol)
-                );
-            """)
-            conn.execute(create_table_sql)
+            # 1분봉 데이터 꽂아넣기 (대량이면 COPY → 스테이징 → 병합)
+            # 증분 수집의 겹침 구간은 정정된 값으로 갱신, 전체 수집은 이미 있는 봉 무시
+            with stage("ingest_1m", "write"):
+                stats = write_bars(conn, 'market_data_1m', df, conflict="update" if mode == "incremental" else "nothing")
+            record_rows("ingest_1m", "write", stats['written'])
+            # 같은 트랜잭션에서 카탈로그 통계(첫/마지막 봉, 봉 개수, 수집 상태) 갱신
+            record_write(conn, ticker, "1m", df['time'], stats['inserted'])
             conn.commit()
+            symbol_catalog.invalidate()
+            print(f"✅ Saved {stats['written']}/{stats['sent']} 1m candle rows for {ticker} [{mode}]")
+
+            # 새 1분봉이 들어왔으므로 이 종목의 1분봉과 집계 봉(5m/15m/1h) 지표 캐시는 무효화
+            # 인메모리 저장소도 새로 들어온 봉(이 속한 버킷)만 받아서 갱신
+            for timeframe in ("1m", *ROLLUP_BUCKETS):
+                indicator_cache.invalidate(ticker, timeframe)
+                bar_store.on_write(ticker, timeframe, min_time=df['time'].min())
+
+        return {"status": "success", "ticker": ticker, "mode": mode, "rows": stats['sent'], "written": stats['written']}
 
-            # 2. 1분봉 데이터 꽂아넣기 (중복 데이터 무시)
-            market_data_1m_table = Table('market_data_1m', metadata, autoload_with=engine)
-            stmt = insert(market_data_1m_table).values(data_to_insert)
-            
-            # 이미 수집된 시간의 데이터는 덮어쓰지 않고 패스 (ON CONFLICT DO NOTHING)
-            stmt = stmt.on_conflict_do_nothing(index_elements=['time', 'symbol'])
-            
-            conn.execute(stmt)
-            conn.commit()
-            print(f"✅ Saved {len(df)} 1m candle rows for {ticker}")
-            
     except Exception as e:
         print(f"❌ DB Write Error for {ticker}: {e}")
         conn.rollback()
+        record_status(ticker, "1m", "error", str(e))
+        return {"status": "error", "ticker": ticker, "stage": "write", "message": str(e)}
@@ -0,0 +1,184 @@
+import io
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+from sqlalchemy import Table, MetaData, literal_column
+from sqlalchemy.dialects.postgresql import insert
+
+from src.core.config import BULK_LOAD_CHUNK_ROWS, BULK_LOAD_COPY_MIN_ROWS
+from src.core.database import engine
+from src.core.queries import latest_bar_time
+
+# 시세 테이블 공통 컬럼 (적재 순서)
+BAR_COLUMNS = ['time', 'symbol', 'open', 'high', 'low', 'close', 'volume']
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# 반영(reflect)한 테이블 메타데이터는 프로세스당 한 번만 읽어서 재사용
+metadata = MetaData()
+_metadata_lock = threading.Lock()
+
+# COPY 대상 임시 스테이징 테이블 (트랜잭션이 끝나면 자동 삭제)
+# volume은 일봉(BIGINT)/분봉(DOUBLE) 모두 받을 수 있게 DOUBLE로 두고, 병합할 때 대상 타입으로 변환됨
+STAGING_TABLE = "_bars_staging"
+CREATE_STAGING_SQL = f"""
+    CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} (
+        time TIMESTAMPTZ,
+        symbol VARCHAR(20),
+        open DOUBLE PRECISION,
+        high DOUBLE PRECISION,
+        low DOUBLE PRECISION,
+        close DOUBLE PRECISION,
+        volume DOUBLE PRECISION
+    ) ON COMMIT DROP
+"""
+
+
+def bar_table(table: str) -> Table:
+    """시세 테이블의 Table 객체 (처음 한 번만 DB에서 컬럼 정보를 읽고 이후로는 캐시 사용)"""
+    with _metadata_lock:
+        target = metadata.tables.get(table)
+        if target is None:
+            target = Table(table, metadata, autoload_with=engine)
+        return target
+
+
+def get_latest_bar_time(table: str, symbol: str):
+    """테이블에 저장된 종목의 마지막 봉 시각을 반환합니다. (없으면 None)"""
+    return latest_bar_time(table, symbol)
+
+
+def _session_open(latest, now: datetime, close_at_utc: str) -> bool:
+    """
+    마지막 일봉이 오늘 세션이고 아직 장 마감 수집 시각(close_at_utc, "HH:MM") 전인지.
+    (일봉은 세션 날짜로 찍히므로, 장중에 저장된 오늘 봉은 마감 후 다시 받아야 종가가 확정됨)
+    """
+    hour, minute = (int(v) for v in close_at_utc.split(":"))
+    return latest.date() == now.date() and (now.hour, now.minute) < (hour, minute)
+
+
+def plan_fetch_window(latest, overlap: timedelta, fresh_for: timedelta = None, full: bool = False,
+                      max_lookback: timedelta = None, session_close_utc: str = None):
+    """
+    증분 수집 범위를 정합니다.
+
+    반환값: ("full", None) | ("skip", None) | ("incremental", start)
+    - 저장된 봉이 없거나 full=True 이면 전체 수집
+    - 분봉: 마지막 봉이 fresh_for 보다 최근이면 이미 최신이므로 건너뜀
+    - 일봉(session_close_utc): 마지막 봉이 오늘 세션이고 장 마감 전일 때만 건너뜀
+      (벽시계 기준 24시간으로 보면 장중에 저장된 오늘 봉 때문에 마감 수집이 건너뛰어짐)
+    - 그 외에는 마지막 봉에서 overlap 만큼 겹쳐서(정정된 봉 반영) 그 이후만 요청
+    """
+    if full or latest is None:
+        return "full", None
+
+    now = datetime.now(timezone.utc)
+    if session_close_utc is not None:
+        fresh = _session_open(latest, now, session_close_utc)
+    else:
+        fresh = now - latest.to_pydatetime() < fresh_for
+    if fresh:
+        return "skip", None
+
+    start = latest.to_pydatetime() - overlap
+    if max_lookback is not None:
+        start = max(start, now - max_lookback)
+    return "incremental", start
+
+
+def _conflict_clause(conflict: str) -> str:
+    if conflict == "update":
+        updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in PRICE_COLUMNS)
+        return f"ON CONFLICT (time, symbol) DO UPDATE SET {updates}"
+    return "ON CONFLICT (time, symbol) DO NOTHING"
+
+
+def _copy_from(cursor, sql: str, buf: io.StringIO):
+    """psycopg2 / psycopg(3) 어느 드라이버든 COPY FROM STDIN 으로 버퍼를 흘려보냅니다."""
+    if hasattr(cursor, "copy_expert"):
+        cursor.copy_expert(sql, buf)
+    else:
+        with cursor.copy(sql) as copy:
+            copy.write(buf.getvalue())
+
+
+def _insert_rows(conn, table: str, df: pd.DataFrame, conflict: str) -> tuple:
+    """
+    적은 행은 INSERT ... VALUES 한 번으로 처리합니다. (임시 테이블/COPY 왕복 비용 절약)
+    반환값: (삽입 또는 갱신된 행 수, 그중 새로 삽입된 행 수)
+    """
+    target = bar_table(table)
+    stmt = insert(target).values(df[BAR_COLUMNS].to_dict(orient='records'))
+    if conflict == "update":
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['time', 'symbol'],
+            set_={c: stmt.excluded[c] for c in PRICE_COLUMNS}
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=['time', 'symbol'])
+    # xmax = 0 이면 새로 삽입된 행 (ON CONFLICT DO UPDATE 로 갱신된 행은 xmax 가 채워짐)
+    flags = conn.execute(stmt.returning(literal_column("(xmax = 0)").label("inserted"))).scalars().all()
+    return len(flags), sum(1 for f in flags if f)
+
+
+def _copy_rows(conn, table: str, df: pd.DataFrame, conflict: str, chunk_rows: int) -> tuple:
+    """
+    청크 단위로 CSV를 만들어 COPY로 스테이징 테이블에 흘려보낸 뒤,
+    INSERT ... SELECT ... ON CONFLICT 로 대상 테이블에 병합합니다.
+    청크마다 스테이징을 비우므로 파이썬/DB 양쪽 메모리가 전체 기간 길이와 무관하게 유지됩니다.
+    반환값: (삽입 또는 갱신된 행 수, 그중 새로 삽입된 행 수)
+    """
+    columns = ", ".join(BAR_COLUMNS)
+    copy_sql = f"COPY {STAGING_TABLE} ({columns}) FROM STDIN WITH (FORMAT csv)"
+    merge_sql = f"""
+        WITH merged AS (
+            INSERT INTO {table} ({columns})
+            SELECT {columns} FROM {STAGING_TABLE}
+            {_conflict_clause(conflict)}
+            RETURNING (xmax = 0) AS inserted
+        )
+        SELECT count(*), count(*) FILTER (WHERE inserted) FROM merged
+    """
+
+    written = inserted = 0
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(CREATE_STAGING_SQL)
+        for start in range(0, len(df), chunk_rows):
+            buf = io.StringIO()
+            df.iloc[start:start + chunk_rows][BAR_COLUMNS].to_csv(buf, header=False, index=False)
+            buf.seek(0)
+
+            _copy_from(cursor, copy_sql, buf)
+            cursor.execute(merge_sql)
+            merged, new = cursor.fetchone()
+            written += merged
+            inserted += new
+            cursor.execute(f"TRUNCATE {STAGING_TABLE}")
+    finally:
+        cursor.close()
+    return written, inserted
+
+
+def write_bars(conn, table: str, df: pd.DataFrame, conflict: str = "nothing", chunk_rows: int = BULK_LOAD_CHUNK_ROWS) -> dict:
+    """
+    시세 df를 market_data / market_data_1m 에 적재합니다. (커밋은 호출한 쪽에서)
+
+    - conflict="nothing": 이미 있는 봉은 무시, "update": 정정된 값으로 갱신
+    - BULK_LOAD_COPY_MIN_ROWS 이상이면 COPY 기반 대량 적재, 그보다 적으면 INSERT 한 번
+    - 반환값: {"sent": 보낸 행 수, "written": 실제로 삽입(또는 갱신)된 행 수, "inserted": 그중 새 봉 수}
+    """
+    # 같은 (time, symbol)이 두 번 들어오면 ON CONFLICT DO UPDATE 가 실패하므로 미리 제거
+    df = df.drop_duplicates(subset=['time', 'symbol'], keep='last')
+
+    # COPY 경로는 드라이버 커서를 직접 쓰므로 SQLAlchemy 트랜잭션을 먼저 열어 둠
+    # (열린 트랜잭션이 없으면 스테이징 테이블(ON COMMIT DROP)이 커밋 경계 밖에서 만들어질 수 있음)
+    if not conn.in_transaction():
+        conn.begin()
+
+    if len(df) < BULK_LOAD_COPY_MIN_ROWS:
+        written, inserted = _insert_rows(conn, table, df, conflict) if len(df) else (0, 0)
+    else:
+        written, inserted = _copy_rows(conn, table, df, conflict, chunk_rows)
+
+    return {"sent": len(df), "written": written, "inserted": inserted}
@@ -0,0 +1,358 @@
+import hashlib
+import json
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+
+import numpy as np
+
+from src.core.config import (
+    JOB_BACKEND, JOB_WORKERS, JOB_RESULT_TTL_SEC, JOB_CLAIM_TTL_SEC, JOB_MAX_QUEUE,
+    REDIS_HOST, REDIS_PORT,
+)
+from src.service.backtest import calculate_strategy
+from src.service.portfolio import calculate_portfolio
+from src.service.robustness import calculate_robustness
+from src.service.catalog import symbol_catalog
+from src.service.data_source import get_data_source
+
+# 작업 종류별 실행 함수 (payload 를 키워드 인자로 받음)
+JOB_HANDLERS = {
+    "backtest": calculate_strategy,
+    "portfolio": calculate_portfolio,
+    "robustness": calculate_robustness,
+}
+
+# ==========================================
+# 1. 저장소 백엔드 (Redis 또는 프로세스 내부 대체품)
+# ==========================================
+
+class LocalJobBackend:
+    """
+    테스트/단일 프로세스용 백엔드.
+    큐는 queue.Queue, 작업 기록과 중복 제거 키는 만료 시각이 있는 딕셔너리로 보관합니다.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._jobs = {}  # job_id -> (만료 시각, job)
+        self._keys = {}  # 요청 키 -> (만료 시각, job_id)
+        self._lock = threading.Lock()
+
+    def _alive(self, table: dict, key):
+        item = table.get(key)
+        if item is None:
+            return None
+        expires, value = item
+        if expires is not None and expires < time.monotonic():
+            del table[key]
+            return None
+        return value
+
+    @staticmethod
+    def _expiry(ttl):
+        return time.monotonic() + ttl if ttl else None
+
+    def push(self, job_id: str):
+        self._queue.put(job_id)
+
+    def pop(self, timeout: float):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def save_job(self, job: dict, ttl: float = None):
+        with self._lock:
+            self._jobs[job["job_id"]] = (self._expiry(ttl), dict(job))
+
+    def load_job(self, job_id: str):
+        with self._lock:
+            job = self._alive(self._jobs, job_id)
+            return dict(job) if job is not None else None
+
+    def claim_key(self, key: str, job_id: str, ttl: float):
+        """요청 키를 선점합니다. 이미 같은 키의 작업이 있으면 그 job_id 를 반환합니다."""
+        with self._lock:
+            existing = self._alive(self._keys, key)
+            if existing is not None:
+                return existing
+            self._keys[key] = (self._expiry(ttl), job_id)
+            return None
+
+    def expire_key(self, key: str, job_id: str, ttl: float):
+        with self._lock:
+            if self._alive(self._keys, key) == job_id:
+                self._keys[key] = (self._expiry(ttl), job_id)
+
+    def release_key(self, key: str, job_id: str):
+        with self._lock:
+            if self._alive(self._keys, key) == job_id:
+                del self._keys[key]
+
+
+class RedisJobBackend:
+    """
+    docker-compose 의 Redis 를 쓰는 백엔드. (엔진 프로세스가 여러 개여도 큐/결과/중복 제거를 공유)
+    - 큐: LIST (LPUSH / BRPOP)
+    - 작업 기록: STRING(JSON) + TTL
+    - 중복 제거 키: SET NX EX
+    """
+
+    QUEUE_KEY = "backtest:queue"
+
+    def __init__(self, client):
+        self.client = client
+
+    def push(self, job_id: str):
+        self.client.lpush(self.QUEUE_KEY, job_id)
+
+    def pop(self, timeout: float):
+        item = self.client.brpop(self.QUEUE_KEY, timeout=max(1, int(timeout)))
+        return item[1] if item else None
+
+    def depth(self) -> int:
+        return int(self.client.llen(self.QUEUE_KEY))
+
+    def save_job(self, job: dict, ttl: float = None):
+        key = f"backtest:job:{job['job_id']}"
+        if ttl:
+            self.client.set(key, json.dumps(job), ex=int(ttl))
+        else:
+            self.client.set(key, json.dumps(job))
+
+    def load_job(self, job_id: str):
+        raw = self.client.get(f"backtest:job:{job_id}")
+        return json.loads(raw) if raw else None
+
+    def claim_key(self, key: str, job_id: str, ttl: float):
+        if self.client.set(f"backtest:key:{key}", job_id, nx=True, ex=int(ttl)):
+            return None
+        return self.client.get(f"backtest:key:{key}")
+
+    def expire_key(self, key: str, job_id: str, ttl: float):
+        if self.client.get(f"backtest:key:{key}") == job_id:
+            self.client.expire(f"backtest:key:{key}", int(ttl))
+
+    def release_key(self, key: str, job_id: str):
+        if self.client.get(f"backtest:key:{key}") == job_id:
+            self.client.delete(f"backtest:key:{key}")
+
+
+def make_backend(kind: str = JOB_BACKEND):
+    if kind == "redis":
+        import redis  # Redis 백엔드를 쓸 때만 필요
+
+        return RedisJobBackend(redis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True))
+    if kind == "local":
+        return LocalJobBackend()
+    raise ValueError(f"Unknown job backend: {kind} (expected 'local' or 'redis')")
+
+
+# ==========================================
+# 2. 작업 관리자
+# ==========================================
+
+def data_version(kind: str, payload: dict):
+    """
+    요청이 읽을 데이터의 버전 (봉 개수, 마지막 봉 시각). 새 봉이 들어오면 다른 작업으로 취급됩니다.
+    DB 데이터는 시세를 읽지 않고 종목 카탈로그의 통계로 정합니다. (모르는 종목은 여기서 ValueError)
+    """
+    timeframe = payload.get("timeframe", "1d")
+    if kind == "portfolio":
+        return symbol_catalog.versions(payload["symbols"], timeframe)
+
+    ticker = payload["ticker"]
+    source = get_data_source(payload.get("source"))
+    if source.name == "db":
+        symbol_catalog.require(ticker, timeframe)
+        return symbol_catalog.versions([ticker], timeframe)
+
+    frame = source.load(ticker, timeframe, columns=("time",))
+    return [[ticker, len(frame), str(frame['time'].iloc[-1]) if len(frame) else None]]
+
+
+def request_key(kind: str, payload: dict, version) -> str:
+    raw = json.dumps({"kind": kind, "payload": payload, "version": version}, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+class JobManager:
+    """
+    백테스트를 비동기 작업으로 실행합니다.
+
+    - submit() 은 job_id 만 바로 돌려주고, 워커 스레드가 큐에서 꺼내 실행합니다.
+    - 같은 (종류, 요청 내용, 데이터 버전) 이 대기/실행 중이거나 결과가 TTL 안에 남아 있으면 새로 돌리지 않고 그 작업을 돌려줍니다.
+    - 큐 길이, 대기 시간, 실행 시간을 metrics() 로 확인할 수 있습니다.
+    """
+
+    def __init__(self, backend, workers: int, result_ttl_sec: float, max_queue: int, claim_ttl_sec: float = JOB_CLAIM_TTL_SEC):
+        self.backend = backend
+        self.workers = workers
+        self.result_ttl_sec = result_ttl_sec
+        self.claim_ttl_sec = claim_ttl_sec
+        self.max_queue = max_queue
+        self._threads = []
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._counters = {"submitted": 0, "deduplicated": 0, "completed": 0, "failed": 0}
+        self._wait_ms = deque(maxlen=500)
+        self._run_ms = deque(maxlen=500)
+        self._running = 0
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def start_workers(self):
+        """큐 워커 스레드를 띄웁니다. (서버 시작 시 호출 - 제출을 받지 않은 인스턴스도 공유 큐를 비움)"""
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    # ------------------------------------------
+    # 제출 / 조회
+    # ------------------------------------------
+    def submit(self, kind: str, payload: dict) -> dict:
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind} (expected one of {list(JOB_HANDLERS)})")
+        if self.backend.depth() >= self.max_queue:
+            raise RuntimeError(f"Job queue is full ({self.max_queue})")
+
+        key = request_key(kind, payload, data_version(kind, payload))
+        job_id = uuid.uuid4().hex
+
+        # 대기 + 실행 동안은 claim TTL 로 잡아두고, 끝나면 expire_key 로 결과 TTL 로 바꿈
+        # (결과 TTL 보다 오래 대기/실행되는 작업의 키가 먼저 만료되어 같은 요청이 또 들어가는 것 방지)
+        existing = self.backend.claim_key(key, job_id, self.claim_ttl_sec)
+        if existing is not None:
+            self._count("deduplicated")
+            # 다른 요청이 키를 막 선점하고 아직 작업 기록을 저장하기 전일 수 있음
+            job = self.backend.load_job(existing) or {"job_id": existing, "kind": kind, "status": "queued"}
+            return {**self._public(job), "deduplicated": True}
+
+        job = {
+            "job_id": job_id,
+            "kind": kind,
+            "key": key,
+            "payload": payload,
+            "status": "queued",
+            "submitted_at": time.time(),
+        }
+        self.backend.save_job(job)
+        self.backend.push(job_id)
+        self._count("submitted")
+        return {**self._public(job), "deduplicated": False}
+
+    def get(self, job_id: str, include_result: bool = False):
+        job = self.backend.load_job(job_id)
+        if job is None:
+            return None
+        return self._public(job, include_result=include_result)
+
+    @staticmethod
+    def _public(job: dict, include_result: bool = False) -> dict:
+        out = {k: job.get(k) for k in ("job_id", "kind", "status", "submitted_at", "started_at", "finished_at", "wait_ms", "run_ms", "error")}
+        if include_result:
+            out["result"] = job.get("result")
+        return out
+
+    # ------------------------------------------
+    # 워커
+    # ------------------------------------------
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                job_id = self.backend.pop(timeout=1.0)
+            except Exception as e:
+                print(f"⚠️ [Jobs] Queue pop failed: {e}")
+                time.sleep(1.0)
+                continue
+            if job_id is None:
+                continue
+
+            # 작업 기록을 읽고 쓰다 백엔드(Redis) 오류가 나도 워커 스레드는 계속 돌아야 함
+            try:
+                job = self.backend.load_job(job_id)
+                if job is None:
+                    continue
+                self._execute(job)
+            except Exception as e:
+                print(f"⚠️ [Jobs] Job {job_id} could not be processed: {e}")
+                time.sleep(1.0)
+
+    def _execute(self, job: dict):
+        started = time.time()
+        job.update(status="running", started_at=started, wait_ms=round((started - job["submitted_at"]) * 1000, 1))
+        self.backend.save_job(job)
+        with self._lock:
+            self._running += 1
+            self._wait_ms.append(job["wait_ms"])
+
+        try:
+            result = JOB_HANDLERS[job["kind"]](**job["payload"])
+            job.update(status="done", result=result)
+            self._count("completed")
+        except Exception as e:
+            job.update(status="error", error=str(e))
+            self._count("failed")
+            print(f"❌ [Jobs] {job['kind']} job {job['job_id']} failed: {e}")
+
+        finished = time.time()
+        job.update(finished_at=finished, run_ms=round((finished - started) * 1000, 1))
+        with self._lock:
+            self._running -= 1
+            self._run_ms.append(job["run_ms"])
+
+        # 결과는 TTL 동안 캐시 (실패한 작업은 같은 요청을 바로 다시 돌릴 수 있게 키를 풀어줌)
+        self.backend.save_job(job, ttl=self.result_ttl_sec)
+        if job["status"] == "done":
+            self.backend.expire_key(job["key"], job["job_id"], self.result_ttl_sec)
+        else:
+            self.backend.release_key(job["key"], job["job_id"])
+
+    def shutdown(self):
+        self._stop.set()
+
+    # ------------------------------------------
+    # 지표
+    # ------------------------------------------
+    @staticmethod
+    def _summary(values) -> dict:
+        if not values:
+            return {"count": 0, "avg": None, "p50": None, "p95": None, "max": None}
+        arr = np.asarray(values, dtype=float)
+        return {
+            "count": len(arr),
+            "avg": round(float(arr.mean()), 1),
+            "p50": round(float(np.percentile(arr, 50)), 1),
+            "p95": round(float(np.percentile(arr, 95)), 1),
+            "max": round(float(arr.max()), 1),
+        }
+
+    def metrics(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            wait_ms, run_ms, running = list(self._wait_ms), list(self._run_ms), self._running
+        return {
+            "backend": type(self.backend).__name__,
+            "workers": self.workers,
+            "queue_depth": self.backend.depth(),
+            "running": running,
+            **counters,
+            "wait_ms": self._summary(wait_ms),
+            "run_ms": self._summary(run_ms),
+        }
+
+
+# 프로세스 전역 작업 관리자 (워커 스레드는 첫 제출 때 시작)
+job_manager = JobManager(make_backend(), JOB_WORKERS, JOB_RESULT_TTL_SEC, JOB_MAX_QUEUE)
@@ -0,0 +1,216 @@
+import numpy as np
+import pandas as pd
+
+from src.service.bar_store import bar_store
+from src.service.catalog import symbol_catalog
+from src.service.signals import build_vote_masks, resolve_positions
+from src.service.serialization import format_times, round_column
+
+# 자금 배분 방식
+# - equal: 매수 신호가 켜진 종목 전체에 동일 비중
+# - top_n: 매수 신호가 켜진 종목 중 최근 수익률(모멘텀) 상위 N개에만 동일 비중
+ALLOCATIONS = ("equal", "top_n")
+
+
+# ==========================================
+# 1. 데이터 정렬 ([시간 × 종목] 2차원 배열)
+# ==========================================
+
+def load_panel(symbols: list, timeframe: str = "1d"):
+    """
+    여러 종목의 종가를 공통 시간축 위의 [시간 × 종목] DataFrame 으로 맞춥니다.
+    - 시간축은 모든 종목 봉 시각의 합집합
+    - 상장 전 구간은 NaN, 중간에 빠진 봉은 직전 종가로 채움 (그 봉의 수익률은 0)
+    반환값: (close DataFrame, 데이터가 없는 종목 리스트)
+    """
+    # 카탈로그에 없거나 봉이 없는 종목은 시세 테이블을 조회하지 않고 바로 missing 처리
+    symbols, unknown = symbol_catalog.known(symbols, timeframe)
+    frames = bar_store.get_frames(symbols, timeframe)
+    present = [s for s in symbols if not frames[s].empty]
+    missing = unknown + [s for s in symbols if frames[s].empty]
+    if not present:
+        return pd.DataFrame(), missing
+
+    times = np.unique(np.concatenate([frames[s]['time'].dt.tz_convert(None).to_numpy() for s in present]))
+    close = np.full((len(times), len(present)), np.nan)
+    for j, symbol in enumerate(present):
+        frame = frames[symbol]
+        rows = np.searchsorted(times, frame['time'].dt.tz_convert(None).to_numpy())
+        close[rows, j] = frame['close'].to_numpy(dtype=float)
+
+    index = pd.DatetimeIndex(times, name='time')
+    panel = pd.DataFrame(close, index=index, columns=present).ffill()
+    return panel, missing
+
+
+# ==========================================
+# 2. 지표 (열마다 pandas_ta 와 같은 정의를 2차원 배열 한 번에 계산)
+# ==========================================
+
+def _seeded_ewm(values: pd.DataFrame, length: int, alpha: float) -> pd.DataFrame:
+    """
+    열마다 첫 length 개의 평균으로 시작하는 지수 평활. (pandas_ta 의 ema / rma 와 같은 정의)
+    열마다 시작 시점(상장일)이 달라도 NaN 앞부분을 건너뛰고 자기 시점부터 시드합니다.
+    """
+    nobs = values.notna().cumsum()
+    seed = values.rolling(length).mean()
+    seeded = values.where(nobs > length).mask(nobs == length, seed)
+    return seeded.ewm(alpha=alpha, adjust=False).mean()
+
+
+def panel_indicators(close: pd.DataFrame, params: dict) -> dict:
+    """[시간 × 종목] 종가로 SMA / RSI / MACD / Bollinger Bands 를 계산해 {이름: 2차원 배열} 로 반환합니다."""
+    sma_short = int(params.get('sma_short', 5))
+    sma_long = int(params.get('sma_long', 20))
+    fast, slow, sig = int(params.get('macd_fast', 12)), int(params.get('macd_slow', 26)), int(params.get('macd_sig', 9))
+    bb_window, bb_std = int(params.get('bb_window', 20)), float(params.get('bb_std', 2.0))
+
+    # (1) SMA
+    sma_s = close.rolling(sma_short).mean()
+    sma_l = close.rolling(sma_long).mean()
+
+    # (2) RSI (Wilder 평활)
+    diff = close.diff()
+    gain = _seeded_ewm(diff.clip(lower=0), 14, 1 / 14)
+    loss = _seeded_ewm(diff.clip(upper=0), 14, 1 / 14)
+    rsi = 100 * gain / (gain + loss.abs())
+
+    # (3) MACD (SMA 시드 EMA)
+    macd = _seeded_ewm(close, fast, 2 / (fast + 1)) - _seeded_ewm(close, slow, 2 / (slow + 1))
+    macd_s = _seeded_ewm(macd, sig, 2 / (sig + 1))
+
+    # (4) Bollinger Bands (모표준편차)
+    bb_m = close.rolling(bb_window).mean()
+    deviation = bb_std * close.rolling(bb_window).std(ddof=0)
+
+    return {
+        'close': close.to_numpy(),
+        'sma_s': sma_s.to_numpy(),
+        'sma_l': sma_l.to_numpy(),
+        'rsi': rsi.to_numpy(),
+        'macd': macd.to_numpy(),
+        'macd_h': (macd - macd_s).to_numpy(),
+        'macd_s': macd_s.to_numpy(),
+        'bb_l': (bb_m - deviation).to_numpy(),
+        'bb_m': bb_m.to_numpy(),
+        'bb_u': (bb_m + deviation).to_numpy(),
+    }
+
+
+# ==========================================
+# 3. 자금 배분 / 리밸런싱
+# ==========================================
+
+def allocate(positions: np.ndarray, close: np.ndarray, allocation: str = "equal", top_n: int = 5,
+             rank_lookback: int = 20, rebalance_every: int = 1) -> np.ndarray:
+    """
+    봉별 포지션(0/1) 행렬로 [시간 × 종목] 비중 행렬을 만듭니다. (각 행의 합 ≤ 1, 나머지는 현금)
+
+    - rebalance_every 봉마다 목표 비중을 새로 정하고, 그 사이에는 비중을 유지합니다.
+    - 리밸런싱 사이에 청산된 종목의 비중은 현금으로 남고, 새로 진입한 종목은 다음 리밸런싱부터 담습니다.
+    """
+    if allocation not in ALLOCATIONS:
+        raise ValueError(f"Unknown allocation: {allocation} (expected one of {ALLOCATIONS})")
+    if rebalance_every < 1:
+        raise ValueError("rebalance_every must be >= 1")
+
+    held = positions.astype(bool)
+
+    if allocation == "top_n":
+        if top_n < 1:
+            raise ValueError("top_n must be >= 1")
+        if rank_lookback < 1:
+            raise ValueError("rank_lookback must be >= 1")
+        # 최근 rank_lookback 봉 수익률로 보유 후보의 순위를 매겨 상위 top_n 개만 남김
+        with np.errstate(invalid='ignore', divide='ignore'):
+            momentum = close / np.roll(close, rank_lookback, axis=0) - 1
+        momentum[:rank_lookback] = np.nan
+        score = np.where(held & ~np.isnan(momentum), momentum, -np.inf)
+        order = np.argsort(-score, axis=1, kind='stable')
+        rank = np.empty_like(order)
+        np.put_along_axis(rank, order, np.arange(order.shape[1])[None, :], axis=1)
+        held &= (rank < top_n) & np.isfinite(score)
+
+    count = held.sum(axis=1, keepdims=True)
+    target = np.divide(held, count, out=np.zeros(held.shape), where=count > 0)
+
+    # 리밸런싱 봉의 목표 비중을 다음 리밸런싱 전까지 유지 (청산된 종목은 0)
+    rebalance_rows = np.arange(len(target)) - np.arange(len(target)) % rebalance_every
+    return target[rebalance_rows] * positions.astype(bool)
+
+
+# ==========================================
+# 4. 포트폴리오 백테스트
+# ==========================================
+
+def run_portfolio_backtest(close: pd.DataFrame, params: dict, allocation: str = "equal", top_n: int = 5,
+                           rank_lookback: int = 20, rebalance_every: int = 1) -> dict:
+    """
+    [시간 × 종목] 종가 한 장으로 지표 → 포지션 → 비중 → 수익률을 종목 루프 없이 계산합니다.
+    반환값: {weights, positions, returns(포트폴리오), contributions([시간 × 종목]), equity}
+    """
+    columns = panel_indicators(close, params)
+
+    # 단일 종목 백테스트와 같은 투표 규칙 / 상태 머신을 열마다 적용
+    valid, buy, sell = build_vote_masks(columns, params)
+    positions = resolve_positions(valid, buy, sell)
+
+    prices = columns['close']
+    weights = allocate(positions, prices, allocation, top_n, rank_lookback, rebalance_every)
+
+    # t 봉의 비중으로 t → t+1 수익률을 받음 (단일 종목의 pct_change().shift(-1) 과 동일)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        forward = np.empty_like(prices)
+        forward[:-1] = prices[1:] / prices[:-1] - 1
+        forward[-1:] = np.nan
+    contributions = np.nan_to_num(weights * forward)
+    returns = contributions.sum(axis=1)
+
+    return {
+        "positions": positions,
+        "weights": weights,
+        "contributions": contributions,
+        "returns": returns,
+        "equity": np.cumprod(1 + returns),
+    }
+
+
+def calculate_portfolio(symbols: list, params: dict, allocation: str = "equal", top_n: int = 5,
+                        rank_lookback: int = 20, rebalance_every: int = 1, timeframe: str = "1d"):
+    """여러 종목 포트폴리오 백테스트 결과(자산 곡선 + 종목별 기여도)를 UI용 응답으로 포장합니다."""
+    close, missing = load_panel(symbols, timeframe)
+    if close.empty:
+        return {"error": "No data", "missing": missing}
+
+    result = run_portfolio_backtest(close, params, allocation, top_n, rank_lookback, rebalance_every)
+
+    equity = result["equity"]
+    drawdown = equity / np.maximum.accumulate(equity) - 1
+    weights = result["weights"]
+    trade_signal = np.diff(result["positions"], axis=0, prepend=0)
+
+    contributions = []
+    for j, symbol in enumerate(close.columns):
+        contributions.append({
+            "symbol": symbol,
+            # 포트폴리오 수익률 중 이 종목이 낸 부분의 합 (%)
+            "contribution": round(float(result["contributions"][:, j].sum()) * 100, 2),
+            "avg_weight": round(float(weights[:, j].mean()), 4),
+            "final_weight": round(float(weights[-1, j]), 4),
+            "trade_count": int((trade_signal[:, j] == 1).sum()),
+        })
+    contributions.sort(key=lambda c: c["contribution"], reverse=True)
+
+    return {
+        "symbols": list(close.columns),
+        "missing": missing,
+        "timeframe": timeframe,
+        "allocation": allocation,
+        "equity": {
+            "time": format_times(pd.Series(close.index).dt.tz_localize("UTC"), timeframe).tolist(),
+            "value": round_column(equity, 4).tolist(),
+        },
+        "final_return": round(float(equity[-1] - 1) * 100, 2),
+        "max_drawdown": round(float(drawdown.min()) * 100, 2),
+        "contributions": contributions,
+    }
@@ -0,0 +1,195 @@
+import numpy as np
+
+from src.core.config import ROBUSTNESS_MAX_PATHS, ROBUSTNESS_CHUNK_BYTES
+from src.core.metrics import stage
+from src.service.backtest import load_market_data, run_backtest
+
+# 샤프 비율 연환산용 1년치 봉 개수 (미국 정규장 6.5시간 기준)
+BARS_PER_YEAR = {
+    "1m": 252 * 390,
+    "5m": 252 * 78,
+    "15m": 252 * 26,
+    "1h": 252 * 7,
+    "1d": 252,
+}
+METRICS = ("final_return", "max_drawdown", "sharpe")
+
+
+# ==========================================
+# 1. 경로별 지표 (경로 x 봉 행렬을 한 번에 계산)
+# ==========================================
+
+def path_metrics(returns: np.ndarray, bars_per_year: int) -> dict:
+    """
+    returns: (경로 수, 봉 수) 봉별 전략 수익률
+    경로마다 최종 수익률(%), 최대 낙폭(%), 연환산 샤프 비율을 반환합니다.
+    """
+    equity = np.cumprod(1.0 + returns, axis=1)
+    drawdown = equity / np.maximum.accumulate(equity, axis=1) - 1.0
+
+    mean = returns.mean(axis=1)
+    std = returns.std(axis=1, ddof=1) if returns.shape[1] > 1 else np.zeros(len(returns))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, mean / std * np.sqrt(bars_per_year), 0.0)
+
+    return {
+        "final_return": (equity[:, -1] - 1.0) * 100,
+        "max_drawdown": drawdown.min(axis=1) * 100,
+        "sharpe": sharpe,
+    }
+
+
+def summarize_distribution(values: np.ndarray, confidence: float) -> dict:
+    """경로별 값들의 평균 / 표준편차 / 신뢰구간 / 분위수"""
+    alpha = (1.0 - confidence) / 2
+    lo, hi = np.quantile(values, [alpha, 1.0 - alpha])
+    p5, p25, p50, p75, p95 = np.quantile(values, [0.05, 0.25, 0.5, 0.75, 0.95])
+    return {
+        "mean": round(float(values.mean()), 4),
+        "std": round(float(values.std(ddof=1)) if len(values) > 1 else 0.0, 4),
+        "ci": [round(float(lo), 4), round(float(hi), 4)],
+        "percentiles": {
+            "p5": round(float(p5), 4),
+            "p25": round(float(p25), 4),
+            "p50": round(float(p50), 4),
+            "p75": round(float(p75), 4),
+            "p95": round(float(p95), 4),
+        },
+    }
+
+
+# ==========================================
+# 2. 시뮬레이션 경로 생성 (파이썬 루프 없이 경로 묶음 단위)
+# ==========================================
+
+def block_bootstrap(returns: np.ndarray, n_paths: int, block_size: int, rng) -> np.ndarray:
+    """
+    이동 블록 부트스트랩: 길이 block_size 의 연속 구간을 무작위로 이어 붙여 원래 길이의 경로를 만듭니다.
+    (블록 안에서는 변동성 군집 / 자기상관이 보존됨)
+    """
+    n = len(returns)
+    block_size = max(1, min(block_size, n))
+    n_blocks = -(-n // block_size)
+    starts = rng.integers(0, n - block_size + 1, size=(n_paths, n_blocks))
+    index = (starts[:, :, None] + np.arange(block_size)).reshape(n_paths, -1)[:, :n]
+    return returns[index]
+
+
+def jitter_entries(position: np.ndarray, bar_returns: np.ndarray, n_paths: int, max_shift: int, rng) -> np.ndarray:
+    """
+    진입 / 청산 시점을 매매마다 독립적으로 -max_shift ~ +max_shift 봉 흔든 뒤의 전략 수익률 경로.
+
+    포지션이 바뀌는 봉(이벤트)만 옮기고, 각 봉의 포지션은 '그 시점까지 마지막 이벤트의 값'으로 복원합니다.
+    (이벤트 번호를 흩뿌린 뒤 누적 최댓값으로 찾으므로 경로 x 봉 행렬 연산 몇 번으로 끝남)
+    """
+    n = len(position)
+    events = np.flatnonzero(np.diff(position)) + 1
+    if len(events) == 0 or max_shift == 0:
+        return np.broadcast_to(bar_returns * position, (n_paths, n)).copy()
+
+    shifts = rng.integers(-max_shift, max_shift + 1, size=(n_paths, len(events)))
+    times = np.clip(events + shifts, 1, n - 1)
+    # 흔든 뒤 순서가 뒤바뀐 이벤트는 시각순으로 다시 정렬 (같은 시각이면 원래 순서가 뒤인 쪽이 이김)
+    order = np.argsort(times, axis=1, kind="stable")
+    times = np.take_along_axis(times, order, axis=1)
+    values = position[events][order]
+
+    marks = np.zeros((n_paths, n), dtype=np.int64)
+    rows = np.repeat(np.arange(n_paths), len(events))
+    marks[rows, times.ravel()] = np.tile(np.arange(1, len(events) + 1), n_paths)
+    np.maximum.accumulate(marks, axis=1, out=marks)
+
+    # marks == 0 은 첫 이벤트 이전 (처음 포지션 유지)
+    states = np.concatenate([np.full((n_paths, 1), position[0]), values], axis=1)
+    jittered = np.take_along_axis(states, marks, axis=1)
+    return bar_returns * jittered
+
+
+def _chunked(n_paths: int, n_bars: int, budget_bytes: int):
+    """경로 x 봉 float64 행렬 몇 개가 메모리 예산 안에 들어가도록 경로를 나눕니다."""
+    # 한 묶음에 (경로 x 봉) 크기 임시 배열이 ~4개 생김 (인덱스, 수익률, 누적, 낙폭)
+    size = max(1, int(budget_bytes // (n_bars * 8 * 4)))
+    for start in range(0, n_paths, size):
+        yield min(size, n_paths - start)
+
+
+def simulate(generate, n_paths: int, n_bars: int, bars_per_year: int) -> dict:
+    """generate(k) 로 k 개 경로씩 만들어 지표만 모읍니다. (전체 경로 행렬은 메모리에 올리지 않음)"""
+    collected = {name: [] for name in METRICS}
+    for size in _chunked(n_paths, n_bars, ROBUSTNESS_CHUNK_BYTES):
+        for name, values in path_metrics(generate(size), bars_per_year).items():
+            collected[name].append(values)
+    return {name: np.concatenate(parts) for name, parts in collected.items()}
+
+
+# ==========================================
+# 3. 진입점
+# ==========================================
+
+def calculate_robustness(
+    ticker: str,
+    params: dict,
+    paths: int = 1000,
+    block_size: int = 20,
+    max_shift: int = 5,
+    seed: int = None,
+    confidence: float = 0.95,
+    timeframe: str = "1d",
+    source: str = None,
+):
+    """
+    백테스트 결과가 얼마나 우연에 기댄 것인지 봅니다.
+
+    - bootstrap: 봉별 전략 수익률을 블록 단위로 다시 뽑은 paths 개 경로
+    - entry_timing: 매매 시점을 ±max_shift 봉 흔든 paths 개 경로
+    각각 최종 수익률 / 최대 낙폭 / 샤프 비율의 분포와 신뢰구간(confidence)을 반환합니다.
+    """
+    if not 1 <= paths <= ROBUSTNESS_MAX_PATHS:
+        raise ValueError(f"paths must be between 1 and {ROBUSTNESS_MAX_PATHS}")
+    if block_size < 1 or max_shift < 0:
+        raise ValueError("block_size must be >= 1 and max_shift must be >= 0")
+    if not 0 < confidence < 1:
+        raise ValueError("confidence must be between 0 and 1")
+    if timeframe not in BARS_PER_YEAR:
+        raise ValueError(f"Unknown timeframe: {timeframe} (expected one of {list(BARS_PER_YEAR)})")
+
+    df = load_market_data(ticker, timeframe, source)
+    if df.empty:
+        return {"error": "No data"}
+
+    df = run_backtest(df, params, symbol=ticker, timeframe=timeframe)
+    strategy_returns = df['strategy_return'].fillna(0).to_numpy(dtype=float)
+    bar_returns = df['pct_change'].fillna(0).to_numpy(dtype=float)
+    position = df['position'].fillna(0).to_numpy(dtype=float)
+    n = len(df)
+    bars_per_year = BARS_PER_YEAR[timeframe]
+
+    # 두 시뮬레이션이 서로의 난수 소비에 영향받지 않도록 시드를 나눔
+    boot_seed, timing_seed = np.random.SeedSequence(seed).spawn(2)
+    boot_rng, timing_rng = np.random.default_rng(boot_seed), np.random.default_rng(timing_seed)
+
+    with stage("robustness", "bootstrap"):
+        boot = simulate(lambda k: block_bootstrap(strategy_returns, k, block_size, boot_rng), paths, n, bars_per_year)
+    with stage("robustness", "entry_timing"):
+        timing = simulate(lambda k: jitter_entries(position, bar_returns, k, max_shift, timing_rng), paths, n, bars_per_year)
+
+    observed = {name: round(float(v[0]), 4) for name, v in path_metrics(strategy_returns[None, :], bars_per_year).items()}
+
+    def report(sim: dict) -> dict:
+        out = {name: summarize_distribution(sim[name], confidence) for name in METRICS}
+        out["prob_loss"] = round(float((sim["final_return"] < 0).mean()), 4)
+        return out
+
+    return {
+        "ticker": ticker,
+        "timeframe": timeframe,
+        "bars": n,
+        "paths": paths,
+        "block_size": block_size,
+        "max_shift": max_shift,
+        "seed": seed,
+        "confidence": confidence,
+        "observed": observed,
+        "bootstrap": report(boot),
+        "entry_timing": report(timing),
+    }
@@ -0,0 +1,191 @@
+import ast
+from functools import lru_cache
+
+import numpy as np
+
+# 규칙에서 쓸 수 있는 컬럼 (add_indicators 가 만드는 지표 + 종가)
+RULE_COLUMNS = frozenset({
+    "close",
+    "sma_s", "sma_l",
+    "rsi",
+    "macd", "macd_h", "macd_s",
+    "bb_l", "bb_m", "bb_u",
+})
+MAX_RULE_LENGTH = 1000
+RULE_CACHE_SIZE = 256
+
+# 비교 연산 → NumPy 함수
+_COMPARE = {
+    ast.Lt: np.less, ast.LtE: np.less_equal,
+    ast.Gt: np.greater, ast.GtE: np.greater_equal,
+    ast.Eq: np.equal, ast.NotEq: np.not_equal,
+}
+_ARITHMETIC = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide}
+
+
+def _prev(x):
+    """한 봉 앞의 값 (시간 축 = 0번 축, 첫 봉은 NaN)"""
+    if np.ndim(x) == 0:
+        return x
+    out = np.full(np.shape(x), np.nan)
+    out[1:] = x[:-1]
+    return out
+
+
+def _crosses_above(a, b):
+    return np.greater(a, b) & np.less_equal(_prev(a), _prev(b))
+
+
+def _crosses_below(a, b):
+    return np.less(a, b) & np.greater_equal(_prev(a), _prev(b))
+
+
+# 함수 이름 → (인자 수, 인자 종류, 반환 종류, 구현)
+FUNCTIONS = {
+    "crosses_above": (2, "num", "bool", _crosses_above),
+    "crosses_below": (2, "num", "bool", _crosses_below),
+    "prev": (1, "num", "num", _prev),
+    "abs": (1, "num", "num", np.abs),
+    "min": (2, "num", "num", np.minimum),
+    "max": (2, "num", "num", np.maximum),
+}
+
+
+# ==========================================
+# 1. 파싱 / 검증 / 컴파일
+# ==========================================
+# 파이썬 식 문법(ast)으로 읽되 허용한 노드만 받고, 노드마다 배열 연산 클로저로 바꿉니다.
+# 각 노드는 ("num" | "bool", fn(env)) 로 컴파일되며 env 는 {컬럼명: 배열} 입니다.
+
+def _expect(kind: str, expected: str, node, text: str):
+    if kind != expected:
+        what = "a condition" if expected == "bool" else "a number"
+        raise ValueError(f"Expected {what} at '{ast.get_source_segment(text, node)}'")
+
+
+def _compile(node, text: str, names: set):
+    if isinstance(node, ast.Constant):
+        value = node.value
+        if isinstance(value, bool):
+            return "bool", lambda env: value
+        if isinstance(value, (int, float)):
+            value = float(value)
+            return "num", lambda env: value
+        raise ValueError(f"Unsupported constant in rule: {value!r}")
+
+    if isinstance(node, ast.Name):
+        name = node.id
+        if name in ("true", "false"):
+            value = name == "true"
+            return "bool", lambda env: value
+        if name not in RULE_COLUMNS:
+            raise ValueError(f"Unknown column in rule: {name} (expected one of {sorted(RULE_COLUMNS)})")
+        names.add(name)
+        return "num", lambda env: env[name]
+
+    if isinstance(node, ast.BoolOp):
+        parts = []
+        for child in node.values:
+            kind, fn = _compile(child, text, names)
+            _expect(kind, "bool", child, text)
+            parts.append(fn)
+        combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+
+        def evaluate(env):
+            result = parts[0](env)
+            for part in parts[1:]:
+                result = combine(result, part(env))
+            return result
+        return "bool", evaluate
+
+    if isinstance(node, ast.UnaryOp):
+        kind, fn = _compile(node.operand, text, names)
+        if isinstance(node.op, ast.Not):
+            _expect(kind, "bool", node.operand, text)
+            return "bool", lambda env: np.logical_not(fn(env))
+        if isinstance(node.op, (ast.USub, ast.UAdd)):
+            _expect(kind, "num", node.operand, text)
+            sign = -1.0 if isinstance(node.op, ast.USub) else 1.0
+            return "num", lambda env: sign * fn(env)
+
+    if isinstance(node, ast.BinOp) and type(node.op) in _ARITHMETIC:
+        op = _ARITHMETIC[type(node.op)]
+        (lk, left), (rk, right) = _compile(node.left, text, names), _compile(node.right, text, names)
+        _expect(lk, "num", node.left, text)
+        _expect(rk, "num", node.right, text)
+        return "num", lambda env: op(left(env), right(env))
+
+    if isinstance(node, ast.Compare) and all(type(op) in _COMPARE for op in node.ops):
+        # a < b < c 는 (a < b) and (b < c)
+        operands = []
+        for child in [node.left, *node.comparators]:
+            kind, fn = _compile(child, text, names)
+            _expect(kind, "num", child, text)
+            operands.append(fn)
+        ops = [_COMPARE[type(op)] for op in node.ops]
+
+        def evaluate(env):
+            values = [fn(env) for fn in operands]
+            result = ops[0](values[0], values[1])
+            for i in range(1, len(ops)):
+                result = np.logical_and(result, ops[i](values[i], values[i + 1]))
+            return result
+        return "bool", evaluate
+
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+        name = node.func.id
+        if name not in FUNCTIONS:
+            raise ValueError(f"Unknown function in rule: {name} (expected one of {sorted(FUNCTIONS)})")
+        arity, arg_kind, result_kind, impl = FUNCTIONS[name]
+        if len(node.args) != arity:
+            raise ValueError(f"{name}() takes {arity} argument(s), got {len(node.args)}")
+        args = []
+        for child in node.args:
+            kind, fn = _compile(child, text, names)
+            _expect(kind, arg_kind, child, text)
+            args.append(fn)
+        return result_kind, lambda env: impl(*(fn(env) for fn in args))
+
+    raise ValueError(f"Unsupported syntax in rule: '{ast.get_source_segment(text, node) or type(node).__name__}'")
+
+
+class Rule:
+    """컴파일된 규칙 하나. names 는 규칙이 읽는 컬럼 목록입니다."""
+
+    def __init__(self, text: str, names: frozenset, fn):
+        self.text = text
+        self.names = names
+        self._fn = fn
+
+    def evaluate(self, columns, shape: tuple) -> np.ndarray:
+        """
+        columns 는 {컬럼명: float 배열} (1차원 [시간] 또는 2차원 [시간 × 종목]).
+        NaN 이 끼인 비교는 거짓입니다. 반환값은 shape 모양의 불리언 배열.
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result = self._fn(columns)
+        return np.broadcast_to(np.asarray(result, dtype=bool), shape).copy()
+
+
+@lru_cache(maxsize=RULE_CACHE_SIZE)
+def compile_rule(text: str) -> Rule:
+    """
+    규칙 문자열을 한 번 파싱/검증해 배열 연산으로 컴파일합니다. (같은 문자열은 캐시된 결과 재사용)
+    예) "sma_s > sma_l and rsi < 60", "crosses_below(macd, macd_s) or close > bb_u"
+    잘못된 규칙이면 ValueError
+    """
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError("Rule must be a non-empty string")
+    if len(text) > MAX_RULE_LENGTH:
+        raise ValueError(f"Rule is too long (max {MAX_RULE_LENGTH} characters)")
+    text = text.strip()
+    try:
+        tree = ast.parse(text, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid rule syntax: {e.msg} in '{text}'")
+
+    names = set()
+    kind, fn = _compile(tree.body, text, names)
+    if kind != "bool":
+        raise ValueError(f"Rule must be a condition (comparison or true/false): '{text}'")
+    return Rule(text, frozenset(names), fn)
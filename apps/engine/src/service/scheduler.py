@@ -0,0 +1,202 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from src.core.config import (
+    INGEST_MAX_WORKERS, INGEST_RATE_PER_SEC, INGEST_RATE_BURST,
+    INGEST_MAX_RETRIES, INGEST_BACKOFF_SEC,
+    INGEST_1M_INTERVAL_MIN, INGEST_DAILY_AT_UTC,
+)
+from src.service.catalog import reconcile_1m_stats
+from src.service.ingest import save_to_db
+from src.service.ingest_1m import save_1m_to_db
+
+# 수집 종류별 실행 함수
+INGEST_JOBS = {
+    "1d": save_to_db,
+    "1m": save_1m_to_db,
+}
+
+
+class TokenBucket:
+    """초당 rate 개씩 토큰이 차는 버킷. 토큰이 없으면 찰 때까지 기다립니다."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class IngestScheduler:
+    """
+    TARGET_TICKERS 수집을 담당하는 스케줄러.
+
+    - 워커 수가 제한된 스레드 풀에서 종목별 수집을 동시에 실행 (느린 종목이 다른 종목을 막지 않음)
+    - 고정 sleep 대신 토큰 버킷으로 야후 요청 속도를 제한
+    - 일시 장애(fetch/write 실패, 예외)는 지수 백오프로 재시도
+    - 같은 (종류, 종목, 전체 여부)가 이미 대기/실행 중이면 새로 넣지 않고 기존 작업을 돌려줌
+      (증분 요청은 진행 중인 전체 수집이 있으면 그것을 돌려줌)
+    - 1분봉은 N분마다, 일봉은 하루 한 번 장 마감 후 주기 수집 (이때 1분봉 보관 기간 만료분을 카탈로그 통계에 반영)
+    """
+
+    def __init__(self, max_workers: int, rate_per_sec: float, burst: int, max_retries: int, backoff_sec: float):
+        self.max_retries = max_retries
+        self.backoff_sec = backoff_sec
+        self._bucket = TokenBucket(rate_per_sec, burst)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self._lock = threading.Lock()
+        self._inflight = {}  # (kind, ticker, full) -> Future
+        self._status = {}    # (kind, ticker) -> dict
+        self._stop = threading.Event()
+        self._periodic_thread = None
+
+    # ------------------------------------------
+    # 작업 실행
+    # ------------------------------------------
+    def _update(self, key, **fields):
+        with self._lock:
+            self._status.setdefault(key, {"symbol": key[1], "kind": key[0]}).update(fields)
+
+    def _run(self, kind: str, ticker: str, full: bool):
+        key = (kind, ticker)
+        job = INGEST_JOBS[kind]
+        result = None
+
+        for attempt in range(1, self.max_retries + 2):
+            self._bucket.acquire()
+            self._update(key, state="running", attempts=attempt, started_at=datetime.now(timezone.utc).isoformat())
+            started = time.monotonic()
+
+            try:
+                result = job(ticker, full=full)
+                error = result.get("message") if result and result.get("status") == "error" else None
+            except Exception as e:
+                result, error = None, str(e)
+
+            latency_ms = round((time.monotonic() - started) * 1000, 1)
+
+            if error is None:
+                self._update(
+                    key,
+                    state=result.get("status", "success") if result else "success",
+                    last_success=datetime.now(timezone.utc).isoformat(),
+                    last_latency_ms=latency_ms,
+                    last_rows=result.get("rows") if result else None,
+                    last_error=None,
+                )
+                return result
+
+            self._update(key, state="retrying", last_error=error, last_latency_ms=latency_ms)
+            if attempt <= self.max_retries:
+                # 지수 백오프 + 지터 (여러 종목이 동시에 재시도하며 몰리는 것 방지)
+                delay = self.backoff_sec * (2 ** (attempt - 1))
+                time.sleep(delay + random.uniform(0, delay / 2))
+
+        self._update(key, state="error", failed_at=datetime.now(timezone.utc).isoformat())
+        print(f"❌ [Scheduler] {kind} ingestion for {ticker} failed after {self.max_retries + 1} attempts: {error}")
+        return result or {"status": "error", "ticker": ticker, "message": error}
+
+    def submit(self, kind: str, ticker: str, full: bool = False):
+        """수집 작업을 큐에 넣고 Future를 반환합니다."""
+        if kind not in INGEST_JOBS:
+            raise ValueError(f"Unknown ingestion kind: {kind} (expected one of {list(INGEST_JOBS)})")
+
+        # 전체 수집은 증분 수집이 대신할 수 없으므로 따로 묶음 (증분 요청은 진행 중인 전체 수집으로 대신함)
+        key = (kind, ticker, full)
+        with self._lock:
+            for candidate in (key,) if full else (key, (kind, ticker, True)):
+                future = self._inflight.get(candidate)
+                if future is not None and not future.done():
+                    return future
+
+            self._status.setdefault((kind, ticker), {"symbol": ticker, "kind": kind})["state"] = "queued"
+            future = self._executor.submit(self._run, kind, ticker, full)
+            self._inflight[key] = future
+
+        future.add_done_callback(lambda f, key=key: self._forget(key, f))
+        return future
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def submit_all(self, kind: str, tickers: list, full: bool = False) -> list:
+        return [self.submit(kind, ticker, full=full) for ticker in tickers]
+
+    # ------------------------------------------
+    # 주기 수집
+    # ------------------------------------------
+    def start_periodic(self, tickers: list, minute_interval_min: int = INGEST_1M_INTERVAL_MIN, daily_at_utc: str = INGEST_DAILY_AT_UTC):
+        """1분봉은 minute_interval_min 분마다, 일봉은 매일 daily_at_utc(UTC) 이후 한 번 수집합니다."""
+        if self._periodic_thread is not None:
+            return
+
+        hour, minute = (int(v) for v in daily_at_utc.split(":"))
+
+        def loop():
+            next_minute_run = time.monotonic() + minute_interval_min * 60
+            # 오늘 수집 시각이 이미 지난 뒤에 시작했으면 오늘 몫은 건너뜀 (재시작/증설 때마다 전체 수집이 돌지 않도록)
+            started = datetime.now(timezone.utc)
+            last_daily_date = started.date() if (started.hour, started.minute) >= (hour, minute) else None
+
+            while not self._stop.wait(15):
+                if time.monotonic() >= next_minute_run:
+                    self.submit_all("1m", tickers)
+                    next_minute_run = time.monotonic() + minute_interval_min * 60
+
+                now = datetime.now(timezone.utc)
+                if (now.hour, now.minute) >= (hour, minute) and last_daily_date != now.date():
+                    self.submit_all("1d", tickers)
+                    last_daily_date = now.date()
+                    # 보관 기간이 지나 지워진 1분봉 청크를 카탈로그 통계에도 반영
+                    try:
+                        reconcile_1m_stats()
+                    except Exception as e:
+                        print(f"⚠️ [Scheduler] 1m stats reconcile failed: {e}")
+
+        self._periodic_thread = threading.Thread(target=loop, name="ingest-periodic", daemon=True)
+        self._periodic_thread.start()
+        print(f"⏰ [Scheduler] Periodic ingestion started (1m every {minute_interval_min}min, 1d at {daily_at_utc} UTC)")
+
+    def shutdown(self):
+        self._stop.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # ------------------------------------------
+    # 상태 조회
+    # ------------------------------------------
+    def snapshot(self) -> dict:
+        with self._lock:
+            symbols = sorted(self._status.values(), key=lambda s: (s["kind"], s["symbol"]))
+            return {
+                "inflight": len(self._inflight),
+                "periodic": self._periodic_thread is not None and not self._stop.is_set(),
+                "symbols": [dict(s) for s in symbols],
+            }
+
+
+# 프로세스 전역 스케줄러 인스턴스
+ingest_scheduler = IngestScheduler(
+    max_workers=INGEST_MAX_WORKERS,
+    rate_per_sec=INGEST_RATE_PER_SEC,
+    burst=INGEST_RATE_BURST,
+    max_retries=INGEST_MAX_RETRIES,
+    backoff_sec=INGEST_BACKOFF_SEC,
+)
@@ -0,0 +1,167 @@
+import json
+import msgpack
+import numpy as np
+import pandas as pd
+
+# 차트에 내려줄 지표 컬럼 (소수점 2자리)
+INDICATOR_COLUMNS = ("sma_s", "sma_l", "rsi", "macd", "macd_h", "bb_u", "bb_m", "bb_l")
+
+# 응답 레이아웃
+# - rows: 봉마다 딕셔너리 하나 (기존 기본 형식)
+# - columns: 필드마다 배열 하나 (키 반복이 없어 페이로드가 작음)
+LAYOUTS = ("rows", "columns")
+
+# Accept 헤더로 고를 수 있는 바이너리 인코딩
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+# 스트리밍 응답 (한 줄에 JSON 하나)
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def round_column(values: np.ndarray, digits: int) -> np.ndarray:
+    """
+    파이썬 내장 round()와 같은 결과를 배열 단위로 계산합니다.
+
+    np.round는 x * 10^d 를 거치므로 .5 경계에 아주 가까운 값에서 내장 round()와
+    마지막 자리가 달라질 수 있습니다. 그런 값만 골라 내장 round()로 다시 계산합니다.
+    """
+    rounded = np.round(values, digits)
+
+    with np.errstate(invalid="ignore"):
+        scaled = values * 10.0 ** digits
+        distance = np.abs(scaled - np.floor(scaled) - 0.5)
+        suspicious = distance < np.maximum(1e-6, np.abs(scaled) * 1e-12)
+
+    for i in np.flatnonzero(suspicious):
+        rounded[i] = round(float(values[i]), digits)
+    return rounded
+
+
+def format_dates(times: pd.Series) -> pd.Series:
+    """
+    시각 컬럼을 'YYYY-MM-DD' 문자열로 바꿉니다.
+    dt.strftime 보다 훨씬 빠른 datetime64[D] 변환을 사용합니다. (타임존이 있으면 현지 날짜 기준)
+    """
+    if times.dt.tz is not None:
+        times = times.dt.tz_localize(None)
+    days = times.to_numpy().astype("datetime64[D]")
+    return pd.Series(days.astype(str), index=times.index)
+
+
+def display_keys(times: pd.Series, timeframe: str = "1d") -> np.ndarray:
+    """
+    format_times 와 같은 기준의 표시 시각을 문자열 없이 datetime64 배열로 (일봉: 날짜, 분/시간봉: UTC 초).
+    같은 키면 차트에서 같은 봉이므로, 문자열을 만들기 전에 중복 제거에 씁니다.
+    """
+    if timeframe == "1d":
+        if times.dt.tz is not None:
+            times = times.dt.tz_localize(None)
+        return times.to_numpy().astype("datetime64[D]")
+    if times.dt.tz is not None:
+        times = times.dt.tz_convert("UTC").dt.tz_localize(None)
+    return times.to_numpy().astype("datetime64[s]")
+
+
+def format_times(times: pd.Series, timeframe: str = "1d") -> pd.Series:
+    """
+    일봉은 'YYYY-MM-DD', 분/시간봉은 초 단위 UTC ISO 8601('YYYY-MM-DDTHH:MM:SSZ') 문자열로 바꿉니다.
+    (분봉을 날짜로만 표시하면 하루 안의 봉들이 같은 키로 뭉개지므로 시각까지 유지)
+    """
+    if timeframe == "1d":
+        return format_dates(times)
+    if times.dt.tz is not None:
+        times = times.dt.tz_convert("UTC").dt.tz_localize(None)
+    seconds = times.to_numpy().astype("datetime64[s]").astype(str)
+    return pd.Series(np.char.add(seconds, "Z"), index=times.index)
+
+
+def lttb_indices(values: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: 모양(꺾이는 점)을 최대한 살리면서 max_points 개 봉만 고릅니다.
+    첫/마지막 봉은 항상 남기고, 나머지 구간을 max_points - 2 개 버킷으로 나눠
+    (직전에 고른 점, 현재 버킷의 후보, 다음 버킷의 평균) 삼각형 넓이가 가장 큰 후보를 버킷마다 하나씩 고릅니다.
+    """
+    n = len(values)
+    if max_points >= n or n <= 2:
+        return np.arange(n)
+    max_points = max(max_points, 3)
+
+    every = (n - 2) / (max_points - 2)
+    # 버킷 i = [edges[i], edges[i + 1]), 마지막 '다음 버킷'은 끝 점 하나 [n - 1, n)
+    edges = (np.arange(max_points) * every).astype(np.int64) + 1
+    edges[-2:] = n - 1, n
+
+    picked = np.empty(max_points, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(max_points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = hi, edges[i + 2]
+        avg_x = (next_lo + next_hi - 1) / 2.0
+        avg_y = values[next_lo:next_hi].mean()
+
+        xs = np.arange(lo, hi)
+        area = np.abs((a - avg_x) * (values[lo:hi] - values[a]) - (a - xs) * (avg_y - values[a]))
+        a = lo + int(np.argmax(area))
+        picked[i + 1] = a
+    return picked
+
+
+def downsample_indices(values: np.ndarray, keep: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    values(보통 누적 수익률 곡선)를 LTTB 로 줄이되, keep 이 True 인 봉(매수/매도 액션)은 반드시 남깁니다.
+    액션 봉 수만큼 LTTB 몫을 줄여서 전체가 max_points 를 넘지 않게 합니다. (액션 봉만으로 넘으면 액션 봉은 모두 유지)
+    """
+    forced = np.flatnonzero(keep)
+    budget = max(3, max_points - len(forced))
+    return np.union1d(lttb_indices(values, budget), forced)
+
+
+def _nullable(values: np.ndarray) -> list:
+    """NaN은 None으로 바꾼 파이썬 리스트를 반환합니다."""
+    out = values.astype(object)
+    out[np.isnan(values)] = None
+    return out.tolist()
+
+
+def _float_column(df: pd.DataFrame, name: str) -> np.ndarray:
+    return pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=float)
+
+
+def build_columns(df: pd.DataFrame) -> dict:
+    """
+    결과 df를 필드별 리스트로 변환합니다. (반올림, NaN→null, 매매 액션 매핑을 컬럼 단위로 처리)
+    df에는 time_str, cum_ret, trade_signal, 지표 컬럼이 있어야 합니다.
+    """
+    cum_ret = _float_column(df, "cum_ret")
+    value = round_column(cum_ret, 4)
+    value[np.isnan(cum_ret)] = 1.0
+
+    trade_signal = _float_column(df, "trade_signal")
+    action = np.full(len(df), None, dtype=object)
+    action[trade_signal == 1.0] = "buy"
+    action[trade_signal == -1.0] = "sell"
+
+    columns = {
+        "time": df["time_str"].tolist(),
+        "value": value.tolist(),
+    }
+    for name in INDICATOR_COLUMNS:
+        columns[name] = _nullable(round_column(_float_column(df, name), 2))
+    columns["action"] = action.tolist()
+    return columns
+
+
+def columns_to_rows(columns: dict) -> list:
+    """필드별 리스트를 기존 row-of-dicts 형식으로 바꿉니다."""
+    keys = list(columns)
+    return [dict(zip(keys, values)) for values in zip(*columns.values())]
+
+
+def encode_msgpack(payload: dict) -> bytes:
+    return msgpack.packb(payload, use_bin_type=True)
+
+
+def encode_ndjson(messages):
+    """메시지(dict)들을 한 줄씩 JSON 으로 인코딩해 내보냅니다. (StreamingResponse 본문용)"""
+    for message in messages:
+        yield json.dumps(message, separators=(",", ":"), allow_nan=False) + "\n"
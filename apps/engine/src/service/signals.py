@@ -0,0 +1,219 @@
+import numpy as np
+import pandas as pd
+
+from src.service.rules import compile_rule
+
+# 시그널 계산 모드
+# - vectorized: NumPy 마스크 + 배열 연산으로 포지션 결정 (기본값)
+# - loop: 기존 행 단위 파이썬 루프 (동등성 검증용 레퍼런스)
+SIGNAL_MODES = ("vectorized", "loop")
+
+
+def _strategy_flags(params: dict):
+    """사용자가 켠 전략 플래그를 (sma, rsi, macd, bb) 순서로 반환합니다."""
+    return (
+        params.get('enable_sma', True),
+        params.get('enable_rsi', True),
+        params.get('enable_macd', False),
+        params.get('enable_bb', False),
+    )
+
+
+def _column(df, name: str) -> np.ndarray:
+    """
+    지표 컬럼을 float 배열로 꺼냅니다. (None으로 채워진 컬럼은 NaN 처리)
+    df는 DataFrame 또는 {컬럼명: 배열} 딕셔너리
+    (스트리밍 워커의 1행 평가, 포트폴리오 백테스트의 [시간 × 종목] 2차원 배열)
+    """
+    values = df[name]
+    if isinstance(values, np.ndarray) and values.ndim > 1:
+        return values.astype(float, copy=False)
+    return np.asarray(pd.to_numeric(values, errors='coerce'), dtype=float)
+
+
+def flag_rules(params: dict) -> tuple:
+    """
+    기존 enable_* 플래그 파라미터를 같은 동작의 (매수 규칙, 매도 규칙) 문자열로 바꿉니다.
+    - 매수: 켜진 지표 중 아무도 '반대(veto)'하지 않음 → not (반대 조건) 들의 and
+    - 매도: 켜진 지표 중 하나라도 '팔아라' → 트리거 조건들의 or
+    (NaN 비교는 거짓이므로 not (...) 형태로 두어야 루프 버전과 비트 단위로 같음)
+    """
+    use_sma, use_rsi, use_macd, use_bb = _strategy_flags(params)
+
+    # 🛡️ 안전장치: 아무 전략도 안 켰으면 매매 안 함
+    if not (use_sma or use_rsi or use_macd or use_bb):
+        return "false", "false"
+
+    vetoes, triggers = [], []
+    if use_sma:
+        vetoes.append("not (sma_s <= sma_l)")   # 역배열이면 매수 금지
+        triggers.append("sma_s < sma_l")        # 데드크로스면 매도
+    if use_rsi:
+        vetoes.append(f"not (rsi >= {float(params.get('rsi_buy_k', 60))!r})")  # 과열 구간이면 매수 금지
+    if use_macd:
+        vetoes.append("not (macd <= macd_s)")   # 시그널 선 아래면 매수 금지
+        triggers.append("macd < macd_s")        # 하향 돌파 시 매도
+    if use_bb:
+        triggers.append("close > bb_u")         # 밴드 상단 돌파 시 매도
+
+    return " and ".join(vetoes) or "true", " or ".join(triggers) or "false"
+
+
+def strategy_rules(params: dict) -> tuple:
+    """
+    (매수 규칙, 매도 규칙) 을 컴파일해서 반환합니다.
+    params 의 buy_rule / sell_rule 이 있으면 그 식을, 없는 쪽은 enable_* 플래그에서 만든 식을 씁니다.
+    """
+    buy_default, sell_default = flag_rules(params)
+    return (
+        compile_rule(params.get('buy_rule') or buy_default),
+        compile_rule(params.get('sell_rule') or sell_default),
+    )
+
+
+def build_vote_masks(df, params: dict):
+    """
+    각 봉(bar)에 대해 매수 가능 / 매도 트리거 여부를 불리언 배열로 계산합니다.
+
+    반환값: (valid, buy, sell)
+    - valid: 지표 워밍업(NaN)이 끝나 전략 판단이 가능한 구간
+    - buy: 매수 규칙이 참인 구간
+    - sell: 매도 규칙이 참인 구간
+    """
+    buy_rule, sell_rule = strategy_rules(params)
+
+    sma_l = _column(df, 'sma_l')
+    shape = sma_l.shape
+    columns = {'sma_l': sma_l, 'macd_s': _column(df, 'macd_s'), 'bb_u': _column(df, 'bb_u')}
+
+    # 데이터가 충분치 않은 구간(NaN)은 판단 보류
+    valid = ~(np.isnan(sma_l) | np.isnan(columns['macd_s']) | np.isnan(columns['bb_u']))
+
+    # 규칙이 읽는 컬럼만 꺼내서 평가 (NaN 비교는 거짓)
+    for name in buy_rule.names | sell_rule.names:
+        if name not in columns:
+            columns[name] = _column(df, name)
+    return valid, buy_rule.evaluate(columns, shape), sell_rule.evaluate(columns, shape)
+
+
+def resolve_positions(valid: np.ndarray, buy: np.ndarray, sell: np.ndarray) -> np.ndarray:
+    """
+    진입/청산 상태 머신(0: 현금, 1: 보유)을 배열 연산 한 번으로 풉니다.
+
+    루프 버전의 전이 규칙:
+    - 현금 상태에서 buy 이면 진입, 보유 상태에서 sell 이면 청산
+    - buy 만 참 → 상태는 무조건 1, sell 만 참 → 무조건 0 (상태 '설정')
+    - 둘 다 참 → 현재 상태가 뒤집힘 (상태 '토글')
+    - 둘 다 거짓 또는 NaN 구간 → 상태 유지
+
+    따라서 각 봉의 상태 = (마지막 '설정' 값) XOR (그 이후 '토글' 횟수의 홀짝) 입니다.
+    NaN 구간은 상태를 건드리지 않고 출력만 0으로 내보냅니다.
+
+    2차원 배열([시간 × 종목])이면 종목(열)마다 독립적으로 같은 규칙을 적용합니다.
+    """
+    n = len(valid)
+    if n == 0:
+        return np.zeros(valid.shape, dtype=np.int64)
+
+    set_on = valid & buy & ~sell
+    set_off = valid & sell & ~buy
+    toggle = valid & buy & sell
+
+    toggle_count = np.cumsum(toggle, axis=0)
+    is_set = set_on | set_off
+    idx = np.arange(n).reshape((n,) + (1,) * (valid.ndim - 1))
+
+    # 각 봉 시점에서 가장 최근 '설정' 이벤트의 인덱스 (없으면 -1 → 초기 상태 0)
+    last_set = np.maximum.accumulate(np.where(is_set, idx, -1), axis=0)
+    has_set = last_set >= 0
+    safe_last = np.where(has_set, last_set, 0)
+
+    base_state = np.where(has_set, np.take_along_axis(set_on, safe_last, axis=0), False)
+    toggles_since = toggle_count - np.where(has_set, np.take_along_axis(toggle_count, safe_last, axis=0), 0)
+
+    state = base_state ^ (toggles_since % 2 == 1)
+    return np.where(valid, state, False).astype(np.int64)
+
+
+def compute_positions_loop(df: pd.DataFrame, params: dict) -> list:
+    """기존 행 단위 루프 구현 (레퍼런스 모드). 결과는 벡터 버전과 비트 단위로 같아야 합니다."""
+    if params.get('buy_rule') or params.get('sell_rule'):
+        raise ValueError("signal_mode='loop' only supports the enable_* flag params (no buy_rule/sell_rule)")
+    use_sma, use_rsi, use_macd, use_bb = _strategy_flags(params)
+
+    position = 0  # 0: 현금, 1: 보유
+    signals = []
+
+    for i in range(len(df)):
+        # 데이터가 충분치 않은 초반 구간(NaN)은 패스
+        if pd.isna(df['sma_l'].iloc[i]) or pd.isna(df['macd_s'].iloc[i]) or pd.isna(df['bb_u'].iloc[i]):
+            signals.append(0)
+            continue
+
+        row = df.iloc[i]
+
+        # 🟢 매수 검증 (Buy Validation)
+        # 기본적으로 '매수 가능' 상태로 시작하고, 켜져 있는 지표들이 '반대'하면 매수 취소
+        buy_vote = True
+
+        # 🔴 매도 검증 (Sell Trigger)
+        # 켜져 있는 지표 중 하나라도 '팔아라' 하면 매도
+        sell_vote = False
+
+        # --- [1] SMA 로직 ---
+        if use_sma:
+            # 단기가 장기보다 아래면 매수 금지 (역배열)
+            if row['sma_s'] <= row['sma_l']:
+                buy_vote = False
+            # 단기가 장기 아래로 뚫으면 매도 (데드크로스)
+            if row['sma_s'] < row['sma_l']:
+                sell_vote = True
+
+        # --- [2] RSI 로직 ---
+        if use_rsi:
+            # 과열 구간(예: 60이상)이면 매수 금지 (너무 비쌀 때 안 삼)
+            if row['rsi'] >= params.get('rsi_buy_k', 60):
+                buy_vote = False
+
+        # --- [3] MACD 로직 ---
+        if use_macd:
+            # MACD가 시그널 선 아래면 매수 금지 (하락 모멘텀)
+            if row['macd'] <= row['macd_s']:
+                buy_vote = False
+            # 데드크로스(하향 돌파) 시 매도
+            if row['macd'] < row['macd_s']:
+                sell_vote = True
+
+        # --- [4] Bollinger Bands 로직 ---
+        if use_bb:
+            # 가격이 밴드 상단을 뚫으면 '과매수'로 보고 매도 (이익 실현)
+            if row['close'] > row['bb_u']:
+                sell_vote = True
+
+        # 🛡️ 안전장치: 아무 전략도 안 켰으면 매매 안 함
+        if not (use_sma or use_rsi or use_macd or use_bb):
+            buy_vote = False
+            sell_vote = False
+
+        # --- 포지션 결정 ---
+        if position == 0:
+            if buy_vote:
+                position = 1
+        elif position == 1:
+            if sell_vote:
+                position = 0
+
+        signals.append(position)
+
+    return signals
+
+
+def compute_positions(df: pd.DataFrame, params: dict, mode: str = "vectorized"):
+    """지표가 계산된 df로부터 봉별 포지션(0/1)을 계산합니다."""
+    if mode == "loop":
+        return compute_positions_loop(df, params)
+    if mode != "vectorized":
+        raise ValueError(f"Unknown signal mode: {mode} (expected one of {SIGNAL_MODES})")
+
+    valid, buy, sell = build_vote_masks(df, params)
+    return resolve_positions(valid, buy, sell)
@@ -0,0 +1,413 @@
+import json
+import math
+import queue
+import threading
+from collections import deque
+
+import numpy as np
+
+from src.core.config import REDIS_HOST, REDIS_PORT, STREAM_IN_CHANNEL, STREAM_OUT_CHANNEL, STREAM_WARMUP_BARS
+from src.service.signals import build_vote_masks
+
+NAN = float("nan")
+
+
+# ==========================================
+# 1. O(1) 증분 지표 (배치 pandas_ta 계산과 같은 값을 내도록 구현)
+# ==========================================
+
+class RollingMean:
+    """
+    고정 길이 이동평균 (SMA).
+    pandas rolling().mean() 과 같은 방식(추가/제거 각각 Kahan 보정)으로 누적합을 유지합니다.
+    """
+
+    def __init__(self, length: int):
+        self.length = length
+        self.window = deque()
+        self.sum = 0.0
+        self._comp_add = 0.0
+        self._comp_remove = 0.0
+        self._neg = 0
+        self._same = 0
+        self._prev = NAN
+
+    def update(self, value: float) -> float:
+        if len(self.window) == self.length:
+            old = self.window.popleft()
+            y = -old - self._comp_remove
+            t = self.sum + y
+            self._comp_remove = t - self.sum - y
+            self.sum = t
+            if math.copysign(1.0, old) < 0:
+                self._neg -= 1
+
+        self.window.append(value)
+        y = value - self._comp_add
+        t = self.sum + y
+        self._comp_add = t - self.sum - y
+        self.sum = t
+        if math.copysign(1.0, value) < 0:
+            self._neg += 1
+        self._same = self._same + 1 if value == self._prev else 1
+        self._prev = value
+
+        n = len(self.window)
+        if n < self.length:
+            return NAN
+        mean = self.sum / n
+        if self._same >= n:
+            return self._prev
+        if self._neg == 0 and mean < 0:
+            return 0.0
+        if self._neg == n and mean > 0:
+            return 0.0
+        return mean
+
+
+class RollingVariance:
+    """
+    고정 길이 모분산 (ddof=0). 슬라이딩 Welford 방식으로 평균/제곱편차합을 O(1)에 갱신합니다.
+    부동소수점 오차가 쌓이지 않도록 length 번마다 창 전체로 다시 계산합니다. (분할 상환 O(1))
+    """
+
+    def __init__(self, length: int):
+        self.length = length
+        self.window = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+        self._since_resync = 0
+
+    def update(self, value: float) -> float:
+        if len(self.window) < self.length:
+            self.window.append(value)
+            delta = value - self.mean
+            self.mean += delta / len(self.window)
+            self.m2 += delta * (value - self.mean)
+        else:
+            old = self.window.popleft()
+            self.window.append(value)
+            old_mean = self.mean
+            self.mean += (value - old) / self.length
+            self.m2 += (value - old) * (value - self.mean + old - old_mean)
+
+            self._since_resync += 1
+            if self._since_resync >= self.length:
+                values = np.asarray(self.window)
+                self.mean = values.mean()
+                self.m2 = float(((values - self.mean) ** 2).sum())
+                self._since_resync = 0
+
+        if len(self.window) < self.length:
+            return NAN
+        return max(self.m2, 0.0) / self.length
+
+
+class SeededEma:
+    """
+    첫 period 개의 평균(SMA)으로 시작하는 EMA. (pandas_ta macd 의 TA-Lib 정렬 방식과 동일)
+    시드 전에는 NaN 을 반환합니다.
+    """
+
+    def __init__(self, period: int):
+        self.period = period
+        self.k = 2.0 / (period + 1)
+        self._seed = []
+        self.value = NAN
+
+    def update(self, x: float) -> float:
+        if self._seed is not None:
+            self._seed.append(x)
+            if len(self._seed) == self.period:
+                self.value = np.asarray(self._seed).mean()
+                self._seed = None
+            return self.value
+        self.value = self.k * x + (1 - self.k) * self.value
+        return self.value
+
+
+class WilderRma:
+    """
+    RSI용 Wilder 평활 (pandas_ta rma: SMA 시드 + ewm(alpha=1/length, adjust=False)).
+    """
+
+    def __init__(self, length: int):
+        self.length = length
+        self.alpha = 1.0 / length
+        self._seed = []
+        self.value = NAN
+
+    def update(self, x: float) -> float:
+        if self._seed is not None:
+            self._seed.append(x)
+            if len(self._seed) == self.length:
+                self.value = np.asarray(self._seed).mean()
+                self._seed = None
+            return self.value
+
+        # pandas ewm(adjust=False) 의 갱신식을 그대로 따름
+        old_wt = 1.0 - self.alpha
+        if self.value != x:
+            self.value = (old_wt * self.value + self.alpha * x) / (old_wt + self.alpha)
+        return self.value
+
+
+class Rsi:
+    def __init__(self, length: int = 14):
+        self._prev_close = None
+        self._gain = WilderRma(length)
+        self._loss = WilderRma(length)
+
+    def update(self, close: float) -> float:
+        if self._prev_close is None:
+            self._prev_close = close
+            return NAN
+        diff = close - self._prev_close
+        self._prev_close = close
+
+        gain = self._gain.update(diff if diff > 0 else 0.0)
+        loss = self._loss.update(diff if diff < 0 else 0.0)
+        return 100 * gain / (gain + abs(loss))
+
+
+class Macd:
+    """
+    MACD 선 = fast EMA - slow EMA (각각 자기 시드 시점부터),
+    시그널 선 = MACD 선이 유효해진 뒤 signal 개로 시드한 EMA.
+    """
+
+    def __init__(self, fast: int, slow: int, signal: int):
+        self._fast = SeededEma(fast)
+        self._slow = SeededEma(slow)
+        self._signal = SeededEma(signal)
+
+    def update(self, close: float):
+        fast = self._fast.update(close)
+        slow = self._slow.update(close)
+        macd = fast - slow
+        if math.isnan(macd):
+            return NAN, NAN, NAN
+        signal = self._signal.update(macd)
+        return macd, macd - signal, signal
+
+
+class IndicatorState:
+    """한 종목의 스트리밍 지표 상태. update(close) 한 번이 O(1) 입니다."""
+
+    def __init__(self, params: dict):
+        self.sma_s = RollingMean(int(params.get('sma_short', 5)))
+        self.sma_l = RollingMean(int(params.get('sma_long', 20)))
+        self.rsi = Rsi(14)
+        self.macd = Macd(int(params.get('macd_fast', 12)), int(params.get('macd_slow', 26)), int(params.get('macd_sig', 9)))
+        self.bb_mid = RollingMean(int(params.get('bb_window', 20)))
+        self.bb_var = RollingVariance(int(params.get('bb_window', 20)))
+        self.bb_std = float(params.get('bb_std', 2.0))
+
+    def update(self, close: float) -> dict:
+        macd, macd_h, macd_s = self.macd.update(close)
+        bb_m = self.bb_mid.update(close)
+        deviation = self.bb_std * math.sqrt(self.bb_var.update(close))
+        return {
+            "close": close,
+            "sma_s": self.sma_s.update(close),
+            "sma_l": self.sma_l.update(close),
+            "rsi": self.rsi.update(close),
+            "macd": macd,
+            "macd_h": macd_h,
+            "macd_s": macd_s,
+            "bb_l": bb_m - deviation,
+            "bb_m": bb_m,
+            "bb_u": bb_m + deviation,
+        }
+
+
+class SymbolSignal:
+    """지표 상태 + 포지션 상태 머신. 배치 백테스트의 position 컬럼과 같은 값을 봉마다 냅니다."""
+
+    def __init__(self, params: dict):
+        self.params = params
+        self.indicators = IndicatorState(params)
+        self.state = 0      # 내부 포지션 (NaN 구간에도 유지)
+        self.position = 0   # 출력 포지션 (NaN 구간은 0, 배치의 df['position'] 과 동일)
+        self.previous = None  # 직전 봉의 지표 값 (crosses_above / prev 규칙용)
+
+    def update(self, close: float):
+        """봉 하나를 반영하고 (지표 값, 포지션 변화: 1.0 매수 / -1.0 매도 / 0.0) 를 반환합니다."""
+        row = self.indicators.update(close)
+
+        # 배치와 같은 매수/매도 규칙을 [직전 봉, 현재 봉] 2행짜리 배열에 적용하고 마지막 행만 사용
+        previous = self.previous or dict.fromkeys(row, NAN)
+        valid, buy, sell = build_vote_masks({k: np.array([previous[k], v]) for k, v in row.items()}, self.params)
+        self.previous = row
+
+        if valid[-1]:
+            if self.state == 0 and buy[-1]:
+                self.state = 1
+            elif self.state == 1 and sell[-1]:
+                self.state = 0
+            position = self.state
+        else:
+            position = 0
+
+        change = float(position - self.position)
+        self.position = position
+        return row, change
+
+
+def replay_positions(closes, params: dict) -> np.ndarray:
+    """종가 배열을 스트리밍 방식으로 재생해 봉별 포지션을 반환합니다. (배치 결과와 비교 검증용)"""
+    signal = SymbolSignal(params)
+    positions = np.zeros(len(closes), dtype=np.int64)
+    for i, close in enumerate(closes):
+        signal.update(float(close))
+        positions[i] = signal.position
+    return positions
+
+
+# ==========================================
+# 2. Pub/Sub 브로커 (Redis 또는 프로세스 내부 대체품)
+# ==========================================
+
+class LocalBroker:
+    """테스트용 프로세스 내부 Pub/Sub. redis.Redis 의 publish / pubsub 일부만 흉내냅니다."""
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self.published = []  # (channel, message) 기록
+
+    def publish(self, channel: str, message):
+        with self._lock:
+            self.published.append((channel, message))
+            targets = list(self._subscribers.get(channel, []))
+        for q in targets:
+            q.put({"type": "message", "channel": channel, "data": message})
+        return len(targets)
+
+    def pubsub(self):
+        return _LocalPubSub(self)
+
+
+class _LocalPubSub:
+    def __init__(self, broker: LocalBroker):
+        self._broker = broker
+        self._queue = queue.Queue()
+        self._channels = []
+
+    def subscribe(self, *channels):
+        with self._broker._lock:
+            for channel in channels:
+                self._broker._subscribers.setdefault(channel, []).append(self._queue)
+                self._channels.append(channel)
+
+    def get_message(self, timeout: float = 0.0):
+        try:
+            return self._queue.get(timeout=timeout) if timeout else self._queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def close(self):
+        with self._broker._lock:
+            for channel in self._channels:
+                self._broker._subscribers[channel].remove(self._queue)
+        self._channels = []
+
+
+def redis_client():
+    import redis  # 스트리밍 워커를 켤 때만 필요
+
+    return redis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
+
+
+# ==========================================
+# 3. 스트리밍 시그널 워커
+# ==========================================
+
+class SignalWorker:
+    """
+    market_data 채널의 봉 메시지를 구독해 종목별 지표/포지션을 증분 갱신하고,
+    포지션이 바뀌면 trade_signal 채널로 매수/매도 명령을 발행합니다.
+
+    입력 메시지(JSON): {"symbol": "AAPL", "time": "...", "close": 123.4}  ("price" 도 허용)
+    출력 메시지(JSON): {"symbol", "time", "action": "buy"|"sell", "price", "position"}
+    """
+
+    def __init__(self, broker, params: dict, in_channel: str = STREAM_IN_CHANNEL, out_channel: str = STREAM_OUT_CHANNEL):
+        self.broker = broker
+        self.params = params
+        self.in_channel = in_channel
+        self.out_channel = out_channel
+        self.symbols = {}  # symbol -> SymbolSignal
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _signal(self, symbol: str) -> SymbolSignal:
+        signal = self.symbols.get(symbol)
+        if signal is None:
+            signal = self.symbols[symbol] = SymbolSignal(self.params)
+        return signal
+
+    def warm_up(self, symbol: str, closes):
+        """과거 종가로 상태를 미리 채웁니다. (발행 없이, 첫 틱부터 지표가 유효하도록)"""
+        signal = self._signal(symbol)
+        for close in closes:
+            signal.update(float(close))
+
+    def handle(self, message: dict):
+        """봉 메시지 하나를 처리하고, 포지션이 바뀌었으면 발행한 시그널을 반환합니다."""
+        symbol = message["symbol"]
+        close = float(message.get("close", message.get("price")))
+
+        _, change = self._signal(symbol).update(close)
+        if change == 0:
+            return None
+
+        out = {
+            "symbol": symbol,
+            "time": message.get("time"),
+            "action": "buy" if change > 0 else "sell",
+            "price": close,
+            "position": self.symbols[symbol].position,
+        }
+        self.broker.publish(self.out_channel, json.dumps(out))
+        return out
+
+    def run(self):
+        pubsub = self.broker.pubsub()
+        pubsub.subscribe(self.in_channel)
+        print(f"📡 Signal worker subscribed to '{self.in_channel}' → publishing to '{self.out_channel}'")
+        try:
+            while not self._stop.is_set():
+                msg = pubsub.get_message(timeout=1.0)
+                if not msg or msg.get("type") != "message":
+                    continue
+                try:
+                    self.handle(json.loads(msg["data"]))
+                except (KeyError, TypeError, ValueError) as e:
+                    print(f"⚠️ Bad market_data message skipped: {e}")
+        finally:
+            pubsub.close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="signal-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+def start_signal_worker(tickers: list, params: dict = None, broker=None) -> SignalWorker:
+    """Redis(또는 주어진 broker)에 붙는 워커를 만들고, 1분봉 이력으로 워밍업한 뒤 백그라운드로 실행합니다."""
+    from src.service.bar_store import bar_store
+
+    worker = SignalWorker(broker or redis_client(), params or {})
+    for ticker in tickers:
+        try:
+            df = bar_store.get_frame(ticker, "1m")
+        except Exception as e:
+            print(f"⚠️ Warm-up skipped for {ticker}: {e}")
+            continue
+        worker.warm_up(ticker, df['close'].to_numpy()[-STREAM_WARMUP_BARS:])
+
+    worker.start()
+    return worker
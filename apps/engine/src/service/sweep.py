@@ -0,0 +1,167 @@
+import itertools
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+
+from src.core.config import SWEEP_MAX_WORKERS, SWEEP_MAX_COMBINATIONS
+from src.service.backtest import load_market_data, run_backtest, package_results, summarize_backtest
+
+# 정렬 기준으로 쓸 수 있는 요약 지표 (True: 클수록 좋음)
+SORT_KEYS = {
+    "final_return": True,
+    "max_drawdown": True,   # 음수 값이므로 0에 가까울수록(클수록) 좋음
+    "trade_count": False,
+}
+
+# 워커 프로세스마다 한 번만 받아두는 원본 OHLCV (조합마다 df를 다시 보내지 않기 위함)
+_worker_symbol = None
+_worker_df = None
+
+
+def _init_worker(symbol, df):
+    global _worker_symbol, _worker_df
+    _worker_symbol = symbol
+    _worker_df = df
+
+
+def _run_combination(index: int, params: dict):
+    """
+    워커에서 한 조합을 돌리고 요약 지표만 돌려줍니다. (결과 배열은 버림)
+    워커별 지표 캐시 덕분에 rsi_buy_k / enable_* 만 다른 조합은 지표 계산을 건너뜁니다.
+    """
+    summary = summarize_backtest(run_backtest(_worker_df, params, symbol=_worker_symbol))
+    return index, summary
+
+
+def _range_count(key: str, spec: dict) -> int:
+    """범위 형식 값의 개수 (stop 포함)"""
+    start, stop, step = spec["start"], spec["stop"], spec.get("step", 1)
+    if step <= 0:
+        raise ValueError(f"step must be positive for '{key}'")
+    # 부동소수점 누적 오차 방지를 위해 개수를 먼저 구하고 생성
+    return max(int(np.floor((stop - start) / step + 1e-9)) + 1, 0)
+
+
+def count_combinations(grid: dict) -> int:
+    """grid 를 펼치지 않고 조합 수만 계산합니다. (값 개수의 곱)"""
+    total = 1
+    for key, spec in grid.items():
+        if isinstance(spec, dict):
+            total *= _range_count(key, spec)
+        elif isinstance(spec, (list, tuple)):
+            total *= len(spec)
+    return total
+
+
+def expand_grid(grid: dict) -> list:
+    """
+    파라미터 범위를 조합 리스트로 펼칩니다.
+
+    grid 값 형식:
+    - 리스트: {"sma_short": [5, 10, 20]}
+    - 범위: {"sma_long": {"start": 20, "stop": 60, "step": 10}} (stop 포함)
+    - 단일 값: {"enable_macd": True}
+    """
+    keys, values = [], []
+    for key, spec in grid.items():
+        if isinstance(spec, dict):
+            start, step = spec["start"], spec.get("step", 1)
+            spec = [round(start + i * step, 10) for i in range(_range_count(key, spec))]
+            if all(float(v).is_integer() for v in (start, step)):
+                spec = [int(v) for v in spec]
+        elif not isinstance(spec, (list, tuple)):
+            spec = [spec]
+
+        if not spec:
+            raise ValueError(f"Empty range for '{key}'")
+        keys.append(key)
+        values.append(list(spec))
+
+    return [dict(zip(keys, combo)) for combo in itertools.product(*values)]
+
+
+def run_sweep(
+    ticker: str,
+    base_params: dict,
+    grid: dict,
+    max_workers: int = None,
+    time_budget_sec: float = None,
+    sort_by: str = "final_return",
+    top_n: int = 20,
+    include_results: bool = False,
+):
+    """
+    같은 OHLCV 데이터(한 번만 로드)로 여러 파라미터 조합을 프로세스 풀에서 돌리고
+    요약 지표 기준으로 정렬된 표를 반환합니다.
+
+    - max_workers: 요청 워커 수 (SWEEP_MAX_WORKERS 로 상한)
+    - time_budget_sec: 이 시간이 지나면 남은 조합을 취소하고 끝난 것만 반환 (조기 종료)
+    - include_results: True 이면 상위 top_n 조합만 차트용 results 배열을 다시 계산해 붙임
+    """
+    if sort_by not in SORT_KEYS:
+        raise ValueError(f"Unknown sort key: {sort_by} (expected one of {list(SORT_KEYS)})")
+
+    # 펼치기 전에 개수부터 확인 (큰 grid 를 메모리에 다 만들지 않도록)
+    total = count_combinations(grid)
+    if total > SWEEP_MAX_COMBINATIONS:
+        raise ValueError(f"Too many combinations: {total} (max {SWEEP_MAX_COMBINATIONS})")
+    combos = [{**base_params, **combo} for combo in expand_grid(grid)]
+
+    df = load_market_data(ticker)
+    if df.empty:
+        return {"error": "No data"}
+
+    workers = max(1, min(max_workers or SWEEP_MAX_WORKERS, SWEEP_MAX_WORKERS, len(combos)))
+    deadline = time.monotonic() + time_budget_sec if time_budget_sec else None
+    started = time.monotonic()
+
+    summaries = {}
+    cancelled = False
+
+    if workers == 1:
+        # 조합이 적거나 워커 1개면 프로세스 풀 오버헤드 없이 현재 프로세스에서 실행
+        _init_worker(ticker, df)
+        for i, params in enumerate(combos):
+            if deadline and time.monotonic() > deadline:
+                cancelled = True
+                break
+            _, summaries[i] = _run_combination(i, params)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(ticker, df))
+        try:
+            pending = {executor.submit(_run_combination, i, params) for i, params in enumerate(combos)}
+            while pending:
+                timeout = None
+                if deadline:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        cancelled = True
+                        break
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i, summary = future.result()
+                    summaries[i] = summary
+        finally:
+            # 조기 종료 시 아직 시작 안 한 조합은 취소
+            executor.shutdown(wait=not cancelled, cancel_futures=True)
+
+    rows = [{"params": combos[i], **summary} for i, summary in summaries.items()]
+    rows.sort(key=lambda r: r[sort_by], reverse=SORT_KEYS[sort_by])
+    rows = rows[:top_n] if top_n else rows
+
+    if include_results:
+        # 결과 배열은 상위 조합에 대해서만 다시 계산 (메모리 상한 유지)
+        for row in rows:
+            row["results"] = package_results(ticker, run_backtest(df, row["params"], symbol=ticker))["results"]
+
+    print(f"🧪 Sweep {ticker}: {len(summaries)}/{len(combos)} combinations in {time.monotonic() - started:.2f}s ({workers} workers)")
+
+    return {
+        "ticker": ticker,
+        "total_combinations": len(combos),
+        "completed": len(summaries),
+        "cancelled": cancelled,
+        "sort_by": sort_by,
+        "ranking": rows,
+    }
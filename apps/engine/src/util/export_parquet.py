@@ -0,0 +1,33 @@
+import argparse
+
+from src.core.config import TARGET_TICKERS
+from src.service.bar_store import BAR_TABLES
+from src.service.data_source import DATA_SOURCES
+
+# DB(market_data / market_data_1m / 연속 집계) → 로컬 Parquet 저장소 내보내기
+# 사용법 (apps/engine 에서):
+#   python -m src.util.export_parquet                      # 전체 종목 일봉, 증분
+#   python -m src.util.export_parquet AAPL TSLA -t 1m --full
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export bars from the DB into the local Parquet store")
+    parser.add_argument("symbols", nargs="*", help="종목 (기본: TARGET_TICKERS)")
+    parser.add_argument("-t", "--timeframe", action="append", choices=list(BAR_TABLES),
+                        help="타임프레임 (여러 번 지정 가능, 기본: 1d)")
+    parser.add_argument("--full", action="store_true", help="증분이 아니라 처음부터 다시 내보냄")
+    args = parser.parse_args()
+
+    store = DATA_SOURCES["parquet"]
+    for timeframe in args.timeframe or ["1d"]:
+        for symbol in args.symbols or TARGET_TICKERS:
+            try:
+                result = store.refresh(symbol, timeframe, full=args.full)
+                print(f"✅ [Parquet] {symbol} [{timeframe}] {result['mode']}: {result['rows']} rows")
+            except Exception as e:
+                print(f"❌ [Parquet] {symbol} [{timeframe}] export failed: {e}")
+    print(f"📁 Store: {store.root}")
+
+
+if __name__ == "__main__":
+    main()